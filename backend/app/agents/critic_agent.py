@@ -5,6 +5,7 @@ from app.db.session import AsyncSessionLocal
 from app.db.models import MarketInsight
 from sqlalchemy.future import select
 from app.core.ai_client import ai_client
+from app.core.concurrency import RequestPriority
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,7 @@ class CriticAgent:
             result = await session.execute(stmt)
             insights = result.scalars().all()
             
+            prompts = []
             for insight in insights:
                 prompt = f"""
                 Critically analyze the following investment thesis:
@@ -36,9 +38,11 @@ class CriticAgent:
                 1. A Reliability Score (0.0 to 1.0).
                 2. A detailed critique of the arguments.
                 """
-                
-                critique_raw = await ai_client.generate(prompt)
-                
+                prompts.append(prompt)
+
+            critiques = await ai_client.generate_batch(prompts, priority=RequestPriority.BACKGROUND)
+
+            for insight, critique_raw in zip(insights, critiques):
                 # Naive parsing of score and critique text
                 # In a real app, use structured output.
                 score = 0.7 # Default
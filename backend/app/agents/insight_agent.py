@@ -6,6 +6,7 @@ from app.db.models import PolymarketMarket, PolymarketOrderbook, MarketInsight
 from sqlalchemy.future import select
 from sqlalchemy import desc
 from app.core.ai_client import ai_client
+from app.core.concurrency import RequestPriority
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,7 @@ class InsightAgent:
             result = await session.execute(stmt)
             markets = result.scalars().all()
             
+            pending = []
             for market in markets:
                 # Fetch recent orderbook entries
                 stmt = select(PolymarketOrderbook).where(PolymarketOrderbook.market_id == market.id).order_by(desc(PolymarketOrderbook.timestamp)).limit(10)
@@ -55,8 +57,13 @@ class InsightAgent:
                 Provide an investment thesis with specific reasoning.
                 """
                 
-                insight_content = await ai_client.generate(prompt)
-                
+                pending.append((market, prompt, obs_data))
+
+            # Submit every market's prompt as one batch instead of one round trip per market
+            contents = await ai_client.generate_batch(
+                [prompt for _, prompt, _ in pending], priority=RequestPriority.BACKGROUND
+            )
+            for (market, _, obs_data), insight_content in zip(pending, contents):
                 insight = MarketInsight(
                     market_id=market.id,
                     insight_type="prediction",
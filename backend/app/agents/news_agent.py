@@ -1,23 +1,35 @@
 import json
 import logging
+from functools import lru_cache
 from sqlalchemy.future import select
-from sentence_transformers import SentenceTransformer
 from app.db.models import NewsDocument
 from app.db.session import async_session
 
 logger = logging.getLogger("news_agent")
 
+
+@lru_cache(maxsize=1)
+def load_embedder():
+    """
+    The process-wide BAAI/bge-m3 SentenceTransformer (1024d), loaded once and shared by
+    NewsAgent and the semantic forecast cache. None when the model cannot be loaded.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer("BAAI/bge-m3")
+    except Exception as e:
+        logger.warning(f"Failed to load local embedder BAAI/bge-m3. Using mock embedder: {e}")
+        return None
+
+
 class NewsAgent:
     def __init__(self):
         # Using a fast local embedding model for the RAG architecture.
         # This matches the Vector(1024) dimension if we use 'mixedbread-ai/mxbai-embed-large-v1' or similar, 
         # but for demo simplicity, we'll map vectors properly or use all-MiniLM-L6-v2 and pad/project, 
         # However BAAI/bge-m3 produces 1024d embeddings.
-        try:
-            self.embedder = SentenceTransformer("BAAI/bge-m3")
-        except Exception as e:
-            logger.warning(f"Failed to load local embedder BAAI/bge-m3. Using mock embedder: {e}")
-            self.embedder = None
+        self.embedder = load_embedder()
 
     def _get_embedding(self, text: str) -> list[float]:
         """Generate a 1024-dimensional embedding for the given text."""
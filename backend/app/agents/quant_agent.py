@@ -1,6 +1,7 @@
 import logging
 import json
 from types import SimpleNamespace
+from app.core.concurrency import RequestPriority
 from app.domain.intelligence.service import IntelligenceService
 from app.agents.news_agent import NewsAgent
 from app.connectors.polymarket import PolymarketConnector
@@ -79,7 +80,7 @@ class QuantAgent:
         )
         
         try:
-            raw_response = await self.intelligence_service.chat_with_model(req)
+            raw_response = await self.intelligence_service.chat_with_model(req, priority=RequestPriority.BACKGROUND)
             # Try to parse the JSON output
             # Clean possible markdown formatting
             if raw_response.startswith("```json"):
@@ -1,19 +1,70 @@
-
 import asyncio
 import logging
+import os
+import time
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 from app.connectors.polymarket import PolymarketConnector
+from app.services.orderbook_mirror import OrderBookMirror
 from app.db.session import AsyncSessionLocal
 from app.db.models import PolymarketMarket, PolymarketOrderbook
-from sqlalchemy.future import select
+from sqlalchemy import insert, select
 
 logger = logging.getLogger(__name__)
 
+
+def _insert_new_markets(dialect: str, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT (condition_id) DO NOTHING: existing markets keep their metadata."""
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+    return dialect_insert(PolymarketMarket).values(rows).on_conflict_do_nothing(
+        index_elements=[PolymarketMarket.condition_id]
+    )
+
+
+def _book_summary(bids: List[Dict[str, Any]], asks: List[Dict[str, Any]]) -> Dict[str, float]:
+    # Take the best price from each side regardless of level order; REST and mirror order them differently.
+    best_bid = max((float(level.get("price", 0)) for level in bids), default=0.0)
+    best_ask = min((float(level.get("price", 0)) for level in asks), default=0.0)
+    return {
+        "mid_price": (best_bid + best_ask) / 2 if best_bid and best_ask else (best_bid or best_ask),
+        "spread": best_ask - best_bid if best_bid and best_ask else 0,
+    }
+
+
 class ScrapingAgent:
-    def __init__(self, connector: PolymarketConnector):
+    """
+    Polls active Polymarket markets and records an order-book row per market.
+
+    Each cycle is a pipeline:
+    - One insert for markets not seen before (existing rows are left untouched), then one
+      query for every market's id.
+    - Order-book fetches run concurrently, at most `concurrency` at a time. The connector
+      also caps connections per host.
+    - One batched insert for the book rows.
+    The cycle's timings are logged and returned.
+    """
+
+    def __init__(
+        self,
+        connector: PolymarketConnector,
+        mirror: Optional[OrderBookMirror] = None,
+        session_factory=None,
+        concurrency: Optional[int] = None,
+        market_limit: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
         self.connector = connector
+        self.mirror = mirror
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.concurrency = concurrency or int(os.getenv("SCRAPER_CONCURRENCY", "10"))
+        self.market_limit = market_limit or int(os.getenv("SCRAPER_MARKET_LIMIT", "50"))
+        self.poll_interval = poll_interval or float(os.getenv("SCRAPER_POLL_INTERVAL_SECONDS", "15"))
         self.is_running = False
+        self.last_cycle: Optional[Dict[str, Any]] = None
 
     async def start(self):
         self.is_running = True
@@ -21,8 +72,7 @@ class ScrapingAgent:
         while self.is_running:
             try:
                 await self.scrape_active_markets()
-                # Poll every 5 minutes for new data
-                await asyncio.sleep(300) 
+                await asyncio.sleep(self.poll_interval)
             except Exception as e:
                 logger.error(f"Error in ScrapingAgent: {e}")
                 await asyncio.sleep(60)
@@ -31,61 +81,107 @@ class ScrapingAgent:
         self.is_running = False
         logger.info("ScrapingAgent stopped.")
 
-    async def scrape_active_markets(self):
+    async def scrape_active_markets(self) -> Dict[str, Any]:
+        started = time.perf_counter()
         logger.info("Fetching active markets from Polymarket...")
-        markets_data = await self.connector.call_tool("polymarket_get_markets", {"limit": 50, "active": True})
-        
-        async with AsyncSessionLocal() as session:
-            for m_data in markets_data:
-                # Update or Create Market
-                condition_id = m_data.get("conditionId")
-                if not condition_id:
-                    continue
-                
-                stmt = select(PolymarketMarket).where(PolymarketMarket.condition_id == condition_id)
-                result = await session.execute(stmt)
-                db_market = result.scalar_one_or_none()
-                
-                if not db_market:
-                    db_market = PolymarketMarket(
-                        condition_id=condition_id,
-                        question=m_data.get("question"),
-                        description=m_data.get("description"),
-                        status="open",
-                        category=m_data.get("category"),
-                        end_date=datetime.fromisoformat(m_data.get("endDate").replace("Z", "+00:00")) if m_data.get("endDate") else None
-                    )
-                    session.add(db_market)
-                    await session.flush() # Ensure db_market has an ID
-                
-                # Fetch Orderbook for high-volume or specific markers?
-                # For this demo, we fetch for all active ones we just found.
+        markets_data = await self.connector.call_tool(
+            "polymarket_get_markets", {"limit": self.market_limit, "active": True}
+        )
+        listed = time.perf_counter()
+
+        markets: Dict[str, Dict[str, Any]] = {}
+        for m_data in markets_data:
+            condition_id = m_data.get("conditionId")
+            if condition_id:
+                markets[condition_id] = m_data  # last listing wins if the API repeats a market
+
+        # In Polymarket, "Yes" and "No" tokens have different IDs.
+        # We usually care about the "Yes" token for probability.
+        # This is a simplification.
+        tokens = {
+            condition_id: (m_data.get("tokens") or [{}])[0].get("token_id")
+            for condition_id, m_data in markets.items()
+        }
+        tokens = {condition_id: token_id for condition_id, token_id in tokens.items() if token_id}
+        if self.mirror is not None:
+            await self.mirror.track(tokens.values())
+
+        async with self.session_factory() as session:
+            # Fetch books while the market rows are written; neither needs the other.
+            books_task = asyncio.create_task(self._fetch_books(tokens))
+            try:
+                market_ids = await self._store_markets(session, markets)
+                stored = time.perf_counter()
+                books = await books_task
+            except BaseException:
+                books_task.cancel()
+                raise
+            fetched = time.perf_counter()
+
+            rows = [
+                {
+                    "market_id": market_ids[condition_id],
+                    "bids": book.get("bids", []),
+                    "asks": book.get("asks", []),
+                    **_book_summary(book.get("bids", []), book.get("asks", [])),
+                }
+                for condition_id, book in books.items()
+                if condition_id in market_ids
+            ]
+            if rows:
+                await session.execute(insert(PolymarketOrderbook), rows)
+            await session.commit()
+        finished = time.perf_counter()
+
+        cycle = {
+            "markets": len(markets),
+            "books": len(rows),
+            "book_errors": len(tokens) - len(books),
+            "list_seconds": round(listed - started, 4),
+            "markets_seconds": round(stored - listed, 4),
+            "fetch_seconds": round(fetched - listed, 4),
+            "insert_seconds": round(finished - fetched, 4),
+            "total_seconds": round(finished - started, 4),
+        }
+        self.last_cycle = cycle
+        logger.info("Scraping cycle complete.", extra={"event": "scrape_cycle", **cycle})
+        return cycle
+
+    async def _store_markets(self, session, markets: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        if not markets:
+            return {}
+        rows = [
+            {
+                "condition_id": condition_id,
+                "question": m_data.get("question"),
+                "description": m_data.get("description"),
+                "status": "open",
+                "category": m_data.get("category"),
+                "end_date": datetime.fromisoformat(m_data.get("endDate").replace("Z", "+00:00")) if m_data.get("endDate") else None,
+            }
+            for condition_id, m_data in markets.items()
+        ]
+        await session.execute(_insert_new_markets(session.bind.dialect.name, rows))
+        result = await session.execute(
+            select(PolymarketMarket.id, PolymarketMarket.condition_id).where(
+                PolymarketMarket.condition_id.in_(list(markets))
+            )
+        )
+        return {condition_id: market_id for market_id, condition_id in result.all()}
+
+    async def _fetch_books(self, tokens: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(condition_id: str, token_id: str):
+            async with slots:
                 try:
-                    # In Polymarket, "Yes" and "No" tokens have different IDs. 
-                    # We usually care about the "Yes" token for probability.
-                    # This is a simplification.
-                    token_id = m_data.get("tokens", [{}])[0].get("token_id")
-                    if token_id:
-                        book_data = await self.connector.call_tool("polymarket_get_orderbook", {"token_id": token_id})
-                        
-                        bids = book_data.get("bids", [])
-                        asks = book_data.get("asks", [])
-                        
-                        best_bid = float(bids[0].get("price", 0)) if bids else 0
-                        best_ask = float(asks[0].get("price", 0)) if asks else 0
-                        mid_price = (best_bid + best_ask) / 2 if best_bid and best_ask else (best_bid or best_ask)
-                        spread = best_ask - best_bid if best_bid and best_ask else 0
-                        
-                        orderbook_entry = PolymarketOrderbook(
-                            market_id=db_market.id,
-                            bids=bids,
-                            asks=asks,
-                            mid_price=mid_price,
-                            spread=spread
-                        )
-                        session.add(orderbook_entry)
+                    if self.mirror is not None:
+                        # Served from memory once the token is mirrored
+                        return condition_id, await self.mirror.orderbook(token_id)
+                    return condition_id, await self.connector.call_tool("polymarket_get_orderbook", {"token_id": token_id})
                 except Exception as e:
                     logger.error(f"Error fetching orderbook for market {condition_id}: {e}")
-            
-            await session.commit()
-            logger.info("Scraping cycle complete.")
+                    return condition_id, None
+
+        results = await asyncio.gather(*(fetch(condition_id, token_id) for condition_id, token_id in tokens.items()))
+        return {condition_id: book for condition_id, book in results if book is not None}
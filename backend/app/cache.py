@@ -1,9 +1,25 @@
 import os
 import redis
+import redis.asyncio as aioredis
 import json
 import functools
 import asyncio
-from typing import Callable, Any
+import hashlib
+import inspect
+import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Any, Awaitable, Dict, Optional
+
+from app.core.serialization import serializer
+from app.core.singleflight import SingleFlight
+from app.services.prediction_registry import RELEASE_SCRIPT
+
+logger = logging.getLogger("alpha_insights.cache")
 
 # Initialize Redis
 if os.getenv("USE_MOCK_REDIS"):
@@ -21,36 +37,315 @@ else:
     redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
     r = redis.from_url(redis_url)
 
-def cache_response(ttl_seconds: int = 60):
+# Async client: the primary API for FastAPI code so a slow Redis round trip never blocks the
+# event loop. The sync `r` above is kept for Celery workers and other sync callers.
+if os.getenv("USE_MOCK_REDIS"):
+    try:
+        from fakeredis import FakeAsyncRedis
+        ar = FakeAsyncRedis(decode_responses=True)
+    except ImportError:
+        class SimpleMockAsyncRedis:
+            def __init__(self): self.store = {}
+            async def get(self, key): return self.store.get(key)
+            async def mget(self, keys): return [self.store.get(key) for key in keys]
+            async def setex(self, key, time, value): self.store[key] = value
+            async def set(self, key, value, nx=False, px=None, ex=None):
+                if nx and key in self.store: return None
+                self.store[key] = value
+                return True
+            async def delete(self, *keys):
+                for key in keys: self.store.pop(key, None)
+            async def ping(self): return True
+            async def aclose(self): pass
+        ar = SimpleMockAsyncRedis()
+else:
+    async_pool = aioredis.BlockingConnectionPool.from_url(
+        os.getenv("REDIS_URL", "redis://redis:6379/0"),
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+        timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "5")),
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+        health_check_interval=30,
+    )
+    ar = aioredis.Redis(connection_pool=async_pool)
+
+
+async def close_async_redis():
+    await ar.aclose()
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    created_at: float
+    ttl: float
+    stale_ttl: float
+    # Seconds the value took to compute; drives probabilistic early refresh
+    delta: float
+
+    @property
+    def fresh_until(self) -> float:
+        return self.created_at + self.ttl
+
+    @property
+    def expires_at(self) -> float:
+        return self.fresh_until + self.stale_ttl
+
+    def dumps(self) -> bytes:
+        return serializer.dumps({"v": self.value, "t": self.created_at, "ttl": self.ttl, "s": self.stale_ttl, "d": self.delta})
+
+    @classmethod
+    def loads(cls, raw) -> "CacheEntry":
+        data = serializer.loads(raw)
+        return cls(data["v"], data["t"], data["ttl"], data["s"], data["d"])
+
+
+class TwoTierCache:
     """
-    Async decorator to cache FastAPI response in Redis.
-    Key is generated from function name + args.
+    Response cache: a bounded in-process LRU (L1) in front of Redis (L2).
+
+    Fresh entries may be refreshed early with probability rising as expiry nears
+    (XFetch, weighted by how long the value took to compute). Past `ttl` an entry is
+    served stale for up to `stale_ttl` more seconds while one background task
+    recomputes it. Cold misses are computed once per key: concurrent callers in this
+    process share a single flight, and a short Redis lock keeps other workers waiting
+    on L2 instead of recomputing.
     """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        max_entries: int = 2048,
+        beta: float = 1.0,
+        lock_timeout: float = 10.0,
+        prefix: str = "response_cache",
+    ):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.prefix = prefix
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight = SingleFlight()
+        self._refreshing: set[str] = set()
+        self._background: set[asyncio.Task] = set()
+        self.l1_hits = 0
+        self.l1_misses = 0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.stale_served = 0
+        self.early_refreshes = 0
+        self.recomputes = 0
+        self.evictions = 0
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0.0,
+    ) -> Any:
+        now = time.time()
+        entry = self._l1_get(key, now)
+        if entry is None:
+            entry = await self._l2_get(key, now)
+
+        if entry is not None:
+            if now < entry.fresh_until:
+                if self._should_refresh_early(entry, now):
+                    self.early_refreshes += 1
+                    self._refresh_in_background(key, compute, ttl, stale_ttl)
+                return entry.value
+            self.stale_served += 1
+            self._refresh_in_background(key, compute, ttl, stale_ttl)
+            return entry.value
+
+        return await self._inflight.do(key, lambda: self._recompute(key, compute, ttl, stale_ttl))
+
+    def _should_refresh_early(self, entry: CacheEntry, now: float) -> bool:
+        if entry.delta <= 0 or self.beta <= 0:
+            return False
+        return now - entry.delta * self.beta * math.log(random.random() or 1e-12) >= entry.fresh_until
+
+    def _refresh_in_background(self, key: str, compute, ttl: float, stale_ttl: float):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._inflight.do(key, lambda: self._recompute(key, compute, ttl, stale_ttl))
+            except Exception as exc:
+                logger.warning(f"Background refresh of {key} failed: {exc}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _recompute(self, key: str, compute, ttl: float, stale_ttl: float) -> Any:
+        lock_key = f"{self.prefix}:lock:{key}"
+        token = uuid.uuid4().hex
+        locked = await self._acquire_lock(lock_key, token)
+        try:
+            if not locked:
+                # Another worker is recomputing; wait for its value to land in L2.
+                deadline = time.time() + self.lock_timeout
+                while time.time() < deadline:
+                    await asyncio.sleep(0.05)
+                    entry = await self._l2_get(key, time.time(), count=False)
+                    if entry is not None and time.time() < entry.fresh_until:
+                        return entry.value
+
+            self.recomputes += 1
+            started = time.perf_counter()
+            value = await compute()
+            entry = CacheEntry(value, time.time(), ttl, stale_ttl, time.perf_counter() - started)
+            self._l1_set(key, entry)
+            await self._l2_set(key, entry)
+            return value
+        finally:
+            if locked:
+                await self._release_lock(lock_key, token)
+
+    async def _acquire_lock(self, lock_key: str, token: str) -> bool:
+        if self.redis is None:
+            return True
+        try:
+            return bool(await self.redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)))
+        except Exception as e:
+            logger.warning(f"Redis lock error: {e}")
+            return True
+
+    async def _release_lock(self, lock_key: str, token: str):
+        # One atomic compare-and-delete: the lock may have expired and been taken by another
+        # process since we set it.
+        try:
+            await self.redis.eval(RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.warning(f"Redis unlock error: {e}")
+
+    def _l1_get(self, key: str, now: float) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.expires_at:
+            self._entries.move_to_end(key)
+            self.l1_hits += 1
+            return entry
+        if entry is not None:
+            del self._entries[key]
+        self.l1_misses += 1
+        return None
+
+    def _l1_set(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _l2_get(self, key: str, now: float, count: bool = True) -> Optional[CacheEntry]:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(f"{self.prefix}:{key}")
+        except Exception as e:
+            logger.warning(f"Redis Read Error: {e}")
+            raw = None
+        entry = CacheEntry.loads(raw) if raw else None
+        if entry is None or now >= entry.expires_at:
+            if count:
+                self.l2_misses += 1
+            return None
+        if count:
+            self.l2_hits += 1
+        self._l1_set(key, entry)
+        return entry
+
+    async def _l2_set(self, key: str, entry: CacheEntry):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.setex(f"{self.prefix}:{key}", max(1, math.ceil(entry.ttl + entry.stale_ttl)), entry.dumps())
+        except Exception as e:
+            logger.warning(f"Redis Write Error: {e}")
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        l1_lookups = self.l1_hits + self.l1_misses
+        l2_lookups = self.l2_hits + self.l2_misses
+        return {
+            "l1": {
+                "hits": self.l1_hits,
+                "misses": self.l1_misses,
+                "hit_ratio": round(self.l1_hits / l1_lookups, 4) if l1_lookups else 0.0,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+            },
+            "l2": {
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "hit_ratio": round(self.l2_hits / l2_lookups, 4) if l2_lookups else 0.0,
+            },
+            "stale_served": self.stale_served,
+            "early_refreshes": self.early_refreshes,
+            "recomputes": self.recomputes,
+        }
+
+
+response_cache = TwoTierCache(
+    ar,
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048")),
+    beta=float(os.getenv("RESPONSE_CACHE_BETA", "1.0")),
+)
+
+
+def ignore_params(*names: str) -> Callable[..., str]:
+    """Key function over every argument except `names` (e.g. the auth dependency)."""
+    def key_func(func: Callable, args: tuple, kwargs: dict) -> str:
+        bound = inspect.signature(func).bind_partial(*args, **kwargs)
+        return _hash_params({name: value for name, value in bound.arguments.items() if name not in names})
+    return key_func
+
+
+def only_params(*names: str) -> Callable[..., str]:
+    """Key function over just `names`."""
+    def key_func(func: Callable, args: tuple, kwargs: dict) -> str:
+        bound = inspect.signature(func).bind_partial(*args, **kwargs)
+        return _hash_params({name: bound.arguments.get(name) for name in names})
+    return key_func
+
+
+def _hash_params(params: Dict[str, Any]) -> str:
+    material = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+
+def cache_response(
+    ttl_seconds: int = 60,
+    stale_ttl_seconds: Optional[int] = None,
+    key_func: Optional[Callable[[Callable, tuple, dict], str]] = None,
+    cache: Optional[TwoTierCache] = None,
+):
+    """
+    Async decorator to cache a FastAPI response in the two-tier response cache.
+
+    `key_func(func, args, kwargs)` builds the per-call part of the key; the default uses every
+    argument, so endpoints with auth dependencies should pass `ignore_params("current_user")`
+    to share one copy across users. Responses stay servable (stale) for `stale_ttl_seconds`
+    past their TTL while a single background refresh runs; defaults to the TTL itself.
+    """
+    key_func = key_func or ignore_params()
+    stale_ttl = ttl_seconds if stale_ttl_seconds is None else stale_ttl_seconds
+
     def decorator(func: Callable):
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # Simple key generation
-            key_parts = [func.__name__] + [str(arg) for arg in args] + [f"{k}={v}" for k, v in kwargs.items()]
-            cache_key = ":".join(key_parts)
-            
-            # Check cache
-            try:
-                cached = r.get(cache_key)
-                if cached:
-                    # Return cached data
-                    return json.loads(cached)
-            except Exception as e:
-                print(f"Redis Read Error: {e}")
-
-            # Run function
-            result = await func(*args, **kwargs)
-            
-            # Cache result
-            try:
-                r.setex(cache_key, ttl_seconds, json.dumps(result))
-            except Exception as e:
-                print(f"Redis Write Error: {e}")
-                
-            return result
+            target = cache or response_cache
+            cache_key = f"{func.__module__}.{func.__name__}:{key_func(func, args, kwargs)}"
+            return await target.get_or_compute(
+                cache_key, lambda: func(*args, **kwargs), ttl=ttl_seconds, stale_ttl=stale_ttl
+            )
         return wrapper
     return decorator
@@ -1,13 +1,39 @@
 
+import asyncio
+import json
+import logging
+import os
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional, Set
 from app.connectors.base import BaseConnector, ToolDefinition, ResourceDefinition
 
+logger = logging.getLogger("alpha_insights.polymarket")
+
+CLOB_MARKET_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+
 class PolymarketConnector(BaseConnector):
-    def __init__(self):
+    def __init__(self, max_connections_per_host: Optional[int] = None):
         self.gamma_api_url = "https://gamma-api.polymarket.com"
         self.clob_api_url = "https://clob.polymarket.com"
-        self.client = httpx.AsyncClient()
+        self.max_connections_per_host = max_connections_per_host or int(
+            os.getenv("POLYMARKET_MAX_CONNECTIONS_PER_HOST", "10")
+        )
+        # Two hosts (gamma, clob) share one pool; each also gets its own cap below.
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=2 * self.max_connections_per_host,
+                max_keepalive_connections=2 * self.max_connections_per_host,
+            )
+        )
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        async with slots:
+            return await self.client.get(url, **kwargs)
 
     async def connect(self):
         pass
@@ -49,7 +75,7 @@ class PolymarketConnector(BaseConnector):
                 "active": "true" if arguments.get("active", True) else "false",
                 "closed": "true" if arguments.get("closed", False) else "false"
             }
-            response = await self.client.get(f"{self.gamma_api_url}/markets", params=params)
+            response = await self._get(f"{self.gamma_api_url}/markets", params=params)
             response.raise_for_status()
             return response.json()
 
@@ -59,7 +85,7 @@ class PolymarketConnector(BaseConnector):
                  raise ValueError("token_id is required")
             
             # Polymarket CLOB orderbook endpoint
-            response = await self.client.get(f"{self.clob_api_url}/book", params={"token_id": token_id})
+            response = await self._get(f"{self.clob_api_url}/book", params={"token_id": token_id})
             response.raise_for_status()
             return response.json()
 
@@ -70,3 +96,79 @@ class PolymarketConnector(BaseConnector):
 
     async def read_resource(self, uri: str) -> str:
         return "Not implemented"
+
+
+class PolymarketMarketStream:
+    """
+    CLOB market-channel websocket for a set of token IDs.
+
+    Iterating yields the channel's events (`book` snapshots, `price_change` deltas, ...) one
+    dict at a time. On a dropped connection it reconnects with backoff, re-subscribes to
+    every token and yields `{"event_type": "reconnect"}` first, because deltas sent while
+    disconnected are lost and consumers must resync.
+    """
+
+    def __init__(
+        self,
+        token_ids: Iterable[str] = (),
+        url: Optional[str] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.url = url or os.getenv("POLYMARKET_WS_URL", CLOB_MARKET_WS_URL)
+        self.token_ids: Set[str] = set(token_ids)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connects = 0
+        self._socket = None
+        self._closed = False
+
+    async def subscribe(self, token_ids: Iterable[str]):
+        new = set(token_ids) - self.token_ids
+        if not new:
+            return
+        self.token_ids |= new
+        if self._socket is not None:
+            try:
+                await self._socket.send(json.dumps({"assets_ids": sorted(new), "operation": "subscribe"}))
+            except Exception as exc:
+                # The reconnect path re-sends the full subscription.
+                logger.warning(f"Polymarket subscribe failed: {exc}")
+
+    async def close(self):
+        self._closed = True
+        if self._socket is not None:
+            await self._socket.close()
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        import websockets
+
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                async with websockets.connect(self.url) as socket:
+                    self._socket = socket
+                    await socket.send(json.dumps({"assets_ids": sorted(self.token_ids), "type": "market"}))
+                    self.connects += 1
+                    if self.connects > 1:
+                        yield {"event_type": "reconnect"}
+                    delay = self.reconnect_delay
+                    async for raw in socket:
+                        if raw in ("PONG", b"PONG"):
+                            continue
+                        try:
+                            payload = json.loads(raw)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Skipping malformed Polymarket message: {raw[:80]!r}")
+                            continue
+                        for event in payload if isinstance(payload, list) else [payload]:
+                            yield event
+            except (OSError, websockets.exceptions.WebSocketException) as exc:
+                if self._closed:
+                    break
+                logger.warning(f"Polymarket market stream dropped: {exc}; reconnecting in {delay:.1f}s")
+            finally:
+                self._socket = None
+            if not self._closed:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
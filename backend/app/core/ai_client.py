@@ -1,14 +1,28 @@
 import os
+import hashlib
 import httpx
 import json
 import logging
 import asyncio
-from typing import AsyncIterator, Dict
+import inspect
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
 from abc import ABC, abstractmethod
 
+from app.cache import ar as redis_client
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState, is_provider_failure
+from app.core.json_stream import IncrementalJSONParser
+from app.core.concurrency import AdaptiveConcurrencyLimiter, RequestPriority, current_priority
+from app.core.llm_cache import LLMResponseCache
+from app.core.singleflight import SingleFlight, request_key
+
 logger = logging.getLogger("ai_client")
 
 class AIProvider(ABC):
+    # Providers that understand llama.cpp prompt-cache hints (`prefix_key`, `id_slot`, `cache_prompt`)
+    supports_prompt_cache = False
+
     def __init__(self, client: httpx.AsyncClient):
         self.client = client
 
@@ -22,22 +36,23 @@ class AIProvider(ABC):
         if text:
             yield text
 
+    def is_completion(self, text: str) -> bool:
+        """Whether `text` is a real answer (worth caching) rather than an empty or error reply."""
+        return bool(text)
+
+    async def generate_batch(self, prompts: List[str], model: str, **kwargs) -> List[str]:
+        """Default batch fallback: one request per prompt, issued concurrently."""
+        return list(await asyncio.gather(*[self.generate(prompt, model, **kwargs) for prompt in prompts]))
+
     async def _safe_request(self, method: str, url: str, **kwargs) -> httpx.Response:
-        """Helper to run requests with retries."""
-        last_error = None
-        for attempt in range(3):
-            try:
-                response = await self.client.request(method, url, **kwargs)
-                response.raise_for_status()
-                return response
-            except (httpx.ConnectError, httpx.TimeoutException, httpx.HTTPStatusError) as e:
-                last_error = e
-                wait = (attempt + 1) * 2
-                logger.warning(f"AI Provider request failed (attempt {attempt+1}/3): {e}. Retrying in {wait}s...")
-                await asyncio.sleep(wait)
-        
-        logger.error(f"AI Provider request failed after 3 attempts: {last_error}")
-        raise last_error
+        """Single attempt; outages are absorbed by AIClient's circuit breakers rather than retry sleeps."""
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+        except (httpx.ConnectError, httpx.TimeoutException, httpx.HTTPStatusError) as e:
+            logger.warning(f"AI Provider request to {url} failed: {e}")
+            raise
 
 class OllamaProvider(AIProvider):
     def __init__(self, client: httpx.AsyncClient, host: str = "http://ollama:11434"):
@@ -78,6 +93,8 @@ class OllamaProvider(AIProvider):
                     yield token
 
 class GeminiProvider(AIProvider):
+    PARSE_ERROR = "Error parsing Gemini response"
+
     def __init__(self, client: httpx.AsyncClient, api_key: str):
         super().__init__(client)
         self.api_key = api_key
@@ -96,40 +113,116 @@ class GeminiProvider(AIProvider):
         try:
             return data['candidates'][0]['content']['parts'][0]['text']
         except (KeyError, IndexError):
-            return "Error parsing Gemini response"
+            return self.PARSE_ERROR
+
+    def is_completion(self, text: str) -> bool:
+        return bool(text) and text != self.PARSE_ERROR
 
 class LlamaCppProvider(AIProvider):
-    def __init__(self, client: httpx.AsyncClient, host: str = "http://text-gen-cpp:8080"):
+    supports_prompt_cache = True
+    # After a 4xx on a multi-prompt request, batches go out as single requests for this long
+    MULTI_PROMPT_RETRY_SECONDS = 300.0
+
+    def __init__(self, client: httpx.AsyncClient, host: str = "http://text-gen-cpp:8080", n_slots: int = 1):
         super().__init__(client)
         self.host = host
+        self.n_slots = max(1, n_slots)
+        # monotonic time at which list-valued prompts are tried again; inf once the server
+        # has answered one with something other than a list of completions
+        self._multi_prompt_retry_at = 0.0
+        self.prompt_usage = {"requests": 0, "prompt_tokens_evaluated": 0, "prompt_tokens_cached": 0}
 
-    async def generate(self, prompt: str, model: str = "lfm-thinking", **kwargs) -> str:
+    def slot_for(self, prefix_key: str) -> int:
+        """Pin prompts that share a prefix to one server slot so its KV cache is reused."""
+        return int(hashlib.sha256(prefix_key.encode()).hexdigest(), 16) % self.n_slots
+
+    @property
+    def multi_prompt_supported(self) -> bool:
+        return time.monotonic() >= self._multi_prompt_retry_at
+
+    def _build_payload(self, prompt: str | List[str], stream: bool, **kwargs) -> dict:
         payload = {
             "prompt": prompt,
             "n_predict": kwargs.get("n_predict", 2048),
             "temperature": kwargs.get("temperature", 0.2),
-            "stream": False
+            "stream": stream,
+            "cache_prompt": kwargs.get("cache_prompt", True),
         }
         if "json_schema" in kwargs:
             payload["json_schema"] = kwargs["json_schema"]
-        
+        if kwargs.get("id_slot") is not None:
+            payload["id_slot"] = kwargs["id_slot"]
+        elif kwargs.get("prefix_key") and isinstance(prompt, str):
+            # Batches are left to spread across slots; with cache_prompt the server still
+            # prefers whichever slot already holds the longest matching prefix.
+            payload["id_slot"] = self.slot_for(kwargs["prefix_key"])
+        return payload
+
+    def _record_prompt_usage(self, data: dict):
+        timings = data.get("timings") or {}
+        evaluated = timings.get("prompt_n")
+        cached = timings.get("cache_n", data.get("tokens_cached"))
+        if evaluated is None and cached is None:
+            return
+        self.prompt_usage["requests"] += 1
+        self.prompt_usage["prompt_tokens_evaluated"] += int(evaluated or 0)
+        self.prompt_usage["prompt_tokens_cached"] += int(cached or 0)
+        logger.debug(f"llama.cpp prompt tokens evaluated={evaluated} cached={cached} slot={data.get('id_slot')}")
+
+    async def generate(self, prompt: str, model: str = "lfm-thinking", **kwargs) -> str:
+        payload = self._build_payload(prompt, stream=False, **kwargs)
         response = await self._safe_request(
             "POST", 
             f"{self.host}/completion", 
             json=payload,
             timeout=300.0
         )
-        return response.json().get("content", "").strip()
+        data = response.json()
+        self._record_prompt_usage(data)
+        return data.get("content", "").strip()
+
+    async def generate_batch(self, prompts: List[str], model: str = "lfm-thinking", **kwargs) -> List[str]:
+        """
+        Submit all prompts in one /completion call (llama.cpp accepts a list-valued `prompt`
+        and schedules the entries across its parallel slots with continuous batching).
+        Servers without multi-prompt support fall back to concurrent single requests.
+        """
+        if len(prompts) > 1:
+            # Pinning every entry to the prefix's slot would run the batch one prompt at a
+            # time; unpinned, cache_prompt still steers entries to slots holding the prefix.
+            kwargs.pop("prefix_key", None)
+        if len(prompts) > 1 and self.multi_prompt_supported:
+            payload = self._build_payload(prompts, stream=False, **kwargs)
+            try:
+                response = await self.client.post(f"{self.host}/completion", json=payload, timeout=300.0)
+                response.raise_for_status()
+                data = response.json()
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code >= 500:
+                    raise
+                # A 4xx may be one bad entry (an over-long prompt) rather than missing
+                # support: serve this batch singly and try multi-prompt again later.
+                logger.warning(
+                    f"llama.cpp rejected a multi-prompt batch ({exc.response.status_code}); "
+                    f"using parallel single requests for {self.MULTI_PROMPT_RETRY_SECONDS:.0f}s"
+                )
+                self._multi_prompt_retry_at = time.monotonic() + self.MULTI_PROMPT_RETRY_SECONDS
+                return await super().generate_batch(prompts, model, **kwargs)
+
+            if isinstance(data, list) and len(data) == len(prompts):
+                results = sorted(data, key=lambda item: item.get("index", 0)) if all("index" in item for item in data) else data
+                for item in results:
+                    self._record_prompt_usage(item)
+                return [item.get("content", "").strip() for item in results]
+
+            # Accepted but not answered per prompt: this server does not do multi-prompt.
+            logger.warning("llama.cpp server does not support multi-prompt batches; using parallel single requests")
+            self._multi_prompt_retry_at = float("inf")
+
+        return await super().generate_batch(prompts, model, **kwargs)
 
     async def stream_generate(self, prompt: str, model: str = "lfm-thinking", **kwargs) -> AsyncIterator[str]:
-        payload = {
-            "prompt": prompt,
-            "n_predict": kwargs.get("n_predict", 2048),
-            "temperature": kwargs.get("temperature", 0.2),
-            "stream": True,
-        }
-        if "json_schema" in kwargs:
-            payload["json_schema"] = kwargs["json_schema"]
+        payload = self._build_payload(prompt, stream=True, **kwargs)
 
         async with self.client.stream(
             "POST",
@@ -141,15 +234,28 @@ class LlamaCppProvider(AIProvider):
             async for line in response.aiter_lines():
                 if not line:
                     continue
+                # llama.cpp frames streamed chunks as server-sent events
+                if line.startswith("data: "):
+                    line = line[len("data: "):]
                 try:
                     data = json.loads(line)
                 except json.JSONDecodeError:
                     continue
 
+                if data.get("stop"):
+                    self._record_prompt_usage(data)
                 token = data.get("content") or data.get("token") or ""
                 if token:
                     yield token
 
+    def stats(self) -> Dict[str, int]:
+        evaluated = self.prompt_usage["prompt_tokens_evaluated"]
+        cached = self.prompt_usage["prompt_tokens_cached"]
+        return {
+            **self.prompt_usage,
+            "prompt_cache_ratio": round(cached / (evaluated + cached), 4) if evaluated + cached else 0.0,
+        }
+
 class AIClient:
     def __init__(self):
         # Persistent client for connection pooling
@@ -158,29 +264,263 @@ class AIClient:
             timeout=300.0
         )
         self.providers: Dict[str, AIProvider] = {}
+        # Concurrent identical prompts share one upstream request
+        self.inflight = SingleFlight()
+        # Memoized completions for deterministic prompts (L1 LRU in front of Redis)
+        self.response_cache = LLMResponseCache.from_env(redis_client)
         
         ollama_host = os.getenv("OLLAMA_HOST", "http://ollama:11434")
         self.providers["ollama"] = OllamaProvider(self.client, ollama_host)
         
         llama_cpp_host = os.getenv("LLAMA_CPP_HOST", "http://172.19.0.3:8080")
-        self.providers["llama-cpp"] = LlamaCppProvider(self.client, llama_cpp_host)
+        self.providers["llama-cpp"] = LlamaCppProvider(
+            self.client, llama_cpp_host, n_slots=int(os.getenv("LLAMA_CPP_PARALLEL", "4"))
+        )
         
         gemini_key = os.getenv("GEMINI_API_KEY")
         if gemini_key:
             self.providers["gemini"] = GeminiProvider(self.client, gemini_key)
 
+        self.max_batch_size = int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+        # llama.cpp only runs `--parallel N` slots; anything beyond that waits here, by priority,
+        # instead of queueing server-side against the 300s timeout.
+        max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {
+            "llama-cpp": AdaptiveConcurrencyLimiter(
+                "llama-cpp", initial_limit=int(os.getenv("LLAMA_CPP_PARALLEL", "4")), max_limit=max_concurrency
+            ),
+            "ollama": AdaptiveConcurrencyLimiter("ollama", initial_limit=4, max_limit=max_concurrency),
+            "gemini": AdaptiveConcurrencyLimiter("gemini", initial_limit=16, max_limit=max_concurrency),
+        }
+        # While a provider's breaker is open its calls go straight to the next one in this chain
+        self.fallback_order = [
+            name.strip() for name in os.getenv("LLM_PROVIDER_FALLBACK", "llama-cpp,ollama,gemini").split(",") if name.strip()
+        ]
+        self.breakers: Dict[str, CircuitBreaker] = {name: self._new_breaker(name) for name in self.providers}
+
     async def close(self):
         await self.client.aclose()
 
-    async def generate(self, prompt: str, provider: str = "llama-cpp", model: str = "lfm-thinking", **kwargs) -> str:
+    def _resolve_provider(self, provider: str) -> tuple[str, AIProvider]:
         p = self.providers.get(provider)
         if not p:
-            p = self.providers.get("llama-cpp")
             logger.warning(f"Provider {provider} not found. Falling back to llama-cpp")
-        
-        return await p.generate(prompt, model, **kwargs)
+            provider = "llama-cpp"
+            p = self.providers.get(provider)
+        return provider, p
+
+    @staticmethod
+    def _provider_kwargs(p: AIProvider, kwargs: dict) -> dict:
+        if p.supports_prompt_cache:
+            return kwargs
+        return {key: value for key, value in kwargs.items() if key not in {"prefix_key", "id_slot", "cache_prompt"}}
+
+    def _limiter(self, provider: str) -> AdaptiveConcurrencyLimiter:
+        if provider not in self.limiters:
+            self.limiters[provider] = AdaptiveConcurrencyLimiter(provider)
+        return self.limiters[provider]
+
+    @staticmethod
+    def _new_breaker(provider: str) -> CircuitBreaker:
+        return CircuitBreaker(
+            provider,
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "3")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = self._new_breaker(provider)
+        return self.breakers[provider]
+
+    def _route(self, provider: str) -> List[tuple[str, AIProvider]]:
+        """The requested provider first, then the rest of the fallback chain."""
+        names = [provider] + [name for name in self.fallback_order if name != provider]
+        return [(name, self.providers[name]) for name in names if name in self.providers]
+
+    async def _call_routed(
+        self,
+        provider: str,
+        priority: int,
+        invoke: Callable[[str, AIProvider], Awaitable],
+        weight: int = 1,
+    ):
+        """
+        Run `invoke` on the first provider whose breaker admits the call, failing over on
+        outages. Returns (provider that answered, result).
+        """
+        last_error: Exception | None = None
+        for name, p in self._route(provider):
+            breaker = self._breaker(name)
+            if not breaker.allow():
+                continue
+            if name != provider:
+                logger.warning(f"Routing {provider} call to {name}")
+            try:
+                async with self._limiter(name).slot(priority, weight=weight):
+                    result = await invoke(name, p)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as exc:
+                if not is_provider_failure(exc):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                last_error = exc
+                continue
+            breaker.record_success()
+            return name, result
+
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(f"No AI provider available for {provider}: circuits open")
+
+    async def _limited_stream(
+        self, provider: str, prompt: str, model: str, priority: int, served_by: List[str] | None = None, **kwargs
+    ) -> AsyncIterator[str]:
+        last_error: Exception | None = None
+        for name, p in self._route(provider):
+            breaker = self._breaker(name)
+            if not breaker.allow():
+                continue
+            if served_by is not None:
+                served_by.append(name)
+            started = False
+            try:
+                # Streams hold their slot until the last token but are not latency samples:
+                # their duration depends on how long the reader keeps consuming.
+                async with self._limiter(name).slot(priority, measure=False):
+                    async for chunk in p.stream_generate(prompt, model, **self._provider_kwargs(p, kwargs)):
+                        started = True
+                        yield chunk
+            except Exception as exc:
+                if not is_provider_failure(exc):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                # Tokens already reached the reader; switching providers mid-answer would garble it.
+                if started:
+                    raise
+                last_error = exc
+                continue
+            except BaseException:
+                # Reader went away (cancelled / generator closed); only a stream that produced
+                # tokens says anything about provider health.
+                if started:
+                    breaker.record_success()
+                else:
+                    breaker.release()
+                raise
+            breaker.record_success()
+            return
+
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(f"No AI provider available for {provider}: circuits open")
+
+    async def generate(
+        self,
+        prompt: str,
+        provider: str = "llama-cpp",
+        model: str = "lfm-thinking",
+        coalesce: bool = True,
+        use_cache: bool | None = None,
+        cache_ttl: int | None = None,
+        priority: RequestPriority | None = None,
+        **kwargs,
+    ) -> str:
+        provider, p = self._resolve_provider(provider)
+        priority = current_priority() if priority is None else priority
+        kwargs = self._provider_kwargs(p, kwargs)
+
+        cacheable = self.response_cache.is_cacheable(kwargs, use_cache)
+        if cacheable:
+            cache_key = self.response_cache.make_key(provider, model, prompt, kwargs)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        async def call() -> str:
+            answered, result = await self._call_routed(
+                provider, priority, lambda name, target: target.generate(prompt, model, **self._provider_kwargs(target, kwargs))
+            )
+            # A fail-over answer must not outlive the outage under the primary's key.
+            if cacheable and answered == provider and p.is_completion(result):
+                await self.response_cache.set(cache_key, result, ttl=cache_ttl)
+            return result
+
+        if not coalesce:
+            return await call()
+        return await self.inflight.do(request_key(provider, model, prompt, kwargs), call)
+
+    async def generate_batch(
+        self,
+        prompts: List[str],
+        provider: str = "llama-cpp",
+        model: str = "lfm-thinking",
+        use_cache: bool | None = None,
+        cache_ttl: int | None = None,
+        priority: RequestPriority | None = None,
+        max_batch_size: int | None = None,
+        **kwargs,
+    ) -> List[str]:
+        """Complete several prompts as one unit; results come back in input order."""
+        provider, p = self._resolve_provider(provider)
+        priority = current_priority() if priority is None else priority
+        kwargs = self._provider_kwargs(p, kwargs)
+        results: List[str | None] = [None] * len(prompts)
+
+        cacheable = self.response_cache.is_cacheable(kwargs, use_cache)
+        cache_keys: List[str] = []
+        if cacheable:
+            cache_keys = [self.response_cache.make_key(provider, model, prompt, kwargs) for prompt in prompts]
+            for index, key in enumerate(cache_keys):
+                results[index] = await self.response_cache.get(key)
+
+        pending = [index for index, result in enumerate(results) if result is None]
+        batch_size = max_batch_size or self.max_batch_size
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            answered, completions = await self._call_routed(
+                provider,
+                priority,
+                lambda name, target: target.generate_batch(
+                    [prompts[index] for index in chunk], model, **self._provider_kwargs(target, kwargs)
+                ),
+                weight=len(chunk),
+            )
+            for index, completion in zip(chunk, completions):
+                results[index] = completion
+                if cacheable and answered == provider and p.is_completion(completion):
+                    await self.response_cache.set(cache_keys[index], completion, ttl=cache_ttl)
+
+        return results
+
+    async def generate_json(
+        self,
+        prompt: str,
+        provider: str = "llama-cpp",
+        model: str = "lfm-thinking",
+        on_field: Callable[[str, Any], Any] | None = None,
+        **kwargs,
+    ) -> dict:
+        """
+        Complete `prompt` and decode the JSON object it returns.
+
+        With `on_field`, the completion is streamed instead: the callback (sync or async) runs
+        for every top-level field as soon as it closes, and generation stops at the root's
+        closing brace. An exception from the callback aborts the stream.
+        """
+        if on_field is not None:
+            result = {}
+            async for key, value in self.stream_json(prompt, provider, model, **kwargs):
+                outcome = on_field(key, value)
+                if inspect.isawaitable(outcome):
+                    await outcome
+                result[key] = value
+            return result
 
-    async def generate_json(self, prompt: str, provider: str = "llama-cpp", model: str = "lfm-thinking", **kwargs) -> dict:
         raw_text = await self.generate(prompt, provider, model, **kwargs)
         try:
             return json.loads(raw_text)
@@ -188,14 +528,82 @@ class AIClient:
             logger.error(f"Failed to decode JSON from AI response: {raw_text}")
             raise
 
-    async def stream_generate(self, prompt: str, provider: str = "llama-cpp", model: str = "lfm-thinking", **kwargs) -> AsyncIterator[str]:
-        p = self.providers.get(provider)
-        if not p:
-            p = self.providers.get("llama-cpp")
-            logger.warning(f"Provider {provider} not found. Falling back to llama-cpp")
+    async def stream_json(
+        self,
+        prompt: str,
+        provider: str = "llama-cpp",
+        model: str = "lfm-thinking",
+        use_cache: bool | None = None,
+        cache_ttl: int | None = None,
+        **kwargs,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (field, value) for each top-level member of the streamed JSON object as it closes."""
+        resolved, p = self._resolve_provider(provider)
+        cache_params = self._provider_kwargs(p, kwargs)
+        cacheable = self.response_cache.is_cacheable(cache_params, use_cache)
+        if cacheable:
+            cache_key = self.response_cache.make_key(resolved, model, prompt, cache_params)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                for item in json.loads(cached).items():
+                    yield item
+                return
+
+        parser = IncrementalJSONParser()
+        served_by: List[str] = []
+        async with aclosing(self.stream_generate(prompt, provider, model, served_by=served_by, **kwargs)) as chunks:
+            async for chunk in chunks:
+                for item in parser.feed(chunk):
+                    yield item
+                if parser.complete:
+                    # Leaving the stream closes the connection, which stops llama.cpp decoding
+                    # whatever the model would have appended after the object.
+                    break
+
+        if not parser.complete:
+            logger.error(f"JSON stream ended before the root object closed: {parser.text}")
+            raise json.JSONDecodeError("Unterminated JSON object in stream", parser.text, len(parser.text))
+        # `served_by` stays empty for a coalesced follower; the leading stream caches instead.
+        if cacheable and served_by[-1:] == [resolved]:
+            await self.response_cache.set(cache_key, parser.raw, ttl=cache_ttl)
+
+    async def stream_generate(
+        self,
+        prompt: str,
+        provider: str = "llama-cpp",
+        model: str = "lfm-thinking",
+        coalesce: bool = True,
+        priority: RequestPriority | None = None,
+        served_by: List[str] | None = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
+        """`served_by`, when given, receives each provider the stream is attempted on; the last one answered."""
+        provider, p = self._resolve_provider(provider)
+        priority = current_priority() if priority is None else priority
+        kwargs = self._provider_kwargs(p, kwargs)
+        if coalesce:
+            key = request_key(provider, model, prompt, kwargs)
+            chunks = self.inflight.stream(
+                key, lambda: self._limited_stream(provider, prompt, model, priority, served_by, **kwargs)
+            )
+        else:
+            chunks = self._limited_stream(provider, prompt, model, priority, served_by, **kwargs)
+
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if chunk:
+                    yield chunk
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            "coalescing": self.inflight.stats(),
+            "response_cache": self.response_cache.stats(),
+            "concurrency": {name: limiter.stats() for name, limiter in self.limiters.items()},
+            "prompt_cache": {name: p.stats() for name, p in self.providers.items() if p.supports_prompt_cache},
+            "circuit_breakers": {name: breaker.stats() for name, breaker in self.breakers.items()},
+        }
 
-        async for chunk in p.stream_generate(prompt, model, **kwargs):
-            if chunk:
-                yield chunk
+    def open_circuits(self) -> List[str]:
+        return [name for name, breaker in self.breakers.items() if breaker.state is CircuitState.OPEN]
 
 ai_client = AIClient()
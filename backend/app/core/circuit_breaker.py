@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+import time
+from enum import Enum
+from typing import Any, Dict
+
+import httpx
+
+logger = logging.getLogger("ai_client")
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when every provider that could serve a call has an open breaker."""
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Only outages count against a breaker: transport errors, timeouts and 5xx responses."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker shared by every coroutine in the process.
+
+    CLOSED passes calls through and counts consecutive failures; after `failure_threshold`
+    of them the breaker OPENs and rejects calls outright for `reset_timeout` seconds.
+    It then goes HALF_OPEN and lets `half_open_max_calls` probes through: one success
+    closes it again, a failure re-opens it for another full timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Reserve permission for one call; callers must report the outcome."""
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return True
+        if state is CircuitState.HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self._state is not CircuitState.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._probes = 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._trip()
+
+    def release(self):
+        """The call ended without telling us anything about provider health (e.g. cancelled)."""
+        if self._state is CircuitState.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _trip(self):
+        if self._state is not CircuitState.OPEN:
+            self.times_opened += 1
+            logger.warning(f"Circuit for {self.name} opened for {self.reset_timeout:.0f}s after {self._failures} failures")
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "state": state.value,
+            "consecutive_failures": self._failures,
+            "retry_in_seconds": round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            if state is CircuitState.OPEN
+            else 0.0,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
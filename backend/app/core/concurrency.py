@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import AsyncIterator, Deque, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger("ai_client")
+
+
+class RequestPriority(IntEnum):
+    """Lower value is served first when a provider is saturated."""
+
+    INTERACTIVE = 0  # chat
+    PREDICTION = 1   # /prediction/predict pipeline
+    BACKGROUND = 2   # InsightAgent / CriticAgent batches
+
+
+_current_priority: ContextVar[RequestPriority] = ContextVar("llm_priority", default=RequestPriority.PREDICTION)
+
+
+def current_priority() -> RequestPriority:
+    return _current_priority.get()
+
+
+@contextmanager
+def priority_scope(priority: RequestPriority) -> Iterator[None]:
+    """Tag every LLM call made inside the block (including spawned tasks) with `priority`."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Gradient-style adaptive limit on in-flight requests to one provider.
+
+    A slow EWMA of latency approximates the unloaded service time and a fast EWMA tracks
+    current latency. While current latency stays within `tolerance` of the baseline the
+    limit grows by ~sqrt(limit); once queueing inside the server inflates latency the
+    limit shrinks proportionally. Failures and timeouts back off multiplicatively.
+    Requests beyond the limit wait locally in a priority queue instead of piling up
+    inside llama.cpp and tripping its timeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        backoff: float = 0.75,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.in_flight = 0
+        self._short_latency: float | None = None
+        self._long_latency: float | None = None
+        self._waiters: List[Tuple[int, int, asyncio.Future, int]] = []
+        self._sequence = itertools.count()
+        self._wait_times: Deque[float] = deque(maxlen=512)
+        self.completed = 0
+        self.dropped = 0
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def _has_capacity(self, weight: int = 1) -> bool:
+        # A batch never needs more than the whole limit, otherwise it could wait forever.
+        return self.in_flight + min(weight, self.current_limit) <= self.current_limit
+
+    async def acquire(self, priority: int = RequestPriority.PREDICTION, weight: int = 1) -> float:
+        """Wait for `weight` slots (one per prompt in a batch); returns the seconds spent queued."""
+        started = time.perf_counter()
+        if self._has_capacity(weight) and not self._waiters:
+            self.in_flight += weight
+            self._wait_times.append(0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future, weight))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted at the same moment the caller gave up.
+                self.release(weight)
+            raise
+
+        waited = time.perf_counter() - started
+        self._wait_times.append(waited)
+        return waited
+
+    def release(self, weight: int = 1):
+        self.in_flight = max(0, self.in_flight - weight)
+        self._wake()
+
+    def _wake(self):
+        # Strict head-of-line: a waiting batch is not starved by smaller, lower-priority requests.
+        while self._waiters:
+            _, _, future, weight = self._waiters[0]
+            if future.done() or future.get_loop().is_closed():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._has_capacity(weight):
+                break
+            heapq.heappop(self._waiters)
+            self.in_flight += weight
+            future.set_result(None)
+
+    def on_success(self, latency: float):
+        self.completed += 1
+        if self._short_latency is None:
+            self._short_latency = self._long_latency = latency
+        else:
+            self._short_latency = 0.5 * self._short_latency + 0.5 * latency
+            self._long_latency = 0.95 * self._long_latency + 0.05 * latency
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_latency / max(self._short_latency, 1e-6)))
+        headroom = math.sqrt(self.limit) if self.in_flight + 1 >= self.current_limit / 2 else 0.0
+        target = self.limit * gradient + headroom
+        self.limit = min(self.max_limit, max(self.min_limit, (1 - self.smoothing) * self.limit + self.smoothing * target))
+        self._wake()
+
+    def on_failure(self):
+        self.dropped += 1
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        logger.warning(f"Concurrency limit for {self.name} reduced to {self.current_limit} after a failed request")
+
+    @asynccontextmanager
+    async def slot(self, priority: int = RequestPriority.PREDICTION, measure: bool = True, weight: int = 1) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block and feed its latency back into the limit."""
+        await self.acquire(priority, weight)
+        started = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.on_failure()
+            raise
+        else:
+            if measure:
+                self.on_success(time.perf_counter() - started)
+        finally:
+            self.release(weight)
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self._wait_times)
+        depth_by_priority = {priority.name.lower(): 0 for priority in RequestPriority}
+        for priority, _, future, _ in self._waiters:
+            if not future.done():
+                depth_by_priority[RequestPriority(priority).name.lower()] += 1
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": sum(depth_by_priority.values()),
+            "queue_depth_by_priority": depth_by_priority,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 4) if waits else 0.0,
+            "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 4) if waits else 0.0,
+            "latency_ewma_seconds": round(self._short_latency or 0.0, 4),
+            "completed": self.completed,
+            "dropped": self.dropped,
+        }
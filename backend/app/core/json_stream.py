@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Scans streamed text for one top-level JSON object and reports each member as it closes.
+
+    Only the root object's members are decoded (with `json.loads` on the member slice),
+    so a nested value such as `"mirror": {"score": .., "reasoning": ..}` is emitted the
+    moment its closing brace arrives. Text before the first `{` (chatty preambles) and
+    after the root closes is ignored; `complete` flips once the root object is closed.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.value: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._member_start = 0
+        self._member_emitted = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def raw(self) -> str:
+        """The root object's source text, once complete."""
+        if self._root_start is None or self._root_end is None:
+            return ""
+        return self.text[self._root_start:self._root_end]
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk; returns the (key, value) members completed by it, in order."""
+        if self.complete:
+            return []
+        self.text += chunk
+        completed: List[Tuple[str, Any]] = []
+
+        while self._pos < len(self.text) and not self.complete:
+            index = self._pos
+            char = self.text[index]
+            self._pos += 1
+
+            if self._root_start is None:
+                if char == "{":
+                    self._root_start = index
+                    self._member_start = index + 1
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and not self._member_emitted:
+                    # A nested object/array member just closed
+                    self._emit(index + 1, completed)
+                elif self._depth == 0:
+                    if not self._member_emitted:
+                        self._emit(index, completed)
+                    self._root_end = index + 1
+                    self.complete = True
+            elif char == "," and self._depth == 1:
+                if not self._member_emitted:
+                    self._emit(index, completed)
+                self._member_start = index + 1
+                self._member_emitted = False
+
+        return completed
+
+    def _emit(self, end: int, completed: List[Tuple[str, Any]]):
+        member = self.text[self._member_start:end].strip()
+        self._member_emitted = True
+        if not member:
+            return
+        key, value = next(iter(json.loads("{" + member + "}").items()))
+        self.value[key] = value
+        completed.append((key, value))
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.serialization import serializer
+
+logger = logging.getLogger("ai_client")
+
+DEFAULT_TEMPERATURE = 0.2
+# Sampling at or below this temperature is treated as reproducible enough to memoize.
+DETERMINISTIC_TEMPERATURE = 0.2
+
+
+class LLMResponseCache:
+    """
+    Content-addressed completion cache: a bounded in-process LRU (L1) in front of Redis (L2).
+    `redis_client` is an asyncio client; L2 entries use the shared serializer.
+
+    Keys hash provider + model + prompt + temperature + json_schema (+ n_predict), so a
+    byte-identical prompt from a fixed-prompt agent is served without touching the model.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        default_ttl: int = 300,
+        enabled: bool = True,
+        prefix: str = "llm_cache",
+    ):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self.prefix = prefix
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, redis_client: Any = None) -> "LLMResponseCache":
+        return cls(
+            redis_client=redis_client,
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            default_ttl=int(os.getenv("LLM_CACHE_TTL_SECONDS", "300")),
+            enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() in {"1", "true", "yes", "on"},
+        )
+
+    def is_cacheable(self, params: Dict[str, Any], use_cache: Optional[bool] = None) -> bool:
+        """`use_cache` forces (True) or bypasses (False); by default only low-temperature calls are cached."""
+        if not self.enabled or use_cache is False:
+            return False
+        if use_cache:
+            return True
+        return float(params.get("temperature", DEFAULT_TEMPERATURE)) <= DETERMINISTIC_TEMPERATURE
+
+    def make_key(self, provider: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        material = json.dumps(
+            {
+                "provider": provider,
+                "model": model,
+                "prompt": prompt,
+                "temperature": float(params.get("temperature", DEFAULT_TEMPERATURE)),
+                "json_schema": params.get("json_schema"),
+                "n_predict": params.get("n_predict"),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return f"{self.prefix}:{hashlib.sha256(material.encode()).hexdigest()}"
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.l1_hits += 1
+                return value
+            self._evict(key)
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception as exc:
+                logger.warning(f"LLM cache read failed: {exc}")
+                raw = None
+            if raw:
+                payload = serializer.loads(raw)
+                if payload["expires_at"] > now:
+                    self._remember(key, payload["response"], payload["expires_at"])
+                    self.l2_hits += 1
+                    return payload["response"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None):
+        ttl = ttl or self.default_ttl
+        expires_at = time.time() + ttl
+        self._remember(key, value, expires_at)
+
+        if self.redis is not None:
+            try:
+                payload = serializer.dumps({"response": value, "expires_at": expires_at})
+                await self.redis.setex(key, ttl, payload)
+            except Exception as exc:
+                logger.warning(f"LLM cache write failed: {exc}")
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (expires_at, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+            self.evictions += 1
+
+    def _evict(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value.encode())
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+
+logger = logging.getLogger("alpha_insights.serialization")
+
+# Every encoded payload starts with FORMAT_VERSION followed by a one-byte codec tag.
+# Neither byte can start a JSON document, so anything else is a legacy `json.dumps` entry.
+FORMAT_VERSION = 0x01
+CODEC_JSON = ord("j")
+CODEC_MSGPACK = ord("m")
+CODEC_MSGPACK_ZSTD = ord("z")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+class Serializer:
+    """
+    Versioned codec for cache entries, task events and Celery results.
+
+    `codec` is "json" (orjson), "msgpack", or "msgpack+zstd" (payloads above
+    `compress_threshold` bytes are zstd-compressed). msgpack and zstandard are optional;
+    without them the serializer falls back to orjson. Reads accept every codec plus
+    untagged legacy JSON, so entries written before a rollout stay readable.
+    """
+
+    def __init__(self, codec: str = "json", compress_threshold: int = 1024, zstd_level: int = 3):
+        self.compress_threshold = compress_threshold
+        self._msgpack = None
+        self._compressor = None
+        self._decompressor = None
+
+        if codec in {"msgpack", "msgpack+zstd"}:
+            try:
+                import msgpack
+
+                self._msgpack = msgpack
+            except ImportError:
+                logger.warning("msgpack is not installed; using orjson")
+                codec = "json"
+        if codec == "msgpack+zstd":
+            try:
+                import zstandard
+
+                self._compressor = zstandard.ZstdCompressor(level=zstd_level)
+                self._decompressor = zstandard.ZstdDecompressor()
+            except ImportError:
+                logger.warning("zstandard is not installed; storing msgpack uncompressed")
+                codec = "msgpack"
+        self.codec = codec
+
+    @classmethod
+    def from_env(cls) -> "Serializer":
+        return cls(
+            codec=os.getenv("SERIALIZER_CODEC", "json"),
+            compress_threshold=int(os.getenv("SERIALIZER_COMPRESS_THRESHOLD", "1024")),
+        )
+
+    def dumps(self, value: Any) -> bytes:
+        if self.codec == "json":
+            return bytes((FORMAT_VERSION, CODEC_JSON)) + orjson.dumps(value, default=_default)
+
+        packed = self._msgpack.packb(value, default=_default, use_bin_type=True)
+        if self._compressor is not None and len(packed) >= self.compress_threshold:
+            return bytes((FORMAT_VERSION, CODEC_MSGPACK_ZSTD)) + self._compressor.compress(packed)
+        return bytes((FORMAT_VERSION, CODEC_MSGPACK)) + packed
+
+    def loads(self, data: bytes | str) -> Any:
+        if isinstance(data, str):
+            if not data.startswith(chr(FORMAT_VERSION)):
+                return json.loads(data)
+            # A decode_responses=True client (the mock Redis) hands back the tagged payload
+            # as text; undo its UTF-8 decode to recover the original bytes.
+            data = data.encode("utf-8", "surrogateescape")
+        if len(data) < 2 or data[0] != FORMAT_VERSION:
+            return orjson.loads(data)
+
+        codec, body = data[1], data[2:]
+        if codec == CODEC_JSON:
+            return orjson.loads(body)
+        if codec in (CODEC_MSGPACK, CODEC_MSGPACK_ZSTD):
+            msgpack = self._msgpack or _import_optional("msgpack")
+            if codec == CODEC_MSGPACK_ZSTD:
+                decompressor = self._decompressor or _import_optional("zstandard").ZstdDecompressor()
+                body = decompressor.decompress(body)
+            return msgpack.unpackb(body, raw=False)
+        raise ValueError(f"Unknown serializer codec tag {codec!r}")
+
+
+def _import_optional(name: str):
+    try:
+        return __import__(name)
+    except ImportError as exc:
+        raise ValueError(f"Payload needs the optional '{name}' package to decode") from exc
+
+
+serializer = Serializer.from_env()
+
+
+def register_celery_serializer(name: str = "alpha") -> str:
+    """Expose the shared serializer to kombu so Celery results use the same codec."""
+    from kombu.serialization import register
+
+    register(
+        name,
+        serializer.dumps,
+        serializer.loads,
+        content_type="application/x-alpha-insights",
+        content_encoding="binary",
+    )
+    return name
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("ai_client")
+
+
+def request_key(provider: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+    """Stable hash of everything that determines an upstream completion."""
+    material = json.dumps(
+        {"provider": provider, "model": model, "prompt": prompt, "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class _Flight:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class _StreamFlight(_Flight):
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__(loop)
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one upstream request.
+
+    The first caller for a key starts the work in its own task; callers that arrive
+    while it is running await the same task (or, for streams, replay the chunks
+    buffered so far and then follow the live feed). The upstream task is only
+    cancelled once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, table: Dict[str, Any], key: str):
+        flight = table.get(key)
+        # Celery tasks run each job in a fresh event loop; a flight owned by another
+        # loop can never be awaited from this one.
+        if flight is not None and flight.loop is not asyncio.get_running_loop():
+            return None
+        return flight
+
+    def _forget(self, table: Dict[str, Any], key: str, flight: _Flight):
+        if table.get(key) is flight:
+            table.pop(key, None)
+
+    def _release(self, table: Dict[str, Any], key: str, flight: _Flight):
+        flight.waiters -= 1
+        if flight.waiters <= 0 and flight.task and not flight.task.done():
+            flight.task.cancel()
+            self._forget(table, key, flight)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._lookup(self._calls, key)
+        if flight is None:
+            self.misses += 1
+            flight = _Flight(asyncio.get_running_loop())
+            flight.task = asyncio.create_task(factory())
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+            self._calls[key] = flight
+        else:
+            self.hits += 1
+            logger.debug(f"Coalesced in-flight request {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._release(self._calls, key, flight)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        flight = self._lookup(self._streams, key)
+        if flight is None:
+            self.misses += 1
+            flight = _StreamFlight(asyncio.get_running_loop())
+            flight.task = asyncio.create_task(self._pump(key, flight, factory))
+            self._streams[key] = flight
+        else:
+            self.hits += 1
+            logger.debug(f"Attached to in-flight stream {key[:12]}")
+
+        flight.waiters += 1
+        position = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: position < len(flight.chunks) or flight.done)
+                    pending = flight.chunks[position:]
+                    finished = flight.done
+                for chunk in pending:
+                    yield chunk
+                position += len(pending)
+                if finished and position >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self._release(self._streams, key, flight)
+
+    async def _pump(self, key: str, flight: _StreamFlight, factory: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as exc:
+            flight.error = exc
+        finally:
+            self._forget(self._streams, key, flight)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, JSON, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from pgvector.sqlalchemy import Vector
 import uuid
@@ -100,3 +100,25 @@ class NewsDocument(Base):
     
     # pgvector column for semantic search over news
     embedding = Column(Vector(1024), nullable=True)
+
+class ForecastCacheEntry(Base):
+    __tablename__ = "forecast_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    question = Column(Text)
+    model = Column(String, nullable=True)
+    result = Column(JSON)  # ForecastResult.dict()
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # bge-m3 question embedding; HNSW keeps nearest-question lookups sub-linear
+    embedding = Column(Vector(1024))
+
+    __table_args__ = (
+        Index(
+            "ix_forecast_cache_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
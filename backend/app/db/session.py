@@ -20,6 +20,8 @@ engine = create_async_engine(
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+# Name the agents import the session factory under
+async_session = AsyncSessionLocal
 
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -1,3 +1,3 @@
-from app.intelligence.domain.swarm import IntelligenceDirectorate
+from app.intelligence.domain.swarm import DerivativesFlowAgent, GeopoliticalAgent, IntelligenceDirectorate, SupplyChainAgent
 
-__all__ = ["IntelligenceDirectorate"]
+__all__ = ["DerivativesFlowAgent", "GeopoliticalAgent", "IntelligenceDirectorate", "SupplyChainAgent"]
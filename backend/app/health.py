@@ -1,7 +1,7 @@
 import os
 import httpx
 from redis import Redis
-from app.cache import r as redis_client
+from app.cache import ar as redis_client
 
 from app.db.session import engine
 from sqlalchemy import text
@@ -14,9 +14,9 @@ async def check_ollama(host: str) -> bool:
     except:
         return False
 
-def check_redis() -> bool:
+async def check_redis() -> bool:
     try:
-        return redis_client.ping()
+        return await redis_client.ping()
     except:
         return False
 
@@ -33,7 +33,7 @@ async def get_system_health():
     
     return {
         "ollama": await check_ollama(ollama_host),
-        "redis": check_redis(),
+        "redis": await check_redis(),
         "database": await check_db(),
         "gemini_configured": bool(os.getenv("GEMINI_API_KEY"))
     }
@@ -1,82 +1,292 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List
 
 from app.models import ChatRequest, ForecastResult
 from app.intelligence.application.forecasting import IntelligenceService
+from app.intelligence.application.pipeline import Stage, StageError, StageGraph
 from app.intelligence.domain.critic import CriticService
+from app.intelligence.domain.swarm import IntelligenceDirectorate
+
+logger = logging.getLogger("alpha_insights.engine")
+
+_NO_RESULT = object()
+
+
+class TierLatency:
+    """Rolling window of successful call latencies for one model tier."""
+
+    def __init__(self, window: int = 50):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
 
 
 class FallbackModelOrchestrator:
-    def __init__(self, primary: str = "lfm-thinking", secondaries: list[str] | None = None):
+    """
+    Runs a call against model tiers in order.
+
+    In hedged mode (default) the next tier is started in parallel once the current one has
+    been running longer than its recent `hedge_percentile` latency; the first valid result
+    wins and the other attempts are cancelled. A tier is only hedged onto a different
+    backend (`backends`, model -> serving backend, default llama-cpp): a second request to
+    the server that is already slow would just add load to it, so same-backend tiers fall
+    back sequentially. Latency windows are shared across instances because Celery builds a
+    fresh engine per task.
+    """
+
+    shared_latency: Dict[str, TierLatency] = {}
+
+    def __init__(
+        self,
+        primary: str = "lfm-thinking",
+        secondaries: list[str] | None = None,
+        hedge: bool = True,
+        hedge_percentile: float = 0.9,
+        min_samples: int = 5,
+        default_hedge_delay: float | None = None,
+        latency: Dict[str, TierLatency] | None = None,
+        backends: Dict[str, str] | None = None,
+    ):
         self.tiers = [primary] + (secondaries or ["lfm-40b"])
+        # e.g. FALLBACK_TIER_BACKENDS={"lfm-40b": "ollama"}
+        self.backends = backends if backends is not None else json.loads(os.getenv("FALLBACK_TIER_BACKENDS") or "{}")
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.default_hedge_delay = (
+            default_hedge_delay if default_hedge_delay is not None else float(os.getenv("FALLBACK_HEDGE_DELAY_SECONDS", "60"))
+        )
+        self.latency = self.shared_latency if latency is None else latency
+        self.hedges_started = 0
+        self.hedge_wins = 0
+
+    def backend_for(self, model: str) -> str:
+        return self.backends.get(model, "llama-cpp")
+
+    def timeout_for(self, model: str) -> float:
+        return 300 if model == self.tiers[0] else 30
+
+    def hedge_delay(self, model: str) -> float:
+        tracker = self.latency.get(model)
+        if tracker is None or len(tracker.samples) < self.min_samples:
+            return min(self.default_hedge_delay, self.timeout_for(model))
+        return min(max(tracker.percentile(self.hedge_percentile), 0.5), self.timeout_for(model))
+
+    async def _attempt(self, func, model: str, attempt: int, args, kwargs):
+        logger.info(
+            f"Fallback attempt {attempt} on {model}",
+            extra={"event": "fallback_attempt_started", "model": model, "attempt": attempt},
+        )
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(func(*args, **{**kwargs, "model": model}), timeout=self.timeout_for(model))
+        except asyncio.TimeoutError:
+            error = Exception(f"Model {model} timed out")
+            logger.warning(
+                f"Fallback attempt {attempt} on {model} timed out",
+                extra={"event": "fallback_attempt_failed", "model": model, "attempt": attempt, "error": str(error)},
+            )
+            raise error
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(
+                f"Fallback attempt {attempt} on {model} failed: {exc}",
+                extra={"event": "fallback_attempt_failed", "model": model, "attempt": attempt, "error": str(exc)},
+            )
+            raise
+        self.latency.setdefault(model, TierLatency()).record(time.perf_counter() - started)
+        return result
+
+    async def run_with_fallback(self, func, *args, validator: Callable[[Any], bool] | None = None, **kwargs):
+        if not self.hedge:
+            return await self._run_sequential(func, args, kwargs, validator)
+
+        remaining = list(enumerate(self.tiers, start=1))
+        running: Dict[asyncio.Task, str] = {}
+        last_error: Exception | None = None
+        fallback_result: Any = _NO_RESULT
+        newest_model = self.tiers[0]
 
-    async def run_with_fallback(self, func, *args, **kwargs):
+        def launch():
+            nonlocal newest_model
+            attempt, model = remaining.pop(0)
+            newest_model = model
+            running[asyncio.create_task(self._attempt(func, model, attempt, args, kwargs))] = model
+
+        def can_hedge() -> bool:
+            busy = {self.backend_for(model) for model in running.values()}
+            return bool(remaining) and self.backend_for(remaining[0][1]) not in busy
+
+        launch()
+        try:
+            while running:
+                wait_for = self.hedge_delay(newest_model) if can_hedge() else None
+                done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges_started += 1
+                    logger.info(
+                        f"Hedging {newest_model} with {remaining[0][1]} after {wait_for:.1f}s",
+                        extra={"event": "fallback_hedge_started", "model": remaining[0][1], "attempt": remaining[0][0]},
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    model = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as exc:
+                        last_error = exc
+                        continue
+                    if validator is None or validator(result):
+                        if model != self.tiers[0]:
+                            self.hedge_wins += 1
+                        return result
+                    if fallback_result is _NO_RESULT:
+                        fallback_result = result
+
+                if not running and remaining:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        if fallback_result is not _NO_RESULT:
+            return fallback_result
+        raise last_error
+
+    async def _run_sequential(self, func, args, kwargs, validator):
         last_error = None
-        for model in self.tiers:
+        fallback_result: Any = _NO_RESULT
+        for attempt, model in enumerate(self.tiers, start=1):
             try:
-                kwargs["model"] = model
-                timeout = 300 if model == self.tiers[0] else 30
-                return await asyncio.wait_for(func(*args, **kwargs), timeout=timeout)
-            except asyncio.TimeoutError:
-                last_error = Exception(f"Model {model} timed out")
-                continue
+                result = await self._attempt(func, model, attempt, args, kwargs)
             except Exception as exc:
                 last_error = exc
                 continue
+            if validator is None or validator(result):
+                return result
+            if fallback_result is _NO_RESULT:
+                fallback_result = result
 
+        if fallback_result is not _NO_RESULT:
+            return fallback_result
         raise last_error
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedges_started": self.hedges_started,
+            "hedge_wins": self.hedge_wins,
+            "tiers": {
+                model: {
+                    "samples": len(tracker.samples),
+                    "p50_seconds": tracker.percentile(0.5),
+                    "p90_seconds": tracker.percentile(0.9),
+                }
+                for model, tracker in self.latency.items()
+            },
+        }
+
+
+def is_valid_forecast(result) -> bool:
+    """generate_forecast_with_reasoning degrades to a neutral 0.5 'Error: ...' result instead of raising."""
+    _, reasoning, _ = result
+    return not str(reasoning).startswith("Error:")
+
+
+def with_correlations(reasoning: str, correlations) -> str:
+    if correlations:
+        reasoning += f"\n\n**Secondary Correlations Discovered:**\n{correlations}"
+    return reasoning
+
 
 class IntelligenceMirrorEngine:
     def __init__(self):
         self.intelligence_service = IntelligenceService()
         self.critic_service = CriticService()
         self.orchestrator = FallbackModelOrchestrator()
+        # Seconds per DAG stage; the forecast budget covers the primary tier plus one hedge/fallback.
+        self.stage_timeouts = {
+            "search": float(os.getenv("STAGE_TIMEOUT_SEARCH", "30")),
+            "correlations": float(os.getenv("STAGE_TIMEOUT_CORRELATIONS", "120")),
+            "forecast": float(os.getenv("STAGE_TIMEOUT_FORECAST", "360")),
+            "critic": float(os.getenv("STAGE_TIMEOUT_CRITIC", "120")),
+        }
+        self.last_trace: list[dict] = []
+        self.batch_search_concurrency = int(os.getenv("BATCH_SEARCH_CONCURRENCY", "8"))
+        # Questions synthesized/critiqued at once in a batch; sized like the llama.cpp limiter
+        # so a question's timeout is not spent queueing behind the rest of the watchlist.
+        self.batch_analysis_concurrency = int(
+            os.getenv("BATCH_ANALYSIS_CONCURRENCY", os.getenv("LLAMA_CPP_PARALLEL", "4"))
+        )
 
     async def close(self):
         await self.intelligence_service.close()
 
-    async def run_analysis(self, question: str, model: str = "lfm-thinking", status_callback=None) -> ForecastResult:
-        try:
-            if status_callback:
-                await status_callback("Searching news and physical signals...")
+    def build_pipeline(self, question: str) -> StageGraph:
+        """
+        news/physical/correlations start immediately; forecast waits only for sources and
+        critic for the forecast plus correlations.
+        """
+        service = self.intelligence_service
 
-            async with asyncio.TaskGroup() as task_group:
-                news_task = task_group.create_task(self.intelligence_service.search_market_news(question))
-                physical_task = task_group.create_task(self.intelligence_service.search_physical_data(question))
+        async def forecast(inputs):
+            return await self.orchestrator.run_with_fallback(
+                service.generate_forecast_with_reasoning,
+                question,
+                inputs["news"] + inputs["physical"],
+                validator=is_valid_forecast,
+            )
 
-            all_sources = news_task.result() + physical_task.result()
+        async def critic(inputs):
+            avg_score, reasoning, _ = inputs["forecast"]
+            reasoning = with_correlations(reasoning, inputs["correlations"])
+            return await self.critic_service.critique_forecast(question, inputs["news"] + inputs["physical"], avg_score, reasoning)
 
-            if status_callback:
-                await status_callback("Generating forecast and auditing sources...")
-
-            async with asyncio.TaskGroup() as task_group:
-                forecast_task = task_group.create_task(
-                    self.orchestrator.run_with_fallback(
-                        self.intelligence_service.generate_forecast_with_reasoning,
-                        question,
-                        all_sources,
-                    )
-                )
-                correlation_task = task_group.create_task(
-                    self.intelligence_service.search_semantic_correlations(question)
-                )
+        return StageGraph([
+            Stage("news", lambda _: service.search_market_news(question), timeout=self.stage_timeouts["search"],
+                  fallback=[], status="Searching news and physical signals..."),
+            Stage("physical", lambda _: service.search_physical_data(question), timeout=self.stage_timeouts["search"], fallback=[]),
+            Stage("correlations", lambda _: service.search_semantic_correlations(question),
+                  timeout=self.stage_timeouts["correlations"], fallback=[]),
+            Stage("forecast", forecast, deps=("news", "physical"), timeout=self.stage_timeouts["forecast"],
+                  status="Generating forecast and auditing sources..."),
+            # Optional: a failed audit must not discard the forecast it was auditing.
+            Stage("critic", critic, deps=("news", "physical", "forecast", "correlations"),
+                  timeout=self.stage_timeouts["critic"], fallback=None, status="Running intelligence audit..."),
+        ])
 
-            avg_score, reasoning, analysis = forecast_task.result()
-            correlations = correlation_task.result()
-            if correlations:
-                reasoning += f"\n\n**Secondary Correlations Discovered:**\n{correlations}"
+    async def run_analysis(self, question: str, model: str = "lfm-thinking", status_callback=None) -> ForecastResult:
+        try:
+            async def announce(stage: Stage):
+                if status_callback:
+                    await status_callback(stage.status)
 
-            if status_callback:
-                await status_callback("Running intelligence audit...")
+            pipeline = await self.build_pipeline(question).run(on_stage_start=announce)
+            self.last_trace = pipeline.trace_dicts()
+            results = pipeline.results
 
-            critic_result = await self.critic_service.critique_forecast(
-                question,
-                all_sources,
-                avg_score,
-                reasoning,
-            )
+            all_sources = results["news"] + results["physical"]
+            avg_score, reasoning, analysis = results["forecast"]
+            reasoning = with_correlations(reasoning, results["correlations"])
+            critic_result = results["critic"] or self.critic_service.unavailable(avg_score, "audit timed out or failed")
 
             if status_callback:
                 await status_callback("Analysis complete.")
@@ -92,15 +302,120 @@ class IntelligenceMirrorEngine:
                 critue_data=critic_result,
             )
         except Exception as exc:
-            return ForecastResult(
-                search_query=question,
-                news_summary=[],
-                initial_forecast=0,
-                critique="Error",
-                adjusted_forecast=0,
-                reasoning=str(exc),
-                error="unknown_error",
+            self.last_trace = exc.run.trace_dicts() if isinstance(exc, StageError) and exc.run else []
+            return self._error_result(question, exc)
+
+    async def run_batch_analysis(
+        self,
+        questions: List[str],
+        model: str = "lfm-thinking",
+        on_result: Callable[[int, str, ForecastResult], Awaitable[None]] | None = None,
+        status_callback=None,
+    ) -> Dict[str, ForecastResult]:
+        """
+        Analyze a whole watchlist as one job.
+
+        Each distinct question is searched once; correlations and swarm agent reports for the
+        whole batch go out as batched LLM submissions. Synthesis and critique then run per
+        question, and each result is handed to `on_result` as soon as it is ready.
+        """
+        service = self.intelligence_service
+        unique = list(dict.fromkeys(question.strip() for question in questions if question and question.strip()))
+        search_limit = asyncio.Semaphore(self.batch_search_concurrency)
+
+        async def collect_sources(question: str):
+            async with search_limit:
+                news, physical = await asyncio.gather(
+                    service.search_market_news(question), service.search_physical_data(question)
+                )
+            return news + physical
+
+        if status_callback:
+            await status_callback(f"Searching sources for {len(unique)} questions...")
+        sources_by_question, correlations_by_question = await asyncio.gather(
+            asyncio.gather(*[collect_sources(question) for question in unique]),
+            service.search_semantic_correlations_batch(unique),
+        )
+
+        if status_callback:
+            await status_callback("Running analyst swarm for the batch...")
+        directorate = IntelligenceDirectorate()
+        try:
+            reports_by_question = await directorate.agent_reports_batch(list(zip(unique, sources_by_question)))
+        except Exception as exc:
+            logger.warning(f"Batched swarm failed, using per-question forecasts: {exc}")
+            reports_by_question = [None] * len(unique)
+
+        results: Dict[str, ForecastResult] = {}
+        analysis_limit = asyncio.Semaphore(self.batch_analysis_concurrency)
+
+        async def analyze(question: str, sources, agent_reports, correlations) -> ForecastResult:
+            forecast = None
+            if agent_reports is not None:
+                try:
+                    forecast = await directorate.synthesize(question, agent_reports)
+                except Exception as exc:
+                    logger.warning(f"Synthesis failed for '{question}', falling back: {exc}")
+            if forecast is None or not is_valid_forecast(forecast):
+                forecast = await self.orchestrator.run_with_fallback(
+                    service.generate_forecast_with_reasoning, question, sources, validator=is_valid_forecast
+                )
+            avg_score, reasoning, analysis = forecast
+            reasoning = with_correlations(reasoning, correlations)
+            try:
+                critic_result = await asyncio.wait_for(
+                    self.critic_service.critique_forecast(question, sources, avg_score, reasoning),
+                    timeout=self.stage_timeouts["critic"],
+                )
+            except Exception as exc:
+                logger.warning(f"Critic failed for '{question}', keeping the forecast: {exc!r}")
+                critic_result = self.critic_service.unavailable(avg_score, "audit timed out or failed")
+            return ForecastResult.from_analysis(
+                question=question,
+                all_sources=sources,
+                avg_score=avg_score,
+                critique=critic_result.critique,
+                adj_prob=critic_result.score,
+                reasoning=reasoning,
+                analysis=analysis,
+                critue_data=critic_result,
             )
 
+        async def finish(index: int, question: str, *inputs):
+            # The budget starts once the question's turn comes, not while it waits for one.
+            async with analysis_limit:
+                try:
+                    result = await asyncio.wait_for(
+                        analyze(question, *inputs), timeout=self.stage_timeouts["forecast"] + self.stage_timeouts["critic"]
+                    )
+                except Exception as exc:
+                    result = self._error_result(question, exc)
+            results[question] = result
+            if on_result:
+                await on_result(index, question, result)
+
+        await asyncio.gather(*[
+            finish(index, question, sources, reports, correlations)
+            for index, (question, sources, reports, correlations) in enumerate(
+                zip(unique, sources_by_question, reports_by_question, correlations_by_question)
+            )
+        ])
+
+        if status_callback:
+            await status_callback("Batch analysis complete.")
+        return results
+
+    @staticmethod
+    def _error_result(question: str, exc: Exception) -> ForecastResult:
+        return ForecastResult(
+            search_query=question,
+            news_summary=[],
+            initial_forecast=0,
+            critique="Error",
+            adjusted_forecast=0,
+            reasoning=str(exc),
+            error="unknown_error",
+        )
+
     async def chat_with_model(self, req: ChatRequest) -> str:
         return await self.orchestrator.run_with_fallback(self.intelligence_service.chat_with_model, req)
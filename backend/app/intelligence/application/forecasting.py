@@ -8,6 +8,7 @@ from app.intelligence.infrastructure.llm import generate_json, resolve_model_pro
 from app.intelligence.infrastructure.physical_data import MockPhysicalDataProvider, PhysicalDataInterface
 from app.intelligence.infrastructure.search import DuckDuckGoSearchGateway
 from app.core.ai_client import ai_client
+from app.core.concurrency import RequestPriority
 
 
 class IntelligenceService:
@@ -102,18 +103,47 @@ class IntelligenceService:
         except Exception:
             return []
 
-    async def chat_with_model(self, req: "ChatRequest", model: str = None) -> str:
+    async def search_semantic_correlations_batch(self, questions: List[str], model: str = "lfm-thinking") -> List[List[str]]:
+        """`search_semantic_correlations` for many questions in one batched LLM submission."""
+        prompts = [f"[INST] TASK: Identify 3-5 semantically linked markets for: {question} [/INST]" for question in questions]
+        resolved_model, provider = resolve_model_provider(model)
+        try:
+            raw_results = await ai_client.generate_batch(prompts, provider=provider, model=resolved_model)
+        except Exception:
+            return [[] for _ in questions]
+
+        correlations: List[List[str]] = []
+        for raw_text in raw_results:
+            try:
+                result = json.loads(raw_text)
+            except (TypeError, json.JSONDecodeError):
+                result = None
+            if isinstance(result, list):
+                correlations.append(result)
+            elif isinstance(result, dict):
+                correlations.append([json.dumps(result)])
+            else:
+                correlations.append([])
+        return correlations
+
+    async def chat_with_model(self, req: "ChatRequest", model: str = None, priority: RequestPriority = RequestPriority.INTERACTIVE) -> str:
         model = model or req.model
         prompt = self._build_chat_prompt(req)
         chunks: list[str] = []
-        async for chunk in self.ai_stream(prompt, model=model):
+        async for chunk in self.ai_stream(prompt, model=model, priority=priority):
             chunks.append(chunk)
         return "".join(chunks).strip()
 
-    async def ai_stream(self, prompt: str, model: str, provider: str | None = None) -> AsyncIterator[str]:
+    async def ai_stream(
+        self,
+        prompt: str,
+        model: str,
+        provider: str | None = None,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> AsyncIterator[str]:
         resolved_model, resolved_provider = resolve_model_provider(model)
         stream_provider = provider or resolved_provider
-        async for chunk in ai_client.stream_generate(prompt, provider=stream_provider, model=resolved_model):
+        async for chunk in ai_client.stream_generate(prompt, provider=stream_provider, model=resolved_model, priority=priority):
             yield chunk
 
     def _build_chat_prompt(self, req: "ChatRequest") -> str:
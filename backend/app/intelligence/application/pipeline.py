@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("alpha_insights.engine")
+
+_REQUIRED = object()
+
+
+class StageError(Exception):
+    """A required stage failed or timed out; the remaining stages were cancelled."""
+
+    def __init__(self, stage: str, cause: BaseException, run: Optional["PipelineRun"] = None):
+        super().__init__(f"Stage '{stage}' failed: {cause}")
+        self.stage = stage
+        self.cause = cause
+        # The partial run, so callers can still trace where the time went
+        self.run = run
+
+
+@dataclass
+class Stage:
+    """
+    One node of the analysis DAG.
+
+    `run` receives a dict of its dependencies' results keyed by stage name. A stage with a
+    `fallback` is optional: on failure or timeout its dependents get the fallback instead.
+    """
+
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: Sequence[str] = ()
+    timeout: Optional[float] = None
+    fallback: Any = _REQUIRED
+    status: Optional[str] = None
+
+    @property
+    def required(self) -> bool:
+        return self.fallback is _REQUIRED
+
+
+@dataclass
+class StageTiming:
+    name: str
+    started_at: float
+    ended_at: float = 0.0
+    outcome: str = "running"
+
+    @property
+    def duration(self) -> float:
+        return self.ended_at - self.started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "start": round(self.started_at, 4),
+            "end": round(self.ended_at, 4),
+            "duration": round(self.duration, 4),
+            "outcome": self.outcome,
+        }
+
+
+@dataclass
+class PipelineRun:
+    results: Dict[str, Any] = field(default_factory=dict)
+    trace: List[StageTiming] = field(default_factory=list)
+
+    def trace_dicts(self) -> List[Dict[str, Any]]:
+        return [timing.as_dict() for timing in self.trace]
+
+
+class StageGraph:
+    """Runs stages as soon as their dependencies resolve; trace times are relative to the run start."""
+
+    def __init__(self, stages: Sequence[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        self._validate()
+
+    def _validate(self):
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages {missing}")
+
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage graph has a cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self, on_stage_start: Callable[[Stage], Awaitable[None]] | None = None) -> PipelineRun:
+        run = PipelineRun()
+        origin = time.perf_counter()
+        running: Dict[asyncio.Task, StageTiming] = {}
+        waiting = dict(self.stages)
+
+        async def execute(stage: Stage, inputs: Dict[str, Any]):
+            if on_stage_start is not None and stage.status:
+                await on_stage_start(stage)
+            return await asyncio.wait_for(stage.run(inputs), timeout=stage.timeout)
+
+        def launch_ready():
+            for name, stage in list(waiting.items()):
+                if all(dep in run.results for dep in stage.deps):
+                    del waiting[name]
+                    timing = StageTiming(name, time.perf_counter() - origin)
+                    run.trace.append(timing)
+                    inputs = {dep: run.results[dep] for dep in stage.deps}
+                    running[asyncio.create_task(execute(stage, inputs), name=f"stage:{name}")] = timing
+
+        try:
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    timing = running.pop(task)
+                    timing.ended_at = time.perf_counter() - origin
+                    stage = self.stages[timing.name]
+                    try:
+                        run.results[stage.name] = task.result()
+                        timing.outcome = "ok"
+                    except Exception as exc:
+                        timing.outcome = "timeout" if isinstance(exc, asyncio.TimeoutError) else "failed"
+                        if stage.required:
+                            raise StageError(stage.name, exc, run) from exc
+                        logger.warning(f"Optional stage {stage.name} {timing.outcome}: {exc}; using fallback")
+                        run.results[stage.name] = stage.fallback
+                launch_ready()
+        finally:
+            for task, timing in running.items():
+                task.cancel()
+                timing.outcome = "cancelled"
+                timing.ended_at = time.perf_counter() - origin
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            logger.info(
+                "Pipeline trace: " + ", ".join(f"{t.name}={t.duration:.2f}s/{t.outcome}" for t in run.trace),
+                extra={"event": "pipeline_trace", "trace": run.trace_dicts()},
+            )
+
+        return run
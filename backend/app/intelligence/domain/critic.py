@@ -4,19 +4,18 @@ from typing import List
 
 from app.core.ai_client import ai_client
 from app.intelligence.domain.dtypes import StructuredCriticResult
+from app.intelligence.domain.prompt_context import build_source_context
 from app.models import Source
 
 
 class CriticService:
+    cache_ttl = 600
+
     async def critique_forecast(self, question: str, sources: List[Source], initial_prob: float, initial_reasoning: str) -> StructuredCriticResult:
-        news_text = "\n".join([f"- {source.title}: {source.snippet}" for source in sources])
-        prompt = f"""
-[INST]
+        context = build_source_context(question, sources)
+        prompt = f"""{context}
 Role: Head of Commodity Risk (Hedge Fund Internal Audit)
-Task: Perform a high-fidelity "Intelligence Audit" on the mirror analysis for "{question}".
-
-Market Data:
-{news_text}
+Task: Perform a high-fidelity "Intelligence Audit" on the mirror analysis for the market event above.
 
 Proposed Forecast:
 - Adjusted Mirror Score: {initial_prob}
@@ -36,11 +35,17 @@ OUTPUT SCHEMA (STRICT JSON):
                 prompt,
                 provider=provider,
                 model="gemini-1.5-flash" if provider == "gemini" else "ollama-critic",
+                cache_ttl=self.cache_ttl,
             )
             return StructuredCriticResult(**raw_json)
         except Exception as exc:
-            return StructuredCriticResult(
-                critique=f"Critic unavailable: {exc}",
-                score=initial_prob,
-                risk_factors=[f"System Error: {exc}"],
-            )
+            return self.unavailable(initial_prob, exc)
+
+    @staticmethod
+    def unavailable(initial_prob: float, reason) -> StructuredCriticResult:
+        """Audit placeholder that keeps the forecast's own probability."""
+        return StructuredCriticResult(
+            critique=f"Critic unavailable: {reason}",
+            score=initial_prob,
+            risk_factors=[f"System Error: {reason}"],
+        )
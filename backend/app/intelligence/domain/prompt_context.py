@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import hashlib
+from typing import List
+
+from app.models import Source
+
+
+def build_source_context(question: str, sources: List[Source]) -> str:
+    """
+    Shared opening block for every prompt in one analysis.
+
+    Swarm agents and the critic all start with this exact text so llama.cpp can evaluate
+    the (long) source list once per slot and reuse the KV cache for the rest of the run.
+    Anything agent-specific must come after it.
+    """
+    source_lines = "\n".join([f"- {source.title}: {source.snippet}" for source in sources])
+    return f"""[INST]
+Market Event: "{question}"
+
+Data Sources:
+{source_lines}
+"""
+
+
+def context_key(context: str) -> str:
+    return hashlib.sha256(context.encode()).hexdigest()[:16]
@@ -1,85 +1,110 @@
 from __future__ import annotations
 
 import asyncio
-import json
 from typing import List, Tuple
 
 from app.core.ai_client import ai_client
+from app.intelligence.domain.prompt_context import build_source_context, context_key
 from app.models import AlgoAnalysis, DivergenceAnalysis, MirrorAnalysis, NoiseAnalysis, Source, StructuredAnalysisResult
 
 
+COMPONENT_MODELS = {
+    "mirror": MirrorAnalysis,
+    "noise": NoiseAnalysis,
+    "divergence": DivergenceAnalysis,
+    "algo": AlgoAnalysis,
+}
+
+
+def validate_component(field: str, value) -> None:
+    """Reject a malformed synthesis component while the rest is still being generated."""
+    model = COMPONENT_MODELS.get(field)
+    if model is not None:
+        model(**value)
+
+
 class BaseSwarmAgent:
+    # Agent prompts are fixed templates over the sources, so identical evidence can reuse a report.
+    cache_ttl = 600
+    instructions = ""
+
     def __init__(self, name: str, role: str):
         self.name = name
         self.role = role
 
+    def build_prompt(self, question: str, sources: List[Source]) -> str:
+        # The shared source block goes first so every agent reuses the same KV-cached prefix.
+        return f"""{build_source_context(question, sources)}
+Role: {self.role}
+{self.instructions}
+[/INST]
+"""
+
     async def analyze(self, question: str, sources: List[Source]) -> str:
-        raise NotImplementedError
+        context = build_source_context(question, sources)
+        return await ai_client.generate(
+            self.build_prompt(question, sources),
+            model="lfm-thinking",
+            cache_ttl=self.cache_ttl,
+            prefix_key=context_key(context),
+        )
 
 
 class GeopoliticalAgent(BaseSwarmAgent):
+    instructions = """Task: Analyze the geopolitical implications for the market event above.
+
+Focus only on geopolitical risks, state-actor moves, and regulatory shifts.
+Provide a concise reasoning and a probabilistic impact score (0-1)."""
+
     def __init__(self):
         super().__init__("Geopolitical Analyst", "Expert in global politics, sanctions, and macro-stability.")
 
-    async def analyze(self, question: str, sources: List[Source]) -> str:
-        snippets = [source.snippet for source in sources]
-        prompt = f"""
-[INST]
-Role: {self.role}
-Task: Analyze the geopolitical implications for the following market event: "{question}"
-Data Sources: {json.dumps(snippets)}
 
-Focus only on geopolitical risks, state-actor moves, and regulatory shifts.
-Provide a concise reasoning and a probabilistic impact score (0-1).
-[/INST]
-"""
-        return await ai_client.generate(prompt, model="lfm-thinking")
+class SupplyChainAgent(BaseSwarmAgent):
+    instructions = """Task: Analyze physical supply chain constraints for the market event above.
 
+Focus on production bottlenecks, shipping disruptions, and inventory cycles.
+Provide a concise reasoning and a probabilistic impact score (0-1)."""
 
-class SupplyChainAgent(BaseSwarmAgent):
     def __init__(self):
         super().__init__("Supply-Chain Analyst", "Expert in logistics, production constraints, and physical commodity flows.")
 
-    async def analyze(self, question: str, sources: List[Source]) -> str:
-        snippets = [source.snippet for source in sources]
-        prompt = f"""
-[INST]
-Role: {self.role}
-Task: Analyze physical supply chain constraints for: "{question}"
-Data Sources: {json.dumps(snippets)}
 
-Focus on production bottlenecks, shipping disruptions, and inventory cycles.
-Provide a concise reasoning and a probabilistic impact score (0-1).
-[/INST]
-"""
-        return await ai_client.generate(prompt, model="lfm-thinking")
+class DerivativesFlowAgent(BaseSwarmAgent):
+    instructions = """Task: Analyze market positioning and derivatives flows for the market event above.
 
+Focus on gamma levels, short interest, institutional hedging, and options sensitivity.
+Provide a concise reasoning and a probabilistic impact score (0-1)."""
 
-class DerivativesFlowAgent(BaseSwarmAgent):
     def __init__(self):
         super().__init__("Derivatives Flow Analyst", "Expert in market positioning, institutional flows, and technical derivatives data.")
 
-    async def analyze(self, question: str, sources: List[Source]) -> str:
-        snippets = [source.snippet for source in sources]
-        prompt = f"""
-[INST]
-Role: {self.role}
-Task: Analyze market positioning and derivatives flows for: "{question}"
-Data Sources: {json.dumps(snippets)}
-
-Focus on gamma levels, short interest, institutional hedging, and options sensitivity.
-Provide a concise reasoning and a probabilistic impact score (0-1).
-[/INST]
-"""
-        return await ai_client.generate(prompt, model="lfm-thinking")
-
 
 class IntelligenceDirectorate:
     def __init__(self):
         self.agents = [GeopoliticalAgent(), SupplyChainAgent(), DerivativesFlowAgent()]
 
     async def run_swarm(self, question: str, sources: List[Source]) -> Tuple[float, str, StructuredAnalysisResult]:
-        agent_reports = await asyncio.gather(*[agent.analyze(question, sources) for agent in self.agents])
+        # One batched submission so the server schedules all agents together.
+        agent_reports = await self.agent_reports(question, sources)
+        return await self.synthesize(question, agent_reports)
+
+    async def agent_reports_batch(self, items: List[Tuple[str, List[Source]]]) -> List[List[str]]:
+        """
+        Every agent's report for every (question, sources) pair. Each question's agents go
+        out as one batch over its shared source prefix; the questions run concurrently.
+        """
+        return list(await asyncio.gather(*(self.agent_reports(question, sources) for question, sources in items)))
+
+    async def agent_reports(self, question: str, sources: List[Source]) -> List[str]:
+        return await ai_client.generate_batch(
+            [agent.build_prompt(question, sources) for agent in self.agents],
+            model="lfm-thinking",
+            cache_ttl=BaseSwarmAgent.cache_ttl,
+            prefix_key=context_key(build_source_context(question, sources)),
+        )
+
+    async def synthesize(self, question: str, agent_reports: List[str]) -> Tuple[float, str, StructuredAnalysisResult]:
         debate_context = "\n\n".join([
             f"--- {agent.name} Report ---\n{report}"
             for agent, report in zip(self.agents, agent_reports)
@@ -114,7 +139,11 @@ OUTPUT SCHEMA (STRICT JSON):
             },
             "required": ["mirror", "noise", "divergence", "algo"],
         }
-        raw_json = await ai_client.generate_json(synthesis_prompt, model="lfm-thinking", json_schema=schema)
+        # Stream the synthesis so each component is validated as soon as it closes and decoding
+        # stops at the end of the object instead of running on to n_predict.
+        raw_json = await ai_client.generate_json(
+            synthesis_prompt, model="lfm-thinking", json_schema=schema, on_field=validate_component
+        )
         analysis = StructuredAnalysisResult(**raw_json)
         avg_score = (analysis.mirror.score + (1 - analysis.noise.score) + analysis.divergence.score + analysis.algo.score) / 4
         collaborative_reasoning = (
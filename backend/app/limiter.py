@@ -1,7 +1,21 @@
-from fastapi import HTTPException, Request
+from fastapi import HTTPException, Request, Response
 from functools import wraps
+import hashlib
+import json
+import logging
+import math
+import os
 import time
-from app.cache import r  # Reuse Redis connection
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app.cache import ar  # Shared async Redis pool
+from app.core.security import decode_access_token
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger("alpha_insights.limiter")
 
 def rate_limit(limit: int = 5, window_seconds: int = 60):
     """
@@ -27,17 +41,262 @@ def rate_limit(limit: int = 5, window_seconds: int = 60):
         return wrapper
     return decorator
 
+
+# GCRA in one round trip. The stored value is the theoretical arrival time (TAT) in ms; a
+# request is admitted while TAT stays within `tolerance` of now. Up to ARGV[3] tokens are
+# reserved at once (the in-process fast path leases several); fewer are granted if that is
+# all the budget allows. Returns {granted, retry_after_ms, remaining}.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local available = math.floor((tolerance - (tat - now)) / emission)
+if available < 1 then
+  return {0, math.ceil(tat + emission - tolerance - now), 0}
+end
+local granted = math.min(wanted, available)
+local new_tat = tat + emission * granted
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+return {granted, 0, available - granted}
+"""
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    period: float
+
+    @classmethod
+    def parse(cls, rule: str) -> "RateLimit":
+        """'5/minute', '100/hour' or '10/30s' (10 requests per 30 seconds)."""
+        count, _, unit = rule.partition("/")
+        unit = unit.strip().lower()
+        if unit[:-1].isdigit() and unit.endswith("s"):
+            return cls(int(count), float(unit[:-1]))
+        return cls(int(count), _PERIODS[unit.rstrip("s")])
+
+    @property
+    def emission_ms(self) -> float:
+        return self.period * 1000 / self.limit
+
+
+class RateLimitRules:
+    """
+    Resolves the limit for a (route, role) pair, most specific first:
+    routes[route][role] -> routes[route]["default"] -> roles[role] -> default.
+    Loaded from the RATE_LIMIT_RULES JSON env var, e.g.
+    {"default": "5/minute", "roles": {"admin": "60/minute"},
+     "routes": {"/prediction/predict/batch": {"default": "2/minute", "admin": "20/minute"}}}
+    """
+
+    def __init__(self, default: str = "5/minute", roles: Optional[Dict[str, str]] = None, routes: Optional[Dict[str, Dict[str, str]]] = None):
+        self.default = RateLimit.parse(default)
+        self.roles = {role: RateLimit.parse(rule) for role, rule in (roles or {}).items()}
+        self.routes = {
+            route: {role: RateLimit.parse(rule) for role, rule in rules.items()}
+            for route, rules in (routes or {}).items()
+        }
+
+    @classmethod
+    def from_env(cls) -> "RateLimitRules":
+        raw = os.getenv("RATE_LIMIT_RULES")
+        return cls(**json.loads(raw)) if raw else cls()
+
+    def resolve(self, route: str, role: str) -> RateLimit:
+        route_rules = self.routes.get(route, {})
+        return route_rules.get(role) or route_rules.get("default") or self.roles.get(role) or self.default
+
+
+class LocalTokenLease:
+    """
+    Tokens already reserved from the shared Redis budget, spent without a round trip.
+    Leases expire quickly so an idle process does not sit on another process's budget.
+    """
+
+    def __init__(self):
+        self._leases: Dict[str, Tuple[int, int, float]] = {}
+
+    def take(self, key: str) -> Optional[int]:
+        """Spends one leased token; returns the shared budget left as of the lease, or None."""
+        tokens, remaining, expires_at = self._leases.get(key, (0, 0, 0.0))
+        if tokens <= 0 or time.monotonic() >= expires_at:
+            self._leases.pop(key, None)
+            return None
+        self._leases[key] = (tokens - 1, remaining, expires_at)
+        return remaining + tokens - 1
+
+    def grant(self, key: str, tokens: int, remaining: int, ttl: float):
+        if tokens > 0:
+            self._leases[key] = (tokens, remaining, time.monotonic() + ttl)
+        else:
+            self._leases.pop(key, None)
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    policy: RateLimit
+    remaining: int = 0
+    retry_after: float = 0.0
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": f"{self.policy.limit};w={int(self.policy.period)}",
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    def __init__(self, redis_client=None, rules: Optional[RateLimitRules] = None, lease_fraction: float = 0.1):
+        self.redis = redis_client
+        self.rules = rules or RateLimitRules.from_env()
+        self.lease_fraction = lease_fraction
+        self.local = LocalTokenLease()
+        self.flights = SingleFlight()
+        self._script = None
+        self.local_hits = 0
+        self.redis_calls = 0
+        self.rejected = 0
+
+    def _gcra(self):
+        if self._script is None:
+            self._script = self.redis.register_script(GCRA_SCRIPT)
+        return self._script
+
+    async def _reserve(self, key: str, policy: RateLimit) -> Optional[Tuple[int, int, int]]:
+        """One GCRA round trip; returns (granted, retry_after_ms, remaining) or None if Redis is down."""
+        # Lease a slice of the budget for large limits; tight limits (5/min) stay exact.
+        wanted = max(1, int(policy.limit * self.lease_fraction))
+        self.redis_calls += 1
+        try:
+            result = await self._gcra()(keys=[key], args=[policy.emission_ms, policy.period * 1000, wanted])
+        except Exception as exc:
+            logger.warning(f"Rate limiter unavailable, allowing request: {exc}")
+            return None
+        granted, retry_after_ms, remaining = (int(value) for value in result)
+        if granted > 0:
+            # The lease lives no longer than the budget it consumed would take to refill.
+            self.local.grant(key, granted, remaining, ttl=policy.emission_ms * granted / 1000)
+        return granted, retry_after_ms, remaining
+
+    async def hit(self, route: str, identity: str, role: str) -> RateLimitDecision:
+        policy = self.rules.resolve(route, role)
+        key = f"rate_limit:{route}:{identity}"
+        reserved = False
+        while True:
+            remaining = self.local.take(key)
+            if remaining is not None:
+                if not reserved:
+                    self.local_hits += 1
+                return RateLimitDecision(True, policy, remaining)
+
+            # Concurrent misses for the same key share one lease request.
+            lease = await self.flights.do(key, lambda: self._reserve(key, policy))
+            reserved = True
+            if lease is None:
+                # Fail open: a Redis outage must not take the API down with it.
+                return RateLimitDecision(True, policy, policy.limit)
+            granted, retry_after_ms, _ = lease
+            if granted < 1:
+                self.rejected += 1
+                return RateLimitDecision(False, policy, retry_after=retry_after_ms / 1000)
+
+    def stats(self) -> Dict[str, int]:
+        return {"local_hits": self.local_hits, "redis_calls": self.redis_calls, "rejected": self.rejected}
+
+
+rate_limiter = RateLimiter(ar, lease_fraction=float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.1")))
+
+
+class ApiKeyVerifier:
+    """
+    Confirms an `x-api-key` against the ApiKey table before it may name a rate-limit bucket;
+    otherwise a client could mint a fresh bucket per request with random keys. Verdicts
+    (valid or not) are kept for `ttl` seconds in a bounded LRU and concurrent checks of one
+    key share a query, so a real key costs one lookup per TTL.
+    """
+
+    def __init__(self, session_factory=None, ttl: float = 60.0, max_entries: int = 10000):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flights = SingleFlight()
+        self._verdicts: "OrderedDict[str, Tuple[float, bool]]" = OrderedDict()
+
+    async def verify(self, raw_key: str) -> Optional[str]:
+        """The key's hash when it names an active, unexpired key; None otherwise."""
+        key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
+        verdict = self._verdicts.get(key_hash)
+        if verdict is not None and verdict[0] > time.monotonic():
+            self._verdicts.move_to_end(key_hash)
+            valid = verdict[1]
+        else:
+            valid = await self.flights.do(key_hash, lambda: self._lookup(key_hash))
+            if valid is not None:
+                self._remember(key_hash, valid)
+        return key_hash if valid else None
+
+    async def _lookup(self, key_hash: str) -> Optional[bool]:
+        from sqlalchemy import select
+        from app.db.models import ApiKey
+
+        session_factory = self.session_factory
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal as session_factory
+        try:
+            async with session_factory() as session:
+                key = (
+                    await session.execute(select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.is_active == True))  # noqa: E712
+                ).scalar_one_or_none()
+        except Exception as exc:
+            # Not cached: an unverified key just falls back to the user/IP bucket meanwhile.
+            logger.warning(f"API key lookup failed: {exc}")
+            return None
+        return key is not None and (key.expires_at is None or key.expires_at > datetime.utcnow())
+
+    def _remember(self, key_hash: str, valid: bool):
+        self._verdicts[key_hash] = (time.monotonic() + self.ttl, valid)
+        self._verdicts.move_to_end(key_hash)
+        while len(self._verdicts) > self.max_entries:
+            self._verdicts.popitem(last=False)
+
+
+api_key_verifier = ApiKeyVerifier(ttl=float(os.getenv("RATE_LIMIT_API_KEY_CACHE_SECONDS", "60")))
+
+
+async def _identity(request: Request) -> Tuple[str, str]:
+    """(identity, role): a verified API key, else the bearer token's user, else the client IP."""
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        key_hash = await api_key_verifier.verify(api_key)
+        if key_hash:
+            return f"key:{key_hash[:16]}", "api_key"
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = decode_access_token(authorization[7:])
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}", payload.get("role", "analyst")
+    return f"ip:{request.client.host}", "anonymous"
+
+
 # Dependency Implementation (Cleaner for FastAPI)
-async def check_rate_limit(request: Request):
-    client_ip = request.client.host
-    key = f"rate_limit:{client_ip}"
-    
-    # Simple Fixed Window
-    current = r.get(key)
-    if current and int(current) > 5: # 5 reqs per minute per IP
-        raise HTTPException(status_code=429, detail="Too Many Requests - Slow Down (Hedge Fund Speed Limit)")
-        
-    pipe = r.pipeline()
-    pipe.incr(key)
-    pipe.expire(key, 60)
-    pipe.execute()
+async def check_rate_limit(request: Request, response: Response):
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    identity, role = await _identity(request)
+    decision = await rate_limiter.hit(route, identity, role)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too Many Requests - Slow Down (Hedge Fund Speed Limit)",
+            headers=decision.headers(),
+        )
+    response.headers.update(decision.headers())
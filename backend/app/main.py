@@ -6,9 +6,14 @@ import json
 import time
 import asyncio
 from celery.result import AsyncResult
-from app.worker import celery_app
-from app.cache import r as redis_client
+from app.worker import celery_app, queue_depths
+from app.cache import ar as redis_client, close_async_redis, response_cache
 from app.health import get_system_health
+from app.core.ai_client import ai_client
+from app.connectors.polymarket import PolymarketMarketStream
+from app.services.orderbook_mirror import orderbook_mirror
+from app.services.semantic_cache import semantic_cache
+from app.task_events import START_CURSOR, TERMINAL_EVENTS, stream_position, task_events
 
 # Modular Routers
 from app.routers.auth import router as auth_router
@@ -107,43 +112,93 @@ app.include_router(scanner_router)
 app.include_router(tools_router)
 app.include_router(demo_router, prefix="/demo", tags=["demo"])
 
+@app.on_event("startup")
+async def start_orderbook_mirror():
+    if orderbook_mirror is not None:
+        orderbook_mirror.ensure_started(PolymarketMarketStream)
+
+
+@app.on_event("shutdown")
+async def close_redis_pool():
+    if orderbook_mirror is not None:
+        await orderbook_mirror.close()
+    await task_events.close()
+    await close_async_redis()
+
+
 @app.get("/health")
 async def health_check():
     health_status = await get_system_health()
-    status = "ok" if all(health_status.values()) else "degraded"
-    return {"status": status, "details": health_status}
+    status = "ok" if all(health_status.values()) and not ai_client.open_circuits() else "degraded"
+    try:
+        celery_queues = await queue_depths(redis_client)
+    except Exception as exc:
+        logger.warning(f"Queue depth check failed: {exc}")
+        celery_queues = None
+    return {
+        "status": status,
+        "details": health_status,
+        "ai_client": ai_client.stats(),
+        "response_cache": response_cache.stats(),
+        "task_events": task_events.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "orderbook_mirror": orderbook_mirror.stats() if orderbook_mirror is not None else None,
+        "celery_queues": celery_queues,
+    }
 
 @app.websocket("/ws/lifecycle/{task_id}")
 async def websocket_lifecycle(websocket: WebSocket, task_id: str):
     await websocket.accept()
-    pubsub = redis_client.pubsub()
-    channel = f"task_events:{task_id}"
-    await pubsub.subscribe(channel)
+    if task_id.startswith("cached_"):
+        await websocket.send_json({"event": "status", "message": "Analysis complete (Cached)"})
+        await websocket.close()
+        return
+
+    # Only the receive side tells us the client went away; watch it so an idle socket
+    # does not hold its subscription forever.
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
 
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    # Every event carries its stream id; a reconnecting client passes the last one it saw.
+    cursor = websocket.query_params.get("cursor", START_CURSOR)
     try:
-        if task_id.startswith("cached_"):
-            await websocket.send_json({"event": "status", "message": "Analysis complete (Cached)"})
-            await websocket.close()
-            return
-
-        result = AsyncResult(task_id, app=celery_app)
-        while True:
-            message = pubsub.get_message(ignore_subscribe_messages=True)
-            if message:
-                data = json.loads(message["data"])
+        stream_position(cursor)
+    except ValueError:
+        cursor = START_CURSOR
+    try:
+        async with task_events.subscribe(task_id) as events:
+            # Subscribed before replaying, so nothing falls between history and the live feed.
+            for data in await task_events.replay(task_id, after=cursor):
                 await websocket.send_json(data)
-                if data.get("event") == "complete":
-                    break
+                cursor = data["id"]
+                if data.get("event") in TERMINAL_EVENTS:
+                    return
 
-            await asyncio.sleep(0.1)
-            if result.ready():
+            # Nothing terminal recorded (stream expired, or written before streams existed).
+            result = AsyncResult(task_id, app=celery_app)
+            if await asyncio.to_thread(result.ready):
                 await websocket.send_json({"event": "complete", "message": "Task finished."})
-                break
+                return
+
+            while True:
+                next_event = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event not in done:
+                    next_event.cancel()
+                    raise WebSocketDisconnect()
+                data = next_event.result()
+                if "id" in data and stream_position(data["id"]) <= stream_position(cursor):
+                    continue  # already sent during replay
+                await websocket.send_json(data)
+                if data.get("event") in TERMINAL_EVENTS:
+                    break
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected: {task_id}")
     finally:
-        await pubsub.unsubscribe(channel)
+        disconnected.cancel()
         try:
             await websocket.close()
         except Exception:
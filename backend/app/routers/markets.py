@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from typing import List
 from app.models import User
 from app.core.auth import get_current_active_user
-from app.cache import cache_response
+from app.cache import cache_response, ignore_params
 
 router = APIRouter(
     prefix="/markets",
@@ -10,7 +10,7 @@ router = APIRouter(
 )
 
 @router.get("")
-@cache_response(ttl_seconds=30)
+@cache_response(ttl_seconds=30, key_func=ignore_params("current_user"))
 async def get_markets(current_user: User = Depends(get_current_active_user)):
     """
     Fetch active physical commodity instruments.
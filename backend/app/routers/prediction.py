@@ -1,14 +1,19 @@
+import asyncio
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-import hashlib
-import json
+from pydantic import BaseModel, Field
+from typing import Any, List
 from celery.result import AsyncResult
 
-from app.cache import r as redis_client
+from app.cache import ar as redis_client
 from app.core.auth import get_current_active_user
+from app.core.serialization import serializer
 from app.limiter import check_rate_limit
 from app.models import User
-from app.worker import celery_app, run_forecast_task
+from app.services.prediction_registry import INFLIGHT_PREFIX, RESULT_PREFIX, prediction_registry
+from app.services.semantic_cache import semantic_cache
+from app.worker import celery_app, run_batch_forecast_task, run_forecast_task
 
 router = APIRouter(
     prefix="/prediction",
@@ -17,11 +22,41 @@ router = APIRouter(
 compat_router = APIRouter(tags=["prediction-compat"])
 
 
+MAX_BATCH_QUESTIONS = 100
+
+
 class PredictionRequest(BaseModel):
     question: str
     model: str = "lfm-thinking"
 
 
+class BatchPredictionRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    model: str = "lfm-thinking"
+
+
+def _prediction_cache_key(question: str) -> tuple[str, str]:
+    q_hash = prediction_registry.key(question)
+    return q_hash, f"{RESULT_PREFIX}{q_hash}"
+
+
+async def _semantic_lookup(question: str, cache_key: str):
+    """
+    A differently worded question with a fresh forecast answers this one too. Returns
+    (hit, embedding); the embedding is handed to the worker so it can index the new result.
+    """
+    if semantic_cache is None:
+        return None, None
+    embedding = await semantic_cache.embed(question)
+    hit = await semantic_cache.lookup(question, embedding)
+    if hit is not None:
+        remaining = int(semantic_cache.max_age - hit.age)
+        if remaining > 0:
+            # Later exact lookups (and /task/cached_<hash>) for this wording skip the embedding.
+            await redis_client.setex(cache_key, remaining, serializer.dumps(hit.forecast.result))
+    return hit, embedding
+
+
 async def _predict_market(
     request: PredictionRequest,
     current_user: User = Depends(get_current_active_user),
@@ -29,19 +64,100 @@ async def _predict_market(
     if not request.question:
         raise HTTPException(status_code=400, detail="Question is required")
 
-    q_hash = hashlib.md5(request.question.encode()).hexdigest()
-    cache_key = f"prediction_result:{q_hash}"
+    q_hash, cache_key = _prediction_cache_key(request.question)
 
-    cached_data = redis_client.get(cache_key)
+    cached_data = await redis_client.get(cache_key)
     if cached_data:
         return {
             "task_id": f"cached_{q_hash}",
             "status": "cached",
-            "result": json.loads(cached_data),
+            "served_from": "cache",
+            "result": serializer.loads(cached_data),
         }
 
-    task = run_forecast_task.delay(request.question, request.model)
-    return {"task_id": task.id, "status": "processing"}
+    hit, embedding = await _semantic_lookup(request.question, cache_key)
+    if hit is not None:
+        return {
+            "task_id": f"cached_{q_hash}",
+            "status": "cached",
+            "served_from": "semantic_cache",
+            "matched_question": hit.forecast.question,
+            "similarity": round(hit.similarity, 4),
+            "result": hit.forecast.result,
+        }
+
+    # Same normalized question already running: attach to that task instead of starting another.
+    # The running task may be a batch, so the handle is per question: /task/cached_<hash>
+    # reports it processing until the forecast lands in the result cache.
+    task_id, claimed = await prediction_registry.claim(redis_client, request.question)
+    if not claimed:
+        return {
+            "task_id": f"cached_{q_hash}",
+            "status": "processing",
+            "served_from": "pipeline",
+            "deduplicated": True,
+            "attached_task_id": task_id,
+        }
+
+    # The worker indexes the finished forecast under the embedding computed here.
+    task_kwargs = {"embedding": embedding.tolist()} if embedding is not None else {}
+    try:
+        run_forecast_task.apply_async(args=[request.question, request.model], kwargs=task_kwargs, task_id=task_id)
+    except Exception:
+        await prediction_registry.abandon(redis_client, request.question, task_id)
+        raise
+    return {"task_id": task_id, "status": "processing", "served_from": "pipeline"}
+
+
+async def _predict_batch(
+    request: BatchPredictionRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    # Deduplicate by normalized question; the first spelling submitted is the one analyzed.
+    by_key = {}
+    for question in request.questions:
+        if question.strip():
+            by_key.setdefault(prediction_registry.key(question), question.strip())
+    questions = list(by_key.values())
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+
+    cached_values = await redis_client.mget([_prediction_cache_key(question)[1] for question in questions])
+    cached = {question: serializer.loads(value) for question, value in zip(questions, cached_values) if value}
+
+    # The rest go through the same semantic cache and in-flight claims as /predict, so a
+    # question already running (from either endpoint) is attached to, not computed twice.
+    task_id = str(uuid.uuid4())
+    pending, attached, embeddings = [], {}, {}
+    for question in questions:
+        if question in cached:
+            continue
+        hit, embedding = await _semantic_lookup(question, _prediction_cache_key(question)[1])
+        if hit is not None:
+            cached[question] = hit.forecast.result
+            continue
+        _, claimed = await prediction_registry.claim(redis_client, question, task_id=task_id)
+        if not claimed:
+            # Not part of this job's result; poll it through its per-question handle.
+            attached[question] = f"cached_{prediction_registry.key(question)}"
+            continue
+        pending.append(question)
+        if embedding is not None:
+            embeddings[question] = embedding.tolist()
+
+    if not pending:
+        status = "processing" if attached else "cached"
+        return {"task_id": None, "status": status, "cached": cached, "pending": [], "attached": attached}
+
+    # One job and one lifecycle channel (task_events:<task_id>) for the whole watchlist.
+    task_kwargs = {"embeddings": embeddings} if embeddings else {}
+    try:
+        run_batch_forecast_task.apply_async(args=[pending, request.model], kwargs=task_kwargs, task_id=task_id)
+    except Exception:
+        for question in pending:
+            await prediction_registry.abandon(redis_client, question, task_id)
+        raise
+    return {"task_id": task_id, "status": "processing", "cached": cached, "pending": pending, "attached": attached}
 
 
 async def _get_task_status(
@@ -49,19 +165,29 @@ async def _get_task_status(
     current_user: User = Depends(get_current_active_user),
 ):
     if task_id.startswith("cached_"):
-        cache_key = f"prediction_result:{task_id.replace('cached_', '')}"
-        cached_data = redis_client.get(cache_key)
+        q_hash = task_id.replace("cached_", "")
+        cached_data = await redis_client.get(f"{RESULT_PREFIX}{q_hash}")
         if cached_data:
-            return {"id": task_id, "status": "completed", "result": json.loads(cached_data)}
+            return {"id": task_id, "status": "completed", "result": serializer.loads(cached_data)}
+        # Still claimed by a running /predict or batch task.
+        if await redis_client.exists(f"{INFLIGHT_PREFIX}{q_hash}"):
+            return {"id": task_id, "status": "processing"}
         return {"id": task_id, "status": "failed", "result": None}
 
-    task_result = AsyncResult(task_id, app=celery_app)
-    if task_result.ready():
-        result = task_result.get()
+    # The result backend client is blocking; keep its round trips off the event loop.
+    ready, result = await asyncio.to_thread(_read_task_result, task_id)
+    if ready:
         return {"id": task_id, "status": "completed", "result": result}
     return {"id": task_id, "status": "processing"}
 
 
+def _read_task_result(task_id: str) -> tuple[bool, Any]:
+    task_result = AsyncResult(task_id, app=celery_app)
+    if task_result.ready():
+        return True, task_result.get()
+    return False, None
+
+
 router.add_api_route(
     "/predict",
     _predict_market,
@@ -74,5 +200,17 @@ compat_router.add_api_route(
     methods=["POST"],
     dependencies=[Depends(check_rate_limit)],
 )
+router.add_api_route(
+    "/predict/batch",
+    _predict_batch,
+    methods=["POST"],
+    dependencies=[Depends(check_rate_limit)],
+)
+compat_router.add_api_route(
+    "/predict/batch",
+    _predict_batch,
+    methods=["POST"],
+    dependencies=[Depends(check_rate_limit)],
+)
 router.add_api_route("/task/{task_id}", _get_task_status, methods=["GET"])
 compat_router.add_api_route("/task/{task_id}", _get_task_status, methods=["GET"])
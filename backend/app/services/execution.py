@@ -1,9 +1,14 @@
-from typing import Dict, Any, List
+import logging
+from typing import Dict, Any, List, Optional
 from app.services.kelly import SlippageAwareKellyEngine
+from app.services.orderbook_mirror import OrderBookMirror, orderbook_mirror
+
+logger = logging.getLogger("alpha_insights.execution")
 
 class ExecutionService:
-    def __init__(self):
+    def __init__(self, mirror: Optional[OrderBookMirror] = orderbook_mirror):
         self.kelly_engine = SlippageAwareKellyEngine()
+        self.mirror = mirror
 
     async def construct_trade_payload(
         self, 
@@ -19,6 +24,19 @@ class ExecutionService:
         Constructs a transaction payload for the frontend to sign or execute.
         Now includes optimal sizing via the Slippage-Aware Kelly Engine.
         """
+        # Mirrored Polymarket book for the token, read from memory
+        if not order_book and provider == "polymarket" and self.mirror is not None:
+            mirrored = self.mirror.book(symbol)
+            if mirrored is None:
+                # First trade on this token: fetch it once and keep it mirrored from here on.
+                try:
+                    await self.mirror.orderbook(symbol)
+                    mirrored = self.mirror.book(symbol)
+                except Exception as exc:
+                    logger.warning(f"No order book for {symbol}, using the default curve: {exc}")
+            if mirrored is not None and len(mirrored.asks):
+                order_book = mirrored.ask_curve()
+
         # Default order book if none provided (for demo/fallback)
         if not order_book:
             order_book = [
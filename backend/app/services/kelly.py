@@ -1,5 +1,102 @@
 import math
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Kelly fractions above this are clamped (0.5 fractional Kelly safety buffer).
+MAX_KELLY_FRACTION = 0.5
+
+
+class OrderBookCurve:
+    """
+    Ask side of a book as sorted price levels with cumulative size and notional prefix sums.
+
+    `cum_size[i]` and `cum_notional[i]` cover the first `i` levels, so the cost of any fill is
+    one binary search plus a partial level: O(log levels) instead of a walk from the top.
+    Fills beyond the visible depth are priced at the last level, as the stepping engine did.
+    """
+
+    __slots__ = ("prices", "sizes", "cum_size", "cum_notional")
+
+    def __init__(self, prices: Sequence[float], sizes: Sequence[float]):
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        order = np.argsort(prices, kind="stable")
+        self.prices = prices[order]
+        self.sizes = sizes[order]
+        self.cum_size = np.concatenate(([0.0], np.cumsum(self.sizes)))
+        self.cum_notional = np.concatenate(([0.0], np.cumsum(self.sizes * self.prices)))
+
+    @classmethod
+    def from_levels(cls, levels: List[Dict[str, float]]) -> "OrderBookCurve":
+        """Builds the curve from connector-style levels: [{'price': 0.8, 'size': 100}, ...]."""
+        return cls([level["price"] for level in levels], [level["size"] for level in levels])
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def depth(self) -> float:
+        return float(self.cum_size[-1])
+
+    def cost(self, size: float) -> float:
+        """Notional paid to fill `size` from the top of the book."""
+        levels = len(self.prices)
+        if size >= self.cum_size[-1]:
+            return float(self.cum_notional[-1] + (size - self.cum_size[-1]) * self.prices[-1])
+        # First level whose cumulative size covers the fill; the partial fill is at its price.
+        index = int(np.searchsorted(self.cum_size, size, side="left"))
+        index = min(max(index, 1), levels)
+        return float(self.cum_notional[index - 1] + (size - self.cum_size[index - 1]) * self.prices[index - 1])
+
+    def size_at_vwap(self, price: float) -> float:
+        """Largest fill whose VWAP stays at or below `price` (inf if no level costs more)."""
+        if not len(self.prices) or self.prices[0] > price:
+            return 0.0
+        if self.prices[-1] <= price:
+            return math.inf
+        # notional - price * size falls through levels cheaper than `price` and rises after,
+        # so over the dearer levels the first boundary where it turns non-negative is a bisection.
+        surplus = self.cum_notional - price * self.cum_size
+        first_dearer = int(np.searchsorted(self.prices, price, side="right"))
+        index = first_dearer + int(np.searchsorted(surplus[first_dearer + 1:], 0.0, side="left"))
+        # The crossing lies in level `index` (the last level's price extends past visible depth).
+        index = min(index, len(self.prices) - 1)
+        level_price = float(self.prices[index])
+        start, notional = float(self.cum_size[index]), float(self.cum_notional[index])
+        return max((notional - start * level_price) / (price - level_price), start)
+
+    def vwap(self, size: float) -> float:
+        if not len(self.prices) or self.cum_size[-1] <= 0:
+            return 1.0  # Infinitely expensive if no liquidity
+        if size <= 0:
+            return float(self.prices[0])
+        return self.cost(size) / size
+
+
+OrderBookInput = Union[OrderBookCurve, List[Dict[str, float]]]
+
+
+def flatten_order_books(order_books: Sequence[OrderBookInput]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs ragged books into (prices, sizes, offsets) for the batch API: book `i` is
+    levels `offsets[i]:offsets[i + 1]` of the flat arrays.
+    """
+    curves = [book if isinstance(book, OrderBookCurve) else OrderBookCurve.from_levels(book) for book in order_books]
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    np.cumsum([len(curve) for curve in curves], out=offsets[1:])
+    if not curves:
+        return np.zeros(0), np.zeros(0), offsets
+    return np.concatenate([c.prices for c in curves]), np.concatenate([c.sizes for c in curves]), offsets
+
+
+def kelly_fraction_at(model_probability: float, vwap: float, limit: Optional[float] = MAX_KELLY_FRACTION) -> float:
+    """f* = (P_model - P_vwap) / (1 - P_vwap), clamped to [0, limit] (no upper clamp when limit is None)."""
+    if vwap >= model_probability or vwap >= 1.0:
+        return 0.0
+    fraction = (model_probability - vwap) / (1 - vwap)
+    return fraction if limit is None else min(fraction, limit)
+
 
 class SlippageAwareKellyEngine:
     """
@@ -8,104 +105,230 @@ class SlippageAwareKellyEngine:
     """
 
     def calculate_optimal_size(
-        self, 
-        model_probability: float, 
-        order_book: List[Dict[str, float]], 
+        self,
+        model_probability: float,
+        order_book: OrderBookInput,
         bankroll: float,
-        step_size: float = 10.0,
-        max_steps: int = 100
     ) -> Dict[str, Any]:
         """
-        Walks the order book to find the optimal order size where marginal edge = marginal slippage.
-        
+        Finds the order size where marginal edge = marginal slippage, i.e. the size S at
+        which the Kelly bet at the fill's own VWAP is exactly S:
+
+            S = bankroll * f*(VWAP(S))
+
+        f*(VWAP(S)) only falls as S grows, so the equilibrium is unique. It is located by
+        binary search over level boundaries and then solved in closed form inside that level,
+        where VWAP(S) = (a + b*S) / S and the condition is a quadratic in S.
+
         Args:
             model_probability: LLM derived probability (0.0 to 1.0)
-            order_book: List of ask levels [{'price': 0.8, 'size': 100}, ...]
+            order_book: List of ask levels [{'price': 0.8, 'size': 100}, ...] or an OrderBookCurve
             bankroll: Total available capital
-            step_size: Increment for simulation
-            max_steps: Safeguard against infinite loops
-            
+
         Returns:
-            Dict containing optimal_size, expected_vwap, and kelly_fraction.
+            Dict containing optimal_size, expected_vwap, kelly_fraction and expected_value
+            (per-unit edge, -1.0 when there is no edge).
         """
-        best_size = 0.0
-        max_ev = -1.0
-        best_vwap = 0.0
-        best_kelly = 0.0
-
-        # Sort order book by price (Asks)
-        sorted_asks = sorted(order_book, key=lambda x: x['price'])
-
-        for i in range(1, max_steps + 1):
-            sim_size = i * step_size
-            if sim_size > bankroll:
-                break
-
-            vwap = self._calculate_vwap(sim_size, sorted_asks)
-            
-            # If vwap >= model_prob, there is no edge
-            if vwap >= model_probability:
-                break
-            
-            # Patent Formula: Kelly Fraction (adjusted for binary price odds)
-            # Standard Kelly: (bp - q) / b
-            # Here b (odds) is represented by the price. 
-            # In prediction markets (0/1), price P implies decimal odds 1/P.
-            # f* = (P_model - P_market) / (1 - P_market)
-            kelly_fraction = (model_probability - vwap) / (1 - vwap)
-            
-            # Clamp kelly fraction (safety buffer 0.5 fractional Kelly)
-            kelly_fraction = max(0, min(kelly_fraction, 0.5))
-            
-            expected_bet = kelly_fraction * bankroll
-            
-            # If the simulated bet size is close to what Kelly suggests at this VWAP
-            # the 'actual' EV is maximized when we hit the equilibrium point.
-            # Simplified for MVP: Find the size that yields highest (Prob * Profit - (1-Prob) * Loss)
-            # where Profit = (1-VWAP)/VWAP and Loss = 1
-            ev = (model_probability * (1 - vwap)) - ((1 - model_probability) * vwap)
-            
-            if ev > max_ev:
-                max_ev = ev
-                best_size = sim_size
-                best_vwap = vwap
-                best_kelly = kelly_fraction
+        book = order_book if isinstance(order_book, OrderBookCurve) else OrderBookCurve.from_levels(order_book)
+        size = self.equilibrium_size(model_probability, book, bankroll)
+        if size <= 0:
+            return {"optimal_size": 0.0, "expected_vwap": 0.0, "kelly_fraction": 0.0, "expected_value": -1.0}
+
+        vwap = book.vwap(size)
+        return {
+            "optimal_size": size,
+            "expected_vwap": vwap,
+            "kelly_fraction": size / bankroll,
+            # Prob * Profit - (1-Prob) * Loss per unit, with Profit = 1-VWAP and Loss = VWAP
+            "expected_value": (model_probability * (1 - vwap)) - ((1 - model_probability) * vwap),
+        }
+
+    def equilibrium_size(
+        self, p: float, book: OrderBookCurve, bankroll: float, cap: Optional[float] = None
+    ) -> float:
+        """
+        Size S solving S = bankroll * f*(VWAP(S)) with the unclamped f*, then capped at `cap`
+        (default: MAX_KELLY_FRACTION of `bankroll`). Capping the root is the same as clamping f*.
+        """
+        cap = bankroll * MAX_KELLY_FRACTION if cap is None else cap
+        if bankroll <= 0 or cap <= 0 or not len(book) or book.depth <= 0 or book.prices[0] >= p:
+            return 0.0
+
+        def surplus(size: float) -> float:
+            # Kelly bet at this size's VWAP minus the size itself; strictly decreasing in size.
+            return bankroll * kelly_fraction_at(p, book.vwap(size), limit=None) - size
+
+        if surplus(cap) >= 0:
+            return cap
+
+        # First level boundary at which the Kelly bet no longer covers the fill.
+        low, high = 1, len(book) + 1
+        while low < high:
+            middle = (low + high) // 2
+            if surplus(book.cum_size[middle]) <= 0:
+                high = middle
             else:
-                # Diminishing returns hit
-                break
+                low = middle + 1
+
+        if low > len(book):
+            # Beyond visible depth, priced at the last level.
+            start, end, price = float(book.cum_size[-1]), math.inf, float(book.prices[-1])
+            notional = float(book.cum_notional[-1])
+        else:
+            start, end, price = float(book.cum_size[low - 1]), float(book.cum_size[low]), float(book.prices[low - 1])
+            notional = float(book.cum_notional[low - 1])
+
+        # cost(S) = a + b*S within the level; S*(1 - VWAP) = bankroll*(p - VWAP) becomes
+        # (1 - b)*S^2 - (a + bankroll*(p - b))*S + bankroll*a = 0.
+        a, b = notional - start * price, price
+        return min(_segment_root(1 - b, -(a + bankroll * (p - b)), bankroll * a, start, end), cap)
+
+    def calculate_optimal_sizes(
+        self,
+        model_probabilities: np.ndarray,
+        bankrolls: np.ndarray,
+        prices: np.ndarray,
+        sizes: np.ndarray,
+        offsets: np.ndarray,
+    ) -> Dict[str, np.ndarray]:
+        """
+        `calculate_optimal_size` for many markets in one vectorized pass.
+
+        Books are ragged and flattened: market `i` owns levels `offsets[i]:offsets[i + 1]` of
+        `prices`/`sizes` (see `flatten_order_books`); levels need not be sorted. Returns the
+        same keys as the scalar call, each an array with one entry per market.
+
+        The unclamped surplus bankroll * f*(VWAP(S)) - S is evaluated at every level boundary
+        at once. It falls monotonically within a book, so counting positive boundaries per
+        book gives the level holding the equilibrium, which is then solved as a quadratic for
+        all markets together and clamped to the fractional-Kelly cap.
+        """
+        p = np.asarray(model_probabilities, dtype=np.float64)
+        bankroll = np.asarray(bankrolls, dtype=np.float64)
+        books = _FlatBooks(prices, sizes, offsets)
+        active = (books.depth > 0) & (bankroll > 0) & (books.top_price < p)
 
+        level_p = p[books.book_of_level]
+        vwap_at_boundary = books.boundary_vwap()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kelly = np.where(vwap_at_boundary < level_p, (level_p - vwap_at_boundary) / (1 - vwap_at_boundary), 0.0)
+        positive = bankroll[books.book_of_level] * kelly - books.cum_size[:-1] > 0
+        below = np.bincount(books.book_of_level, weights=positive, minlength=books.markets).astype(np.int64)
+
+        start, end, notional, price = books.segment(below)
+        a = notional - start * price
+        root = _segment_roots(1 - price, -(a + bankroll * (p - price)), bankroll * a, start, end)
+        optimal = np.where(active, np.minimum(root, bankroll * MAX_KELLY_FRACTION), 0.0)
+        # Prefix sums shifted off a global running total carry rounding noise; drop dust sizes.
+        optimal = np.where(optimal > 1e-9 * np.maximum(books.depth, 1.0), optimal, 0.0)
+
+        # The cap can land in an earlier level than the raw root, so price the final size from the curve.
+        filled = optimal > 0
+        vwap = np.where(filled, books.vwap(np.where(filled, optimal, 1.0)), 0.0)
         return {
-            "optimal_size": best_size,
-            "expected_vwap": best_vwap,
-            "kelly_fraction": best_kelly,
-            "expected_value": max_ev
+            "optimal_size": optimal,
+            "expected_vwap": vwap,
+            "kelly_fraction": np.where(filled, optimal / np.where(filled, bankroll, 1.0), 0.0),
+            "expected_value": np.where(filled, (p * (1 - vwap)) - ((1 - p) * vwap), -1.0),
         }
 
-    def _calculate_vwap(self, target_size: float, sorted_asks: List[Dict[str, float]]) -> float:
+    def _calculate_vwap(self, target_size: float, sorted_asks: OrderBookInput) -> float:
         """
-        Simulates walking the order book to calculate Volume Weighted Average Price.
+        Volume Weighted Average Price for filling `target_size` from the top of the book.
         """
-        remaining_size = target_size
-        total_cost = 0.0
-        filled_size = 0.0
-
-        for level in sorted_asks:
-            price = level['price']
-            size_at_level = level['size']
-
-            fill = min(remaining_size, size_at_level)
-            total_cost += fill * price
-            filled_size += fill
-            remaining_size -= fill
-
-            if remaining_size <= 0:
-                break
-        
-        # If order book is thin, use last price for remaining
-        if remaining_size > 0 and filled_size > 0:
-            total_cost += remaining_size * sorted_asks[-1]['price']
-            filled_size += remaining_size
-        elif filled_size == 0:
-            return 1.0 # Infinitely expensive if no liquidity
-
-        return total_cost / filled_size
+        book = sorted_asks if isinstance(sorted_asks, OrderBookCurve) else OrderBookCurve.from_levels(sorted_asks)
+        return book.vwap(target_size)
+
+
+def _segment_root(qa: float, qb: float, qc: float, start: float, end: float) -> float:
+    """
+    Equilibrium of qa*S^2 + qb*S + qc (qa = 1 - price > 0) within [start, end].
+
+    The surplus has the opposite sign of the quadratic and is positive at `start`, so `start`
+    lies between the roots and the equilibrium is the larger one.
+    """
+    if abs(qa) < 1e-12:
+        root = -qc / qb if qb else start
+    else:
+        discriminant = max(qb * qb - 4 * qa * qc, 0.0)
+        # Numerically stable pair of roots.
+        q = -0.5 * (qb + math.copysign(math.sqrt(discriminant), qb))
+        root = max(q / qa, qc / q) if q else q / qa
+    return min(max(root, start), end)
+
+
+def _segment_roots(qa, qb, qc, start, end) -> np.ndarray:
+    """Vectorized `_segment_root` across markets."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discriminant = np.sqrt(np.maximum(qb * qb - 4 * qa * qc, 0.0))
+        q = -0.5 * (qb + np.copysign(discriminant, qb))
+        larger = np.fmax(q / qa, np.where(q != 0, qc / q, np.nan))
+        linear = np.where(qb != 0, -qc / qb, start)
+        root = np.where(np.abs(qa) < 1e-12, linear, larger)
+    return np.clip(np.where(np.isnan(root), start, root), start, end)
+
+
+class _FlatBooks:
+    """
+    Ragged books sorted by price within each book, with per-book inclusive prefix sums.
+    A zero-size sentinel level at the end keeps lookups for empty books in bounds.
+    """
+
+    def __init__(self, prices, sizes, offsets):
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self.markets = len(offsets) - 1
+        self.lengths = np.diff(offsets)
+        self.starts = offsets[:-1] - offsets[0]
+        self.book_of_level = np.repeat(np.arange(self.markets), self.lengths)
+        raw_prices = np.asarray(prices, dtype=np.float64)[offsets[0]:offsets[-1]]
+        raw_sizes = np.asarray(sizes, dtype=np.float64)[offsets[0]:offsets[-1]]
+        levels = len(raw_prices)
+        # Curves and live books arrive sorted already; only sort when some book is not.
+        new_book = np.diff(self.book_of_level) != 0
+        if not np.all((np.diff(raw_prices) >= 0) | new_book):
+            order = np.lexsort((raw_prices, self.book_of_level))
+            raw_prices, raw_sizes = raw_prices[order], raw_sizes[order]
+
+        # Padded with the sentinel level at index `levels`.
+        self.prices = np.append(raw_prices, 1.0)
+        self.sizes = np.append(raw_sizes, 0.0)
+        self.flat_size = np.cumsum(self.sizes)
+        flat_notional = np.cumsum(self.sizes * self.prices)
+        # Running totals before each book; subtracting them gives per-book prefix sums.
+        book = np.append(self.book_of_level, self.markets)
+        self.size_base = np.append(self.flat_size[self.starts] - self.sizes[self.starts], self.flat_size[-1])
+        notional_base = np.append(flat_notional[self.starts] - (self.sizes * self.prices)[self.starts], flat_notional[-1])
+        self.cum_size = self.flat_size - self.size_base[book]
+        self.cum_notional = flat_notional - notional_base[book]
+        self.size_base = self.size_base[:-1]
+
+        has_levels = self.lengths > 0
+        self.last = np.where(has_levels, self.starts + self.lengths - 1, levels)
+        self.depth = self.cum_size[self.last]
+        self.total_notional = self.cum_notional[self.last]
+        self.top_price = np.where(has_levels, self.prices[np.where(has_levels, self.starts, levels)], 1.0)
+
+    def boundary_vwap(self) -> np.ndarray:
+        """VWAP of filling each book exactly through each of its levels (sentinel excluded)."""
+        cum_size, cum_notional = self.cum_size[:-1], self.cum_notional[:-1]
+        filled = cum_size > 0
+        return np.where(filled, cum_notional / np.where(filled, cum_size, 1.0), self.prices[:-1])
+
+    def segment(self, below: np.ndarray):
+        """(start, end, notional before start, price) of the level after `below` levels of each book."""
+        in_tail = below >= self.lengths
+        level = np.where(in_tail, self.last, self.starts + below)
+        own_size, price = self.sizes[level], self.prices[level]
+        start = np.where(in_tail, self.depth, self.cum_size[level] - own_size)
+        notional = np.where(in_tail, self.total_notional, self.cum_notional[level] - own_size * price)
+        end = np.where(in_tail, np.inf, self.cum_size[level])
+        return start, end, notional, price
+
+    def vwap(self, size: np.ndarray) -> np.ndarray:
+        """VWAP of filling `size[i]` from book `i`; past visible depth at the last level's price."""
+        # flat_size never decreases across books, so one searchsorted serves all of them.
+        level = np.clip(np.searchsorted(self.flat_size, self.size_base + size, side="left"), self.starts, self.last)
+        own_size, price = self.sizes[level], self.prices[level]
+        inside = self.cum_notional[level] - own_size * price + (size - (self.cum_size[level] - own_size)) * price
+        tail = self.total_notional + (size - self.depth) * self.prices[self.last]
+        return np.where(size > self.depth, tail, inside) / size
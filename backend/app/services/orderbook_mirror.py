@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.singleflight import SingleFlight
+from app.services.kelly import OrderBookCurve
+
+logger = logging.getLogger("alpha_insights.orderbook_mirror")
+
+
+class BookSide:
+    """One side of a book as parallel price/size lists, kept sorted by ascending price."""
+
+    __slots__ = ("prices", "sizes")
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.sizes: List[float] = []
+
+    def replace(self, levels: Iterable[Dict[str, Any]]):
+        merged: Dict[float, float] = {}
+        for level in levels:
+            size = float(level["size"])
+            if size > 0:
+                merged[float(level["price"])] = size
+        self.prices = sorted(merged)
+        self.sizes = [merged[price] for price in self.prices]
+
+    def set(self, price: float, size: float):
+        """Sets the resting size at `price`; zero removes the level."""
+        index = bisect_left(self.prices, price)
+        present = index < len(self.prices) and self.prices[index] == price
+        if size <= 0:
+            if present:
+                del self.prices[index]
+                del self.sizes[index]
+        elif present:
+            self.sizes[index] = size
+        else:
+            self.prices.insert(index, price)
+            self.sizes.insert(index, size)
+
+    def levels(self, best_first_descending: bool) -> List[Dict[str, float]]:
+        pairs = zip(self.prices, self.sizes)
+        ordered = reversed(list(pairs)) if best_first_descending else pairs
+        return [{"price": price, "size": size} for price, size in ordered]
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+
+class TokenBook:
+    """Mirrored book for one outcome token."""
+
+    __slots__ = ("token_id", "bids", "asks", "seq", "timestamp", "synced_at", "updated_at", "stale", "buffered", "_curve")
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.bids = BookSide()
+        self.asks = BookSide()
+        self.seq: Optional[int] = None
+        self.timestamp = 0.0  # exchange time of the last applied event, ms
+        self.synced_at = 0.0  # local time of the last full snapshot
+        self.updated_at = 0.0
+        self.stale = True
+        # Deltas received while a resync is in flight, replayed on top of the snapshot.
+        self.buffered: List[tuple] = []
+        self._curve: Optional[OrderBookCurve] = None
+
+    @property
+    def best_bid(self) -> float:
+        return self.bids.prices[-1] if self.bids.prices else 0.0
+
+    @property
+    def best_ask(self) -> float:
+        return self.asks.prices[0] if self.asks.prices else 0.0
+
+    def ask_curve(self) -> OrderBookCurve:
+        """Prefix-sum ask curve for Kelly sizing, rebuilt only after the asks change."""
+        if self._curve is None:
+            self._curve = OrderBookCurve(self.asks.prices, self.asks.sizes)
+        return self._curve
+
+    def snapshot(self) -> Dict[str, Any]:
+        """`/book`-shaped dict, best price first on each side, plus mid price and spread."""
+        best_bid, best_ask = self.best_bid, self.best_ask
+        return {
+            "asset_id": self.token_id,
+            "bids": self.bids.levels(best_first_descending=True),
+            "asks": self.asks.levels(best_first_descending=False),
+            "timestamp": self.timestamp,
+            "mid_price": (best_bid + best_ask) / 2 if best_bid and best_ask else (best_bid or best_ask),
+            "spread": best_ask - best_bid if best_bid and best_ask else 0.0,
+        }
+
+
+def _sequence(event: Dict[str, Any]) -> Optional[int]:
+    seq = event.get("seq", event.get("sequence"))
+    return int(seq) if seq is not None else None
+
+
+def _timestamp(event: Dict[str, Any]) -> float:
+    try:
+        return float(event.get("timestamp") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OrderBookMirror:
+    """
+    In-memory copy of Polymarket CLOB books, fed by the market websocket.
+
+    `book` snapshots replace a token's book and `price_change` deltas set individual levels,
+    so reads (`book`, `orderbook`, `ask_curve`) never touch the network while the feed is
+    healthy. A book goes stale, and is resynced from the REST `/book` endpoint, when:
+    - a delta skips a sequence number (feeds that carry `seq`),
+    - the stream reconnects (deltas sent while disconnected are gone), or
+    - `resync_interval` passes, which bounds silent drift.
+    While a book is stale its deltas are buffered and replayed on top of the fresh snapshot
+    if they are newer than it; anything older than the book's state is dropped.
+    """
+
+    def __init__(self, connector, resync_interval: float = 300.0, max_buffered: int = 1000):
+        self.connector = connector
+        self.resync_interval = resync_interval
+        self.max_buffered = max_buffered
+        self.books: Dict[str, TokenBook] = {}
+        self.tracked: Set[str] = set()
+        self.stream = None
+        self._pending: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()
+        self._resyncs = SingleFlight()
+        self._tasks: List[asyncio.Task] = []
+        self._stream_factory = None
+        self.applied = 0
+        self.dropped = 0
+        self.gaps = 0
+        self.resync_count = 0
+
+    @classmethod
+    def from_env(cls, connector=None) -> Optional["OrderBookMirror"]:
+        if os.getenv("POLYMARKET_MIRROR_ENABLED", "false").lower() not in {"1", "true", "yes"}:
+            return None
+        if connector is None:
+            from app.connectors.polymarket import PolymarketConnector
+
+            connector = PolymarketConnector()
+        return cls(connector, resync_interval=float(os.getenv("POLYMARKET_MIRROR_RESYNC_SECONDS", "300")))
+
+    # --- Reads ---
+
+    def book(self, token_id: str) -> Optional[TokenBook]:
+        """The mirrored book, or None when the token is unknown or awaiting a resync."""
+        book = self.books.get(token_id)
+        return book if book is not None and not book.stale else None
+
+    async def orderbook(self, token_id: str) -> Dict[str, Any]:
+        """Drop-in for `polymarket_get_orderbook`: served from memory, fetched only when stale."""
+        book = self.book(token_id)
+        if book is None:
+            # Fetch first so a token the exchange does not know is never subscribed.
+            book = await self.resync(token_id)
+            await self.track([token_id])
+        return book.snapshot()
+
+    # --- Feed ---
+
+    async def track(self, token_ids: Iterable[str]):
+        new = [token_id for token_id in token_ids if token_id not in self.tracked]
+        if not new:
+            return
+        self.tracked.update(new)
+        if self._running_here():
+            await self.stream.subscribe(new)
+        elif self._stream_factory is not None:
+            # Deferred by `ensure_started` until there was something to subscribe to.
+            self.start(self._stream_factory(self.tracked))
+        elif self.stream is not None:
+            await self.stream.subscribe(new)
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        """Applies one feed event; returns False when it was dropped."""
+        event_type = event.get("event_type")
+        if event_type == "book":
+            return self._apply_snapshot(event["asset_id"], event, _sequence(event))
+        if event_type == "price_change":
+            return self._apply_changes(event)
+        if event_type == "reconnect":
+            for token_id in list(self.books):
+                self._mark_stale(token_id)
+            return True
+        return False
+
+    def _apply_snapshot(self, token_id: str, payload: Dict[str, Any], seq: Optional[int], authoritative: bool = False) -> bool:
+        book = self.books.get(token_id)
+        if book is None:
+            book = self.books[token_id] = TokenBook(token_id)
+        timestamp = _timestamp(payload)
+        if not authoritative and not book.stale and timestamp and timestamp < book.timestamp:
+            self.dropped += 1
+            return False
+        book.bids.replace(payload.get("bids") or [])
+        book.asks.replace(payload.get("asks") or [])
+        book.seq = seq
+        book.timestamp = timestamp
+        book.synced_at = book.updated_at = time.time()
+        book.stale = False
+        book._curve = None
+        self.applied += 1
+
+        buffered, book.buffered = book.buffered, []
+        for delta_seq, delta_timestamp, changes in buffered:
+            # Only deltas the snapshot does not already include.
+            newer = delta_seq > seq if delta_seq is not None and seq is not None else delta_timestamp > timestamp
+            if newer:
+                self._apply_token_changes(book, delta_seq, delta_timestamp, changes)
+        return True
+
+    def _apply_changes(self, event: Dict[str, Any]) -> bool:
+        # Older feeds send `changes` for one `asset_id`; newer ones `price_changes` carrying their own.
+        if "price_changes" in event:
+            grouped: Dict[str, List[Dict[str, Any]]] = {}
+            for change in event["price_changes"]:
+                grouped.setdefault(change["asset_id"], []).append(change)
+        else:
+            grouped = {event["asset_id"]: event.get("changes") or []}
+
+        seq, timestamp = _sequence(event), _timestamp(event)
+        applied = False
+        for token_id, changes in grouped.items():
+            book = self.books.get(token_id)
+            if book is None:
+                self.dropped += 1
+            elif book.stale:
+                if len(book.buffered) < self.max_buffered:
+                    book.buffered.append((seq, timestamp, changes))
+                else:
+                    # Too far behind to catch up from the buffer; the next snapshot starts clean.
+                    book.buffered = []
+                    self.dropped += 1
+            else:
+                applied = self._apply_token_changes(book, seq, timestamp, changes) or applied
+        return applied
+
+    def _apply_token_changes(self, book: TokenBook, seq: Optional[int], timestamp: float, changes) -> bool:
+        if seq is not None and book.seq is not None:
+            if seq <= book.seq:
+                self.dropped += 1
+                return False
+            if seq != book.seq + 1:
+                self.gaps += 1
+                logger.warning(f"Order book gap on {book.token_id}: expected seq {book.seq + 1}, got {seq}")
+                self._mark_stale(book.token_id)
+                book.buffered.append((seq, timestamp, changes))
+                return False
+        if timestamp and timestamp < book.timestamp:
+            self.dropped += 1
+            return False
+
+        for change in changes:
+            if str(change.get("side", "")).upper() == "BUY":
+                book.bids.set(float(change["price"]), float(change["size"]))
+            else:
+                book.asks.set(float(change["price"]), float(change["size"]))
+                book._curve = None
+        if seq is not None:
+            book.seq = seq
+        book.timestamp = max(book.timestamp, timestamp)
+        book.updated_at = time.time()
+        self.applied += 1
+        return True
+
+    def _mark_stale(self, token_id: str):
+        book = self.books.get(token_id)
+        if book is not None:
+            book.stale = True
+        self._schedule_resync(token_id)
+
+    def _schedule_resync(self, token_id: str):
+        if self._pending is not None and token_id not in self._queued:
+            self._queued.add(token_id)
+            self._pending.put_nowait(token_id)
+
+    async def resync(self, token_id: str) -> TokenBook:
+        """Replaces the token's book with a REST snapshot; concurrent calls share one fetch."""
+
+        async def fetch():
+            payload = await self.connector.call_tool("polymarket_get_orderbook", {"token_id": token_id})
+            self._apply_snapshot(token_id, payload, _sequence(payload), authoritative=True)
+            self.resync_count += 1
+            return self.books[token_id]
+
+        return await self._resyncs.do(token_id, fetch)
+
+    # --- Lifecycle ---
+
+    def start(self, stream) -> "OrderBookMirror":
+        """Consumes `stream` (an async iterable of feed events) on the running loop."""
+        self.stream = stream
+        self._pending = asyncio.Queue()
+        self._queued = set()
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._consume(stream)),
+            loop.create_task(self._resync_worker()),
+            loop.create_task(self._periodic_resync()),
+        ]
+        # The channel sends a `book` snapshot for every token on subscribe.
+        return self
+
+    def ensure_started(self, stream_factory):
+        """
+        Starts the feed on this loop unless it is already running here (one per worker loop).
+        With no tokens tracked yet the feed is not opened; the first `track` starts it.
+        """
+        self._stream_factory = stream_factory
+        if self._running_here() or not self.tracked:
+            return self
+        return self.start(stream_factory(self.tracked))
+
+    def _running_here(self) -> bool:
+        running = [task for task in self._tasks if not task.done()]
+        return bool(running) and running[0].get_loop() is asyncio.get_running_loop()
+
+    async def _consume(self, stream):
+        async for event in stream:
+            try:
+                self.apply(event)
+            except (KeyError, TypeError, ValueError) as exc:
+                self.dropped += 1
+                logger.warning(f"Skipping malformed order book event: {exc}")
+
+    async def _resync_worker(self):
+        while True:
+            token_id = await self._pending.get()
+            self._queued.discard(token_id)
+            try:
+                await self.resync(token_id)
+            except Exception as exc:
+                logger.warning(f"Order book resync failed for {token_id}: {exc}")
+
+    async def _periodic_resync(self):
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            for token_id in list(self.tracked):
+                self._schedule_resync(token_id)
+
+    async def close(self):
+        if self.stream is not None and hasattr(self.stream, "close"):
+            await self.stream.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self.tracked),
+            "books": len(self.books),
+            "stale": sum(1 for book in self.books.values() if book.stale),
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "gaps": self.gaps,
+            "resyncs": self.resync_count,
+        }
+
+
+orderbook_mirror = OrderBookMirror.from_env()
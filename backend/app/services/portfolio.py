@@ -0,0 +1,213 @@
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.kelly import (
+    MAX_KELLY_FRACTION,
+    OrderBookCurve,
+    OrderBookInput,
+    SlippageAwareKellyEngine,
+    flatten_order_books,
+    kelly_fraction_at,
+)
+from app.services.prediction_registry import QuestionNormalizer
+
+logger = logging.getLogger("alpha_insights.portfolio")
+
+
+def nearest_correlation(matrix: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Symmetric, unit-diagonal, positive semi-definite version of `matrix`. Hand-built or
+    LLM-derived matrices often are not PSD, which would make the allocation non-concave.
+    """
+    corr = np.asarray(matrix, dtype=np.float64)
+    corr = np.clip((corr + corr.T) / 2, -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    eigenvalues, eigenvectors = np.linalg.eigh(corr)
+    if eigenvalues.min() >= 0:
+        return corr
+    corr = (eigenvectors * np.maximum(eigenvalues, 0.0)) @ eigenvectors.T
+    scale = np.sqrt(np.clip(np.diag(corr), 1e-12, None))
+    corr = corr / np.outer(scale, scale)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def correlation_from_price_history(history: Sequence[Sequence[float]]) -> np.ndarray:
+    """Correlation of price changes; `history` is markets x observations on a shared clock."""
+    changes = np.diff(np.asarray(history, dtype=np.float64), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.corrcoef(changes)
+    # Flat series have no defined correlation; treat them as independent.
+    corr = np.nan_to_num(np.atleast_2d(corr), nan=0.0)
+    return nearest_correlation(corr)
+
+
+def correlation_from_links(
+    questions: Sequence[str],
+    linked_markets: Sequence[Sequence[str]],
+    strength: float = 0.5,
+    normalizer: Optional[QuestionNormalizer] = None,
+) -> np.ndarray:
+    """
+    Correlation from `search_semantic_correlations(_batch)` output: markets i and j get
+    `strength` when either lists the other among its semantically linked markets.
+    """
+    normalizer = normalizer or QuestionNormalizer()
+    keys = [normalizer.normalize(question) for question in questions]
+    corr = np.eye(len(questions))
+    for i, links in enumerate(linked_markets):
+        for link in links:
+            text = normalizer.normalize(str(link))
+            for j, key in enumerate(keys):
+                if j != i and key and (key in text or text in key):
+                    corr[i, j] = corr[j, i] = strength
+    return nearest_correlation(corr)
+
+
+class PortfolioKellyOptimizer:
+    """
+    Splits one bankroll across N markets using the slippage-aware per-market Kelly curves.
+
+    In Kelly units (each market's fraction scaled by its own variance), the growth gradient
+    for market i is
+
+        marginal_i = f*_i(VWAP_i(S_i)) - S_i / bankroll - sum_{j != i} rho_ij * S_j / bankroll
+
+    With rho = I, this is zero exactly at SlippageAwareKellyEngine's equilibrium. Correlated
+    holdings lower it, and hedges raise it, though only where the market itself still has
+    edge. Greedy marginal-edge allocation hands out `max_total_fraction * bankroll` in
+    chunks, always to the market with the largest marginal. Each chunk stops early at the
+    point where that market's marginal reaches zero. That point is the engine's own
+    equilibrium with the shifted inputs p' = (p - t) / (1 - t) and bankroll' = bankroll * (1 - t),
+    where t is the correlation penalty. Sizes are accurate to one chunk when the budget binds,
+    and exact otherwise.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[SlippageAwareKellyEngine] = None,
+        max_total_fraction: float = 1.0,
+        steps: int = 1000,
+        tolerance: float = 1e-9,
+    ):
+        self.engine = engine or SlippageAwareKellyEngine()
+        self.max_total_fraction = max_total_fraction
+        self.steps = steps
+        self.tolerance = tolerance
+
+    def allocate(
+        self,
+        model_probabilities: Sequence[float],
+        order_books: Sequence[OrderBookInput],
+        bankroll: float,
+        correlation: Optional[Sequence[Sequence[float]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Args:
+            model_probabilities: LLM derived probability per market
+            order_books: Ask levels per market, as level lists or OrderBookCurves
+            bankroll: Capital shared by every market
+            correlation: N x N outcome correlation (identity when omitted)
+
+        Returns:
+            Dict with per-market `allocations` (the engine's keys plus `standalone_size`, what
+            the market would get if it owned the whole bankroll), `total_size`,
+            `committed_fraction`, `standalone_total` and `iterations`.
+        """
+        probabilities = np.asarray(model_probabilities, dtype=np.float64)
+        markets = len(probabilities)
+        curves = [book if isinstance(book, OrderBookCurve) else OrderBookCurve.from_levels(book) for book in order_books]
+        corr = np.eye(markets) if correlation is None else nearest_correlation(correlation)
+        coupling = corr - np.eye(markets)
+
+        sizes = np.zeros(markets)
+        penalty = np.zeros(markets)  # sum_{j != i} rho_ij * S_j / bankroll
+        marginal = np.array([self._marginal(p, curve, 0.0, 0.0, bankroll) for p, curve in zip(probabilities, curves)])
+        cap = bankroll * MAX_KELLY_FRACTION
+        remaining = bankroll * self.max_total_fraction if bankroll > 0 else 0.0
+        chunk = remaining / max(self.steps, 1)
+        threshold = self.tolerance * max(bankroll, 1.0)
+
+        iterations = 0
+        # Every pass either spends a chunk or settles one market at its zero-marginal point.
+        max_iterations = 4 * (self.steps + markets)
+        while remaining > threshold and iterations < max_iterations and markets:
+            iterations += 1
+            i = int(np.argmax(marginal))
+            if marginal[i] <= self.tolerance:
+                break
+            target = self._target_size(probabilities[i], curves[i], penalty[i], bankroll, cap)
+            step = min(chunk, remaining, target - sizes[i])
+            if step <= threshold:
+                marginal[i] = 0.0
+                continue
+
+            sizes[i] += step
+            remaining -= step
+            shift = coupling[:, i] * (step / bankroll)
+            penalty += shift
+            marginal -= shift
+            marginal[i] = (
+                -math.inf if sizes[i] >= cap - threshold
+                else self._marginal(probabilities[i], curves[i], sizes[i], penalty[i], bankroll)
+            )
+
+        if iterations >= max_iterations:
+            logger.warning(f"Portfolio allocation stopped after {iterations} iterations")
+        return self._summarize(probabilities, curves, sizes, bankroll, iterations)
+
+    @staticmethod
+    def _marginal(p: float, curve: OrderBookCurve, size: float, penalty: float, bankroll: float) -> float:
+        if bankroll <= 0:
+            return -math.inf
+        fraction = kelly_fraction_at(p, curve.vwap(size), limit=None)
+        if fraction <= 0:
+            return -math.inf
+        return fraction - size / bankroll - penalty
+
+    def _target_size(self, p: float, curve: OrderBookCurve, penalty: float, bankroll: float, cap: float) -> float:
+        """Size at which the market's marginal reaches zero, given the other holdings."""
+        if penalty >= 1:
+            return 0.0
+        # f*_p(v) - t == (1 - t) * f*_{p'}(v), so this is the engine's equilibrium on shifted inputs.
+        shifted_p = (p - penalty) / (1 - penalty)
+        target = self.engine.equilibrium_size(shifted_p, curve, bankroll * (1 - penalty), cap=cap)
+        if penalty < 0:
+            # A hedge credit never justifies buying past the market's own edge.
+            target = min(target, curve.size_at_vwap(p))
+        return target
+
+    def _summarize(self, probabilities, curves, sizes, bankroll: float, iterations: int) -> Dict[str, Any]:
+        prices, level_sizes, offsets = flatten_order_books(curves)
+        standalone = self.engine.calculate_optimal_sizes(
+            probabilities, np.full(len(curves), float(bankroll)), prices, level_sizes, offsets
+        )["optimal_size"]
+
+        allocations: List[Dict[str, Any]] = []
+        for p, curve, size, alone in zip(probabilities, curves, sizes, standalone):
+            if size <= 0:
+                allocations.append({
+                    "optimal_size": 0.0, "expected_vwap": 0.0, "kelly_fraction": 0.0,
+                    "expected_value": -1.0, "standalone_size": float(alone),
+                })
+                continue
+            vwap = curve.vwap(size)
+            allocations.append({
+                "optimal_size": float(size),
+                "expected_vwap": vwap,
+                "kelly_fraction": float(size / bankroll),
+                "expected_value": (p * (1 - vwap)) - ((1 - p) * vwap),
+                "standalone_size": float(alone),
+            })
+
+        total = float(sizes.sum())
+        return {
+            "allocations": allocations,
+            "total_size": total,
+            "committed_fraction": total / bankroll if bankroll > 0 else 0.0,
+            "standalone_total": float(standalone.sum()),
+            "iterations": iterations,
+        }
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.core.serialization import serializer
+
+logger = logging.getLogger("alpha_insights.prediction_registry")
+
+RESULT_PREFIX = "prediction_result:"
+INFLIGHT_PREFIX = "prediction_inflight:"
+
+# Deletes the in-flight claim only if it still names this task; a newer claim is left alone.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Pushes back the expiry of every claim in KEYS that still names this task.
+EXTEND_SCRIPT = """
+local extended = 0
+for _, key in ipairs(KEYS) do
+  if redis.call('GET', key) == ARGV[1] then
+    redis.call('EXPIRE', key, ARGV[2])
+    extended = extended + 1
+  end
+end
+return extended
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def load_synonyms() -> Dict[str, str]:
+    """
+    Phrase -> canonical phrase, from PREDICTION_SYNONYMS (inline JSON) or
+    PREDICTION_SYNONYMS_FILE (path to a JSON file), e.g. {"wti": "crude oil", "btc": "bitcoin"}.
+    """
+    raw = os.getenv("PREDICTION_SYNONYMS")
+    path = os.getenv("PREDICTION_SYNONYMS_FILE")
+    try:
+        if path:
+            with open(path) as handle:
+                return json.load(handle)
+        return json.loads(raw) if raw else {}
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Ignoring prediction synonyms: {exc}")
+        return {}
+
+
+class QuestionNormalizer:
+    """Folds case, Unicode forms, whitespace and trailing punctuation, then applies synonyms."""
+
+    def __init__(self, synonyms: Optional[Dict[str, str]] = None):
+        self.synonyms = {self._fold(phrase): self._fold(canonical) for phrase, canonical in (synonyms or {}).items()}
+        self._pattern = None
+        if self.synonyms:
+            # Longest phrases first so "brent crude" wins over "crude".
+            phrases = sorted(self.synonyms, key=len, reverse=True)
+            self._pattern = re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        text = unicodedata.normalize("NFKC", text).casefold()
+        return _WHITESPACE.sub(" ", text).strip()
+
+    def normalize(self, question: str) -> str:
+        text = _TRAILING_PUNCTUATION.sub("", self._fold(question))
+        if self._pattern is not None:
+            text = self._pattern.sub(lambda match: self.synonyms[match.group(1)], text)
+        return text
+
+    def key(self, question: str) -> str:
+        return hashlib.md5(self.normalize(question).encode()).hexdigest()
+
+
+class PredictionRegistry:
+    """
+    Completed results and in-flight task claims, keyed by the normalized question.
+
+    The API claims `prediction_inflight:<hash>` with SET NX before enqueueing, so a duplicate
+    submission attaches to the running task instead of starting another pipeline run. The
+    worker writes `prediction_result:<hash>` when the task succeeds and releases the claim;
+    batch jobs renew their claims with `extend` until each question is done.
+    """
+
+    def __init__(
+        self,
+        normalizer: Optional[QuestionNormalizer] = None,
+        result_ttl: int = 3600,
+        inflight_ttl: int = 900,
+    ):
+        self.normalizer = normalizer or QuestionNormalizer()
+        self.result_ttl = result_ttl
+        # Longer than a forecast's stage budget; a crashed worker's claim expires on its own.
+        self.inflight_ttl = inflight_ttl
+
+    @classmethod
+    def from_env(cls) -> "PredictionRegistry":
+        return cls(
+            QuestionNormalizer(load_synonyms()),
+            result_ttl=int(os.getenv("PREDICTION_RESULT_TTL_SECONDS", "3600")),
+            inflight_ttl=int(os.getenv("PREDICTION_INFLIGHT_TTL_SECONDS", "900")),
+        )
+
+    def key(self, question: str) -> str:
+        return self.normalizer.key(question)
+
+    def result_key(self, question: str) -> str:
+        return f"{RESULT_PREFIX}{self.key(question)}"
+
+    def inflight_key(self, question: str) -> str:
+        return f"{INFLIGHT_PREFIX}{self.key(question)}"
+
+    # --- API side (async client) ---
+
+    async def claim(self, redis_client, question: str, task_id: Optional[str] = None) -> tuple[str, bool]:
+        """
+        Returns (task_id, claimed). When not claimed, task_id is the task already running.
+        Pass `task_id` to claim under an existing id, e.g. one batch job for many questions.
+        """
+        task_id = task_id or str(uuid.uuid4())
+        inflight_key = self.inflight_key(question)
+        existing = None
+        for _ in range(3):
+            if await redis_client.set(inflight_key, task_id, nx=True, ex=self.inflight_ttl):
+                return task_id, True
+            existing = await redis_client.get(inflight_key)
+            if existing is not None:
+                break
+            # The claim was released between SET NX and GET; try to take it over.
+        if existing is None:
+            return task_id, True
+        return existing.decode() if isinstance(existing, bytes) else existing, False
+
+    async def abandon(self, redis_client, question: str, task_id: str):
+        """Drops a claim whose task never made it onto the queue."""
+        await redis_client.eval(RELEASE_SCRIPT, 1, self.inflight_key(question), task_id)
+
+    # --- Worker side (sync client) ---
+
+    def extend(self, redis_client, questions: List[str], task_id: str) -> int:
+        """Renews this task's claims for another `inflight_ttl`; a long batch calls it while it runs."""
+        if not questions:
+            return 0
+        keys = [self.inflight_key(question) for question in questions]
+        return redis_client.eval(EXTEND_SCRIPT, len(keys), *keys, task_id, self.inflight_ttl)
+
+    def complete(self, redis_client, question: str, task_id: Optional[str], result: Optional[Dict[str, Any]]):
+        """Writes a successful result (no `error` set) back with its TTL, then releases the task's claim."""
+        if result is not None and not result.get("error"):
+            redis_client.setex(self.result_key(question), self.result_ttl, serializer.dumps(result))
+        if task_id:
+            redis_client.eval(RELEASE_SCRIPT, 1, self.inflight_key(question), task_id)
+
+
+prediction_registry = PredictionRegistry.from_env()
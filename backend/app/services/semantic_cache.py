@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger("alpha_insights.semantic_cache")
+
+EMBEDDING_DIM = 1024
+
+
+@dataclass
+class CachedForecast:
+    question: str
+    result: Dict[str, Any]
+    created_at: float  # unix seconds
+
+
+@dataclass
+class SemanticHit:
+    forecast: CachedForecast
+    similarity: float
+    source: str  # "memory" or "pgvector"
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.forecast.created_at
+
+
+def _unit(vector: Sequence[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else None
+
+
+class SemanticIndex:
+    """
+    Ring buffer of the most recent unit-normalized question embeddings. A lookup is one
+    matrix-vector product over at most `capacity` rows (~2 ms at 5k x 1024), so exact search
+    is cheap enough here; pgvector's HNSW index covers the long tail across processes.
+    """
+
+    def __init__(self, capacity: int = 5000, dim: int = EMBEDDING_DIM):
+        self.capacity = capacity
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.created_at = np.zeros(capacity, dtype=np.float64)
+        self.entries: List[Optional[CachedForecast]] = [None] * capacity
+        self.size = 0
+        self._next = 0
+
+    def add(self, vector: np.ndarray, forecast: CachedForecast):
+        slot = self._next
+        self.vectors[slot] = vector
+        self.created_at[slot] = forecast.created_at
+        self.entries[slot] = forecast
+        self._next = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def search(self, vector: np.ndarray, max_age: float) -> Optional[tuple[CachedForecast, float]]:
+        if not self.size:
+            return None
+        similarities = self.vectors[: self.size] @ vector
+        similarities[self.created_at[: self.size] < time.time() - max_age] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < 0:
+            return None
+        return self.entries[best], float(similarities[best])
+
+
+class SemanticForecastCache:
+    """
+    Serves a recent ForecastResult for a differently worded question about the same thing.
+
+    Questions are embedded with the shared bge-m3 model. Each lookup checks the in-process
+    index first, then the `forecast_cache` table in pgvector, which workers write to when
+    they finish a forecast. A match needs cosine similarity >= `threshold` and an age under
+    `max_age`. A high threshold is deliberate, because "Brent above $100" and "Brent above $90"
+    embed close together.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Optional[Sequence[float]]],
+        threshold: float = 0.92,
+        max_age: float = 3600,
+        index: Optional[SemanticIndex] = None,
+        session_factory=None,
+    ):
+        self._embed = embed
+        self.threshold = threshold
+        self.max_age = max_age
+        self.index = index or SemanticIndex()
+        self.session_factory = session_factory
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["SemanticForecastCache"]:
+        if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() not in {"1", "true", "yes"}:
+            return None
+        from app.db.session import AsyncSessionLocal
+
+        return cls(
+            embed_question,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            max_age=float(os.getenv("SEMANTIC_CACHE_MAX_AGE_SECONDS", "3600")),
+            index=SemanticIndex(capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY", "5000"))),
+            session_factory=AsyncSessionLocal,
+        )
+
+    async def embed(self, question: str) -> Optional[np.ndarray]:
+        """Unit vector for `question`, or None when no embedding model is available."""
+        vector = await asyncio.to_thread(self._embed, question)
+        return _unit(vector) if vector is not None else None
+
+    async def lookup(self, question: str, vector: Optional[np.ndarray] = None) -> Optional[SemanticHit]:
+        vector = vector if vector is not None else await self.embed(question)
+        if vector is None:
+            return None
+
+        local = self.index.search(vector, self.max_age)
+        if local and local[1] >= self.threshold:
+            self.memory_hits += 1
+            return SemanticHit(local[0], local[1], "memory")
+
+        remote = await self._search_db(vector)
+        if remote and remote[1] >= self.threshold:
+            self.db_hits += 1
+            forecast, similarity, stored = remote
+            # Index the entry under its own embedding; the query's would let later paraphrases
+            # chain through this one and drift away from the original question.
+            if stored is not None:
+                self.index.add(stored, forecast)
+            return SemanticHit(forecast, similarity, "pgvector")
+
+        self.misses += 1
+        return None
+
+    async def _search_db(self, vector: np.ndarray) -> Optional[tuple[CachedForecast, float, Optional[np.ndarray]]]:
+        """Nearest fresh row as (forecast, similarity, the row's stored unit embedding)."""
+        if self.session_factory is None:
+            return None
+        from sqlalchemy import select
+        from app.db.models import ForecastCacheEntry
+
+        distance = ForecastCacheEntry.embedding.cosine_distance(vector.tolist()).label("distance")
+        cutoff = datetime.utcnow() - timedelta(seconds=self.max_age)
+        stmt = (
+            select(ForecastCacheEntry, distance)
+            .where(ForecastCacheEntry.created_at >= cutoff)
+            .order_by(distance)
+            .limit(1)
+        )
+        try:
+            async with self.session_factory() as session:
+                row = (await session.execute(stmt)).first()
+        except Exception as exc:
+            logger.warning(f"Semantic cache lookup failed: {exc}")
+            return None
+        if row is None:
+            return None
+        entry, distance_value = row
+        created_at = entry.created_at.replace(tzinfo=entry.created_at.tzinfo or timezone.utc).timestamp()
+        stored = _unit(entry.embedding) if entry.embedding is not None else None
+        return CachedForecast(entry.question, entry.result, created_at), 1.0 - float(distance_value), stored
+
+    async def store(
+        self,
+        question: str,
+        result: Dict[str, Any],
+        vector: Optional[Sequence[float]] = None,
+        model: Optional[str] = None,
+    ):
+        """Indexes a finished forecast; `vector` is the embedding the API already computed, if any."""
+        unit = _unit(vector) if vector is not None else await self.embed(question)
+        if unit is None:
+            return
+        forecast = CachedForecast(question, result, time.time())
+        self.index.add(unit, forecast)
+        if self.session_factory is None:
+            return
+        from app.db.models import ForecastCacheEntry
+
+        try:
+            async with self.session_factory() as session:
+                session.add(ForecastCacheEntry(question=question, model=model, result=result, embedding=unit.tolist()))
+                await session.commit()
+        except Exception as exc:
+            logger.warning(f"Semantic cache write failed: {exc}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "indexed": self.index.size,
+            "memory_hits": self.memory_hits,
+            "pgvector_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def embed_question(question: str) -> Optional[List[float]]:
+    # The agents package only loads sentence-transformers when this is first called.
+    from app.agents.news_agent import load_embedder
+
+    embedder = load_embedder()
+    if embedder is None:
+        # NewsAgent's constant mock vector would make every question "identical"; skip instead.
+        return None
+    return embedder.encode(question, normalize_embeddings=True).tolist()
+
+
+semantic_cache = SemanticForecastCache.from_env()
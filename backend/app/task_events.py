@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.cache import ar  # Shared async Redis pool
+from app.core.serialization import serializer
+
+logger = logging.getLogger("alpha_insights.task_events")
+
+CHANNEL_PREFIX = "task_events:"
+STREAM_PREFIX = "task_stream:"
+TERMINAL_EVENTS = {"complete", "failed"}
+START_CURSOR = "0-0"
+
+# A batch job emits one `result` per question plus status updates; keep comfortably more.
+STREAM_MAXLEN = int(os.getenv("TASK_EVENT_STREAM_MAXLEN", "1000"))
+STREAM_TTL_SECONDS = int(os.getenv("TASK_EVENT_STREAM_TTL_SECONDS", "86400"))
+
+
+def task_channel(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def task_stream(task_id: str) -> str:
+    return f"{STREAM_PREFIX}{task_id}"
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def stream_position(event_id: str) -> Tuple[int, int]:
+    """Orders stream ids ("<ms>-<seq>") numerically; a plain string compare gets 9 > 10 wrong."""
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def record_event(redis_client, task_id: str, event: Dict[str, Any]) -> str:
+    """
+    Appends `event` to the task's stream (trimmed and expiring), then publishes it with
+    its stream id for live subscribers. Uses the sync client; called from Celery workers.
+    """
+    stream = task_stream(task_id)
+    event_id = _text(
+        redis_client.xadd(stream, {"data": serializer.dumps(event)}, maxlen=STREAM_MAXLEN, approximate=True)
+    )
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.expire(stream, STREAM_TTL_SECONDS)
+    pipe.publish(task_channel(task_id), serializer.dumps({**event, "id": event_id}))
+    pipe.execute()
+    return event_id
+
+
+class TaskEventHub:
+    """
+    One pattern subscription (`task_events:*`) per process, fanned out to per-connection
+    queues. The listener blocks on the pubsub socket, so an idle WebSocket costs no Redis
+    traffic and an event reaches its subscribers as soon as Redis delivers it.
+    """
+
+    def __init__(self, redis_client, queue_size: int = 256, reconnect_delay: float = 1.0):
+        self.redis = redis_client
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+
+    def _ensure_listener(self):
+        loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._subscribed = asyncio.Event()
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Task event listener disconnected, retrying: {exc}")
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                self._subscribed.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _dispatch(self, channel, data):
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        queues = self._subscribers.get(channel[len(CHANNEL_PREFIX):])
+        if not queues:
+            return
+        try:
+            event = serializer.loads(data)
+        except ValueError as exc:
+            logger.warning(f"Dropping undecodable task event on {channel}: {exc}")
+            return
+        for queue in queues:
+            if queue.full():
+                # A stalled client loses its oldest event rather than blocking everyone else.
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str, timeout: float = 5.0) -> AsyncIterator[asyncio.Queue]:
+        """Yields a queue receiving every event published for `task_id` from now on."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            self._ensure_listener()
+            try:
+                await asyncio.wait_for(self._subscribed.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Task event listener is not subscribed yet; events may be missed")
+            yield queue
+        finally:
+            queues = self._subscribers.get(task_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    self._subscribers.pop(task_id, None)
+
+    async def replay(self, task_id: str, after: str = START_CURSOR) -> List[Dict[str, Any]]:
+        """Events recorded for `task_id` after the `after` stream id, oldest first."""
+        entries = await self.redis.xrange(task_stream(task_id), min=f"({after}", max="+")
+        events = []
+        for entry_id, fields in entries:
+            data = fields.get(b"data", fields.get("data"))
+            events.append({**serializer.loads(data), "id": _text(entry_id)})
+        return events
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tasks": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+task_events = TaskEventHub(ar)
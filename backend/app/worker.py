@@ -1,7 +1,18 @@
 from celery import Celery
-import os
+from kombu import Exchange, Queue
+from celery.signals import worker_process_init, worker_process_shutdown
 import asyncio
+import logging
+import os
+from app.core.concurrency import RequestPriority, priority_scope
+from app.core.serialization import register_celery_serializer
+from app.services.prediction_registry import prediction_registry
+from app.services.semantic_cache import semantic_cache
+from app.task_events import record_event
 from app.intelligence.application.engine import IntelligenceMirrorEngine
+from app.worker_runtime import WorkerRuntime
+
+logger = logging.getLogger("alpha_insights.worker")
 
 # Initialize Celery
 # ... (rest of imports/init)
@@ -14,57 +25,221 @@ else:
     redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
     celery_app = Celery(__name__, broker=redis_url, backend=redis_url)
 
-# Instantiate engine once (global) - careful with concurrency if not thread safe
-# For simple stateless logic it's fine
-# REMOVED GLOBAL ENGINE to avoid race conditions and resource leaks in workers
-# engine = IntelligenceMirrorEngine()
+# Results share the cache's versioned codec; JSON stays accepted for results written before it.
+celery_app.conf.update(
+    result_serializer=register_celery_serializer(),
+    accept_content=["json", "alpha"],
+    result_accept_content=["json", "alpha"],
+)
+
+# One queue per workload class, each consumed by its own worker pool (see docker-compose), so
+# queued background work never sits in front of an interactive forecast.
+QUEUE_INTERACTIVE = "forecast.interactive"
+QUEUE_BATCH = "forecast.batch"
+QUEUE_INGESTION = "ingestion"
+QUEUE_MAINTENANCE = "maintenance"
+TASK_QUEUES = (QUEUE_INTERACTIVE, QUEUE_BATCH, QUEUE_INGESTION, QUEUE_MAINTENANCE)
+
+celery_app.conf.update(
+    task_queues=[Queue(name, Exchange(name), routing_key=name) for name in TASK_QUEUES],
+    task_default_queue=QUEUE_MAINTENANCE,
+    task_routes={
+        "run_forecast": {"queue": QUEUE_INTERACTIVE},
+        "run_batch_forecast": {"queue": QUEUE_BATCH},
+        "scrape_markets": {"queue": QUEUE_INGESTION},
+        "generate_insights": {"queue": QUEUE_MAINTENANCE},
+        "critique_insights": {"queue": QUEUE_MAINTENANCE},
+    },
+    # Tasks run for minutes: reserve one at a time and acknowledge only once finished, so a
+    # busy process never hoards queued work and a crashed one hands its task back.
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # With acks_late on Redis, an unacked task is redelivered after this long; keep it above
+    # the longest forecast so a slow run is not duplicated.
+    broker_transport_options={"visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT_SECONDS", "7200"))},
+)
+
+# One event loop and a small engine pool per worker process. Each engine serves one task
+# at a time; the shared AI client keeps its warm connection pool across tasks.
+runtime = WorkerRuntime(IntelligenceMirrorEngine, pool_size=int(os.getenv("WORKER_ENGINE_POOL_SIZE", "4")))
+
+
+@worker_process_init.connect
+def start_worker_runtime(**kwargs):
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_runtime(**kwargs):
+    from app.core.ai_client import ai_client
+    from app.services.orderbook_mirror import orderbook_mirror
+    closers = [orderbook_mirror.close] if orderbook_mirror is not None else []
+    if _polymarket_connector is not None:
+        closers.append(_polymarket_connector.disconnect)
+    runtime.stop(*closers, ai_client.close)
+
+
+_polymarket_connector = None
+
+
+def polymarket_connector():
+    """One connector per worker process, so its connection pool is reused across scrapes."""
+    global _polymarket_connector
+    if _polymarket_connector is None:
+        from app.connectors.polymarket import PolymarketConnector
+        from app.services.orderbook_mirror import orderbook_mirror
+        # The mirror resyncs through a connector of its own; share it rather than open a second pool.
+        _polymarket_connector = orderbook_mirror.connector if orderbook_mirror is not None else PolymarketConnector()
+    return _polymarket_connector
+
+async def queue_depths(redis_client) -> dict[str, int]:
+    """Messages waiting per queue; the Redis transport keeps each queue as a list under its name."""
+    pipe = redis_client.pipeline(transaction=False)
+    for name in TASK_QUEUES:
+        pipe.llen(name)
+    return dict(zip(TASK_QUEUES, await pipe.execute()))
+
+
+def store_prediction(task_id, question, result):
+    """Fills `prediction_result:*` and releases the in-flight claim; never fails the task."""
+    from app.cache import r as redis_client
+    try:
+        prediction_registry.complete(redis_client, question, task_id, result)
+    except Exception as exc:
+        logger.warning(f"Prediction write-back failed for {task_id}: {exc}")
+
+
+def renew_claims(task_id, questions):
+    """Keeps a running batch's in-flight claims alive; never fails the task."""
+    from app.cache import r as redis_client
+    try:
+        prediction_registry.extend(redis_client, questions, task_id)
+    except Exception as exc:
+        logger.warning(f"Claim renewal failed for {task_id}: {exc}")
+
 
 def publish_event(task_id, event, message):
     from app.cache import r as redis_client
-    import json
-    channel = f"task_events:{task_id}"
-    redis_client.publish(channel, json.dumps({"event": event, "message": message, "timestamp": os.getenv("CURRENT_TIME", "")}))
+    record_event(redis_client, task_id, {"event": event, "message": message, "timestamp": os.getenv("CURRENT_TIME", "")})
 
 @celery_app.task(name="run_forecast", bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
-def run_forecast_task(self, question: str, model: str = "lfm-thinking"):
+def run_forecast_task(self, question: str, model: str = "lfm-thinking", embedding: list[float] | None = None):
     """
     Wrapper to run async engine logic in a synchronous Celery worker.
     """
     task_id = self.request.id
     
     async def _run_logic():
-        # Instantiate engine per task for isolation
-        # This ensures fresh httpx client and event loop compatibility
-        local_engine = IntelligenceMirrorEngine()
-        
         async def status_cb(msg):
             publish_event(task_id, "status", msg)
-            
-        try:
-            result = await local_engine.run_analysis(question, model, status_callback=status_cb)
-            publish_event(task_id, "complete", "Analysis finished.")
-            return result.dict()
-        except Exception as e:
-            publish_event(task_id, "failed", str(e))
-            return {"error": str(e)}
-        finally:
-            await local_engine.close()
 
-    try:
-        # Check if an event loop is already running (e.g. if worker is async or tests)
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If loop is running, we cannot use asyncio.run() directly in this thread.
-            # We must run it in a separate thread.
-            from concurrent.futures import ThreadPoolExecutor
-            def run_in_thread():
-                return asyncio.run(_run_logic())
-                
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                return executor.submit(run_in_thread).result()
-    except RuntimeError:
-        # No loop running in this thread
-        pass
-
-    # If no loop is running, use asyncio.run
-    return asyncio.run(_run_logic())
+        async with runtime.engine() as local_engine:
+            try:
+                with priority_scope(RequestPriority.PREDICTION):
+                    result = await local_engine.run_analysis(question, model, status_callback=status_cb)
+                store_prediction(task_id, question, result.dict())
+                if semantic_cache is not None and embedding and not result.error:
+                    await semantic_cache.store(question, result.dict(), embedding, model=model)
+                publish_event(task_id, "complete", "Analysis finished.")
+                return result.dict()
+            except Exception as e:
+                store_prediction(task_id, question, None)
+                publish_event(task_id, "failed", str(e))
+                return {"error": str(e)}
+
+    return runtime.run(_run_logic)
+
+
+@celery_app.task(name="run_batch_forecast", bind=True)
+def run_batch_forecast_task(
+    self, questions: list[str], model: str = "lfm-thinking", embeddings: dict[str, list[float]] | None = None
+):
+    """
+    Analyze a list of questions as one job. Each finished question is published as a
+    `result` event on the job's lifecycle channel; the task returns every result by question.
+    The API claimed every question under this task's id, so each claim is released as its
+    result is written back; until then they are renewed, since a long watchlist can outlast
+    the claim TTL.
+    """
+    task_id = self.request.id
+    embeddings = embeddings or {}
+
+    async def _run_logic():
+        finished = set()
+
+        async def keep_claims():
+            while True:
+                await asyncio.sleep(prediction_registry.inflight_ttl / 3)
+                unfinished = [question for question in questions if question not in finished]
+                await asyncio.to_thread(renew_claims, task_id, unfinished)
+
+        async def status_cb(msg):
+            publish_event(task_id, "status", msg)
+
+        async def result_cb(index, question, result):
+            finished.add(question)
+            store_prediction(task_id, question, result.dict())
+            if semantic_cache is not None and embeddings.get(question) and not result.error:
+                await semantic_cache.store(question, result.dict(), embeddings[question], model=model)
+            publish_event(task_id, "result", {"index": index, "question": question, "result": result.dict()})
+
+        async with runtime.engine() as local_engine:
+            renewal = asyncio.create_task(keep_claims())
+            try:
+                with priority_scope(RequestPriority.PREDICTION):
+                    results = await local_engine.run_batch_analysis(
+                        questions, model, on_result=result_cb, status_callback=status_cb
+                    )
+                publish_event(task_id, "complete", f"Batch of {len(results)} questions finished.")
+                return {"results": {question: result.dict() for question, result in results.items()}}
+            except Exception as e:
+                publish_event(task_id, "failed", str(e))
+                return {"error": str(e)}
+            finally:
+                renewal.cancel()
+                for question in questions:
+                    if question not in finished:
+                        store_prediction(task_id, question, None)
+
+    return runtime.run(_run_logic)
+
+
+def _run_background(run_logic):
+    async def _scoped():
+        with priority_scope(RequestPriority.BACKGROUND):
+            return await run_logic()
+
+    return runtime.run(_scoped)
+
+
+@celery_app.task(name="scrape_markets")
+def scrape_markets_task():
+    """Refresh Polymarket markets and order books (ingestion queue)."""
+    from app.agents.scraping_agent import ScrapingAgent
+    from app.connectors.polymarket import PolymarketMarketStream
+    from app.services.orderbook_mirror import orderbook_mirror
+
+    async def scrape():
+        # The runtime loop outlives the task, so the mirror's feed and the connector's
+        # connection pool are kept between scrapes.
+        mirror = orderbook_mirror.ensure_started(PolymarketMarketStream) if orderbook_mirror is not None else None
+        return await ScrapingAgent(polymarket_connector(), mirror=mirror).scrape_active_markets()
+
+    return _run_background(scrape)
+
+
+@celery_app.task(name="generate_insights")
+def generate_insights_task():
+    """Turn recent order-book history into market insights (maintenance queue)."""
+    from app.agents.insight_agent import InsightAgent
+
+    return _run_background(InsightAgent().generate_insights)
+
+
+@celery_app.task(name="critique_insights")
+def critique_insights_task():
+    """Score insights that have not been critiqued yet (maintenance queue)."""
+    from app.agents.critic_agent import CriticAgent
+
+    return _run_background(CriticAgent().critique_insights)
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger("alpha_insights.worker_runtime")
+
+
+class WorkerRuntime:
+    """
+    One long-lived event loop per worker process, run on a daemon thread, plus a pool of
+    reusable engines. Celery tasks stay synchronous and hand their coroutine to `run`, so
+    the shared AI client's connection pool, its single-flight table and the engines all
+    live on a loop that outlives any one task.
+
+    Threads do not survive fork: prefork children start their own runtime from
+    `worker_process_init`, and `run` restarts it if it finds itself in a new process.
+    """
+
+    def __init__(self, engine_factory: Optional[Callable[[], Any]] = None, pool_size: int = 4):
+        self.engine_factory = engine_factory
+        self.pool_size = pool_size
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._idle: Optional[asyncio.Queue] = None
+        self._engines: List[Any] = []
+        self.engines_created = 0
+        self.tasks_run = 0
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and self._pid == os.getpid() and self.loop.is_running()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._pid = os.getpid()
+            self._idle = None
+            self._engines = []
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="worker-event-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+        logger.info("Worker event loop started", extra={"event": "worker_loop_started", "pid": self._pid})
+
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+
+    def run(self, run_logic: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Runs `run_logic()` on the worker loop and blocks the calling (task) thread for its result."""
+        if not self.running:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(run_logic(), self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Celery time limits and worker shutdown interrupt the wait; stop the coroutine too.
+            future.cancel()
+            raise
+        finally:
+            self.tasks_run += 1
+
+    @asynccontextmanager
+    async def engine(self) -> AsyncIterator[Any]:
+        """Borrows an engine for the duration of one analysis; at most `pool_size` are built."""
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        if self._idle.empty() and len(self._engines) < self.pool_size:
+            engine = self.engine_factory()
+            self._engines.append(engine)
+            self.engines_created += 1
+        else:
+            engine = await self._idle.get()
+        try:
+            yield engine
+        finally:
+            self._idle.put_nowait(engine)
+
+    async def _close_resources(self, extra_closers: List[Callable[[], Awaitable[Any]]]):
+        for engine in self._engines:
+            try:
+                await engine.close()
+            except Exception as exc:
+                logger.warning(f"Engine close failed: {exc}")
+        for close in extra_closers:
+            try:
+                await close()
+            except Exception as exc:
+                logger.warning(f"Worker resource close failed: {exc}")
+
+    def stop(self, *closers: Callable[[], Awaitable[Any]], timeout: float = 10.0):
+        """Closes pooled engines and `closers` (e.g. the AI client) on the loop, then stops it."""
+        with self._lock:
+            if not self.running:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_resources(list(closers)), self.loop).result(timeout)
+            except Exception as exc:
+                logger.warning(f"Worker runtime shutdown was not clean: {exc}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self.loop.close()
+            self.loop = None
+            self._engines = []
+            self._idle = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "engines_created": self.engines_created,
+            "engines_idle": self._idle.qsize() if self._idle is not None else 0,
+            "tasks_run": self.tasks_run,
+        }
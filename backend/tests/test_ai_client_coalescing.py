@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.core.ai_client import AIClient, AIProvider
+
+
+class SlowProvider(AIProvider):
+    def __init__(self):
+        super().__init__(client=None)
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return f"answer:{prompt}"
+
+    async def stream_generate(self, prompt: str, model: str, **kwargs):
+        self.calls += 1
+        for token in ["Brent", " to", " $100"]:
+            await asyncio.sleep(0.01)
+            yield token
+
+
+@pytest.fixture
+def client():
+    ai = AIClient()
+    ai.providers = {"llama-cpp": SlowProvider()}
+    ai.response_cache.enabled = False
+    return ai
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_share_one_request(client):
+    results = await asyncio.gather(*[client.generate("Will Brent hit $100?") for _ in range(30)])
+
+    assert results == ["answer:Will Brent hit $100?"] * 30
+    assert client.providers["llama-cpp"].calls == 1
+    assert client.stats()["coalescing"] == {"hits": 29, "misses": 1, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_sampling_params_are_not_coalesced(client):
+    await asyncio.gather(
+        client.generate("Q", temperature=0.2),
+        client.generate("Q", temperature=0.7),
+        client.generate("Q", coalesce=False),
+    )
+
+    assert client.providers["llama-cpp"].calls == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_fans_out_to_late_subscribers(client):
+    async def consume(delay: float) -> str:
+        await asyncio.sleep(delay)
+        return "".join([chunk async for chunk in client.stream_generate("Q")])
+
+    results = await asyncio.gather(consume(0), consume(0.015), consume(0.02))
+
+    assert results == ["Brent to $100"] * 3
+    assert client.providers["llama-cpp"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_waiter(client):
+    async def boom(prompt, model, **kwargs):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("llama.cpp down")
+
+    client.providers["llama-cpp"].generate = boom
+    results = await asyncio.gather(*[client.generate("Q") for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.engine import IntelligenceMirrorEngine
+from app.models import AlgoAnalysis, DivergenceAnalysis, MirrorAnalysis, NoiseAnalysis, Source, StructuredAnalysisResult
+
+
+def analysis(score: float) -> StructuredAnalysisResult:
+    component = {"score": score, "reasoning": "ok"}
+    return StructuredAnalysisResult(
+        mirror=MirrorAnalysis(**component),
+        noise=NoiseAnalysis(**component),
+        divergence=DivergenceAnalysis(**component),
+        algo=AlgoAnalysis(**component),
+    )
+
+
+@pytest.fixture
+def engine():
+    engine = IntelligenceMirrorEngine()
+    service = engine.intelligence_service
+    service.search_market_news = AsyncMock(side_effect=lambda q: [Source(title=q, url="u", snippet="s")])
+    service.search_physical_data = AsyncMock(return_value=[])
+    service.search_semantic_correlations_batch = AsyncMock(side_effect=lambda qs: [[] for _ in qs])
+    service.generate_forecast_with_reasoning = AsyncMock()
+
+    async def critique(question, sources, score, reasoning):
+        # Later questions finish first, so streaming order differs from input order.
+        await asyncio.sleep(0.05 if "oil" in question else 0.0)
+        result = MagicMock()
+        result.critique = "fine"
+        result.score = score
+        return result
+
+    engine.critic_service.critique_forecast = AsyncMock(side_effect=critique)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_batch_dedupes_search_and_batches_agents(engine):
+    streamed = []
+
+    async def on_result(index, question, result):
+        streamed.append(question)
+
+    with patch(
+        "app.intelligence.application.engine.IntelligenceDirectorate.agent_reports_batch",
+        new_callable=AsyncMock,
+        side_effect=lambda items: [["r1", "r2", "r3"] for _ in items],
+    ) as reports, patch(
+        "app.intelligence.application.engine.IntelligenceDirectorate.synthesize",
+        new_callable=AsyncMock,
+        return_value=(0.6, "synth", analysis(0.6)),
+    ):
+        results = await engine.run_batch_analysis(
+            ["Will oil hit $100?", "Will gold rally?", "Will oil hit $100?"], on_result=on_result
+        )
+
+    assert set(results) == {"Will oil hit $100?", "Will gold rally?"}
+    assert engine.intelligence_service.search_market_news.call_count == 2
+    reports.assert_awaited_once()
+    assert len(reports.call_args.args[0]) == 2
+    engine.intelligence_service.search_semantic_correlations_batch.assert_awaited_once()
+    assert streamed == ["Will gold rally?", "Will oil hit $100?"]
+    assert results["Will gold rally?"].adjusted_forecast == 0.6
+
+
+@pytest.mark.asyncio
+async def test_batch_falls_back_per_question_when_swarm_batch_fails(engine):
+    engine.intelligence_service.generate_forecast_with_reasoning.return_value = (0.4, "solo", analysis(0.4))
+
+    with patch(
+        "app.intelligence.application.engine.IntelligenceDirectorate.agent_reports_batch",
+        new_callable=AsyncMock,
+        side_effect=RuntimeError("llama.cpp down"),
+    ):
+        results = await engine.run_batch_analysis(["Will gold rally?"])
+
+    assert results["Will gold rally?"].initial_forecast == 0.4
+    assert results["Will gold rally?"].error is None
+
+
+@pytest.mark.asyncio
+async def test_batch_timeout_starts_when_a_question_is_admitted(engine):
+    llm_slots = asyncio.Semaphore(2)
+
+    async def synthesize(question, reports):
+        # Two llama.cpp slots: the rest of the watchlist queues behind them.
+        async with llm_slots:
+            await asyncio.sleep(0.05)
+        return 0.6, "synth", analysis(0.6)
+
+    engine.batch_analysis_concurrency = 2
+    engine.stage_timeouts.update(forecast=0.06, critic=0.04)
+    questions = [f"Will market {index} resolve yes?" for index in range(8)]
+
+    with patch(
+        "app.intelligence.application.engine.IntelligenceDirectorate.agent_reports_batch",
+        new_callable=AsyncMock,
+        side_effect=lambda items: [["r1"] for _ in items],
+    ), patch("app.intelligence.application.engine.IntelligenceDirectorate.synthesize", side_effect=synthesize):
+        results = await engine.run_batch_analysis(questions)
+
+    # 4 waves of 0.05s exceed the 0.1s budget, but no question is charged for its wait.
+    assert [results[question].error for question in questions] == [None] * 8
@@ -0,0 +1,106 @@
+import json
+
+import httpx
+import pytest
+
+from app.core.ai_client import AIClient, AIProvider, LlamaCppProvider
+from app.core.llm_cache import LLMResponseCache
+
+
+@pytest.mark.asyncio
+async def test_llama_cpp_submits_prompts_as_one_multi_prompt_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        requests.append(payload)
+        # Server may finish slots out of order; `index` restores input order.
+        return httpx.Response(200, json=[
+            {"index": 1, "content": "supply"},
+            {"index": 0, "content": "geo"},
+            {"index": 2, "content": "flows"},
+        ])
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = LlamaCppProvider(client, host="http://llama")
+        results = await provider.generate_batch(["a", "b", "c"], prefix_key="abc")
+
+    assert results == ["geo", "supply", "flows"]
+    assert len(requests) == 1
+    assert requests[0]["prompt"] == ["a", "b", "c"]
+    # Entries are not pinned to one slot, so the server can run them in parallel.
+    assert "id_slot" not in requests[0]
+
+
+@pytest.mark.asyncio
+async def test_llama_cpp_falls_back_to_parallel_requests_when_batch_rejected(monkeypatch):
+    prompts_seen = []
+    batches_seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        prompt = payload["prompt"]
+        if isinstance(prompt, list):
+            batches_seen.append(prompt)
+            return httpx.Response(400, json={"error": "prompt is too long"})
+        prompts_seen.append(prompt)
+        assert "id_slot" not in payload
+        return httpx.Response(200, json={"content": prompt.upper()})
+
+    clock = [1000.0]
+    monkeypatch.setattr("app.core.ai_client.time.monotonic", lambda: clock[0])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = LlamaCppProvider(client, host="http://llama", n_slots=4)
+        assert await provider.generate_batch(["a", "b"], prefix_key="abc") == ["A", "B"]
+        assert provider.multi_prompt_supported is False
+        assert await provider.generate_batch(["c", "d"]) == ["C", "D"]
+        # A 4xx only backs off; multi-prompt is tried again once the window passes.
+        clock[0] += LlamaCppProvider.MULTI_PROMPT_RETRY_SECONDS
+        assert provider.multi_prompt_supported is True
+        assert await provider.generate_batch(["e", "f"]) == ["E", "F"]
+
+    assert batches_seen == [["a", "b"], ["e", "f"]]
+    assert sorted(prompts_seen) == ["a", "b", "c", "d", "e", "f"]
+
+
+@pytest.mark.asyncio
+async def test_llama_cpp_stops_batching_when_server_ignores_multi_prompt():
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["prompt"]
+        # Older servers answer a list prompt with a single completion.
+        return httpx.Response(200, json={"content": "joined" if isinstance(prompt, list) else prompt.upper()})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = LlamaCppProvider(client, host="http://llama")
+        assert await provider.generate_batch(["a", "b"]) == ["A", "B"]
+
+    assert provider.multi_prompt_supported is False
+    assert provider._multi_prompt_retry_at == float("inf")
+
+
+class RecordingProvider(AIProvider):
+    def __init__(self):
+        super().__init__(client=None)
+        self.batches = []
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        return f"single:{prompt}"
+
+    async def generate_batch(self, prompts, model, **kwargs):
+        self.batches.append(list(prompts))
+        return [f"batch:{prompt}" for prompt in prompts]
+
+
+@pytest.mark.asyncio
+async def test_client_batch_skips_cached_prompts_and_chunks_the_rest():
+    ai = AIClient()
+    provider = RecordingProvider()
+    ai.providers = {"llama-cpp": provider}
+    ai.response_cache = LLMResponseCache()
+    await ai.generate("p1")
+
+    results = await ai.generate_batch(["p0", "p1", "p2", "p3"], max_batch_size=2)
+
+    assert results == ["batch:p0", "single:p1", "batch:p2", "batch:p3"]
+    assert provider.batches == [["p0", "p2"], ["p3"]]
+    assert ai.limiters["llama-cpp"].in_flight == 0
@@ -0,0 +1,50 @@
+import pytest
+
+from app.worker import (
+    QUEUE_BATCH,
+    QUEUE_INGESTION,
+    QUEUE_INTERACTIVE,
+    QUEUE_MAINTENANCE,
+    celery_app,
+    queue_depths,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.mark.parametrize(
+    "task_name, queue",
+    [
+        ("run_forecast", QUEUE_INTERACTIVE),
+        ("run_batch_forecast", QUEUE_BATCH),
+        ("scrape_markets", QUEUE_INGESTION),
+        ("generate_insights", QUEUE_MAINTENANCE),
+        ("critique_insights", QUEUE_MAINTENANCE),
+        ("some_future_task", QUEUE_MAINTENANCE),
+    ],
+)
+def test_tasks_route_to_their_workload_queue(task_name, queue):
+    route = celery_app.amqp.router.route({}, task_name)
+
+    assert route["queue"].name == queue
+    assert route["queue"].routing_key == queue
+
+
+def test_long_running_task_delivery_settings():
+    assert celery_app.conf.worker_prefetch_multiplier == 1
+    assert celery_app.conf.task_acks_late is True
+    assert celery_app.conf.task_reject_on_worker_lost is True
+
+
+@pytest.mark.asyncio
+async def test_queue_depths_report_every_queue():
+    redis = fakeredis.FakeAsyncRedis()
+    await redis.rpush(QUEUE_MAINTENANCE, *[b"message"] * 3)
+    await redis.rpush(QUEUE_INTERACTIVE, b"message")
+
+    assert await queue_depths(redis) == {
+        QUEUE_INTERACTIVE: 1,
+        QUEUE_BATCH: 0,
+        QUEUE_INGESTION: 0,
+        QUEUE_MAINTENANCE: 3,
+    }
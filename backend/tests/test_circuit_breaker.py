@@ -0,0 +1,124 @@
+import time
+
+import httpx
+import pytest
+
+from app.core.ai_client import AIClient, AIProvider
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+class DownProvider(AIProvider):
+    def __init__(self):
+        super().__init__(client=None)
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        self.calls += 1
+        raise httpx.ConnectError("connection refused")
+
+
+class EchoProvider(AIProvider):
+    def __init__(self, name: str):
+        super().__init__(client=None)
+        self.name = name
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        self.calls += 1
+        return f"{self.name}:{prompt}"
+
+
+@pytest.fixture
+def client():
+    ai = AIClient()
+    ai.providers = {"llama-cpp": DownProvider(), "ollama": EchoProvider("ollama")}
+    ai.breakers = {"llama-cpp": CircuitBreaker("llama-cpp", failure_threshold=2, reset_timeout=60)}
+    ai.fallback_order = ["llama-cpp", "ollama"]
+    ai.response_cache.enabled = False
+    return ai
+
+
+def test_breaker_opens_then_half_opens_after_timeout():
+    breaker = CircuitBreaker("llama-cpp", failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # only one probe at a time
+
+    breaker.record_failure()
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_half_open_probe_success_closes_breaker():
+    breaker = CircuitBreaker("llama-cpp", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow() is True
+    breaker.record_success()
+
+    assert breaker.state is CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_routes_to_next_provider_without_calling_it(client):
+    results = [await client.generate(f"Q{i}", coalesce=False) for i in range(5)]
+
+    assert results == [f"ollama:Q{i}" for i in range(5)]
+    # Two failures trip the breaker; later calls skip llama.cpp entirely.
+    assert client.providers["llama-cpp"].calls == 2
+    stats = client.stats()["circuit_breakers"]["llama-cpp"]
+    assert stats["state"] == "open"
+    assert stats["rejected"] == 3
+    assert client.open_circuits() == ["llama-cpp"]
+
+
+@pytest.mark.asyncio
+async def test_fails_fast_when_every_circuit_is_open(client):
+    client.fallback_order = ["llama-cpp"]
+    client.providers = {"llama-cpp": DownProvider()}
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await client.generate("Q", coalesce=False)
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        await client.generate("Q", coalesce=False)
+    assert time.perf_counter() - started < 0.1
+
+
+@pytest.mark.asyncio
+async def test_application_errors_do_not_trip_breaker(client):
+    async def bad_prompt(prompt, model, **kwargs):
+        raise ValueError("bad prompt")
+
+    client.providers["llama-cpp"].generate = bad_prompt
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await client.generate("Q", coalesce=False)
+
+    assert client.breakers["llama-cpp"].state is CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_safe_request_does_not_retry():
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        return httpx.Response(503)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        provider = EchoProvider("llama-cpp")
+        provider.client = http
+        with pytest.raises(httpx.HTTPStatusError):
+            await provider._safe_request("POST", "http://llama/completion")
+
+    assert len(attempts) == 1
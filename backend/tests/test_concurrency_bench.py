@@ -1,6 +1,9 @@
 import asyncio
 import time
 from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
 from app.engine import IntelligenceMirrorEngine
 from app.models import Source
 
@@ -55,5 +58,94 @@ async def benchmark_concurrency():
     else:
         print(f"FAILURE: Pipeline took {total_duration:.2f}s, which suggests sequential execution (Expected < 5s).")
 
+def mock_engine(search: float, forecast: float, correlations: float, critic: float) -> IntelligenceMirrorEngine:
+    engine = IntelligenceMirrorEngine()
+
+    async def slow_search(q):
+        await asyncio.sleep(search)
+        return [Source(title="News", snippet="Snippet", url="url")]
+
+    async def slow_forecast(q, s, model):
+        await asyncio.sleep(forecast)
+        return (0.5, "Reasoning", None)
+
+    async def slow_correlation(q, model="lfm-thinking"):
+        await asyncio.sleep(correlations)
+        return ["Found correlations"]
+
+    async def slow_critic(q, s, sc, r):
+        await asyncio.sleep(critic)
+        res = MagicMock()
+        res.critique = "Audit done"
+        res.score = 0.5
+        return res
+
+    engine.intelligence_service.search_market_news = AsyncMock(side_effect=slow_search)
+    engine.intelligence_service.search_physical_data = AsyncMock(side_effect=slow_search)
+    engine.intelligence_service.generate_forecast_with_reasoning = AsyncMock(side_effect=slow_forecast)
+    engine.intelligence_service.search_semantic_correlations = AsyncMock(side_effect=slow_correlation)
+    engine.critic_service.critique_forecast = AsyncMock(side_effect=slow_critic)
+    return engine
+
+
+async def benchmark_critical_path(scale: float = 1.0) -> dict:
+    """
+    Correlations do not need sources, so under the DAG they overlap search instead of
+    waiting behind it. Compares the measured run with the old barrier schedule
+    (search -> forecast || correlations -> critic) for the same stage durations.
+    """
+    search, forecast, correlations, critic = 1 * scale, 2 * scale, 3 * scale, 1 * scale
+    engine = mock_engine(search, forecast, correlations, critic)
+
+    start_time = time.perf_counter()
+    result = await engine.run_analysis("Will oil hit $100?")
+    measured = time.perf_counter() - start_time
+
+    barrier = search + max(forecast, correlations) + critic
+    critical_path = max(search + forecast, correlations) + critic
+    trace = {entry["stage"]: entry for entry in engine.last_trace}
+    print(f"Barrier schedule: {barrier:.2f}s  critical path: {critical_path:.2f}s  measured: {measured:.2f}s")
+    print(f"Speedup vs barriers: {barrier / measured:.2f}x")
+    for entry in engine.last_trace:
+        print(f"  {entry['stage']:<13} {entry['start']:.2f}s -> {entry['end']:.2f}s ({entry['outcome']})")
+    return {"result": result, "measured": measured, "barrier": barrier, "critical_path": critical_path, "trace": trace}
+
+
+@pytest.mark.asyncio
+async def test_dag_runs_on_the_critical_path():
+    report = await benchmark_critical_path(scale=0.05)
+
+    assert report["result"].error is None
+    assert report["trace"]["correlations"]["start"] < 0.01
+    assert report["trace"]["forecast"]["start"] >= 0.05
+    assert report["measured"] < report["barrier"] - 0.025
+    assert report["measured"] == pytest.approx(report["critical_path"], abs=0.04)
+
+
+@pytest.mark.asyncio
+async def test_critic_timeout_keeps_the_forecast():
+    engine = mock_engine(search=0, forecast=0, correlations=0, critic=1)
+    engine.stage_timeouts["critic"] = 0.01
+
+    result = await engine.run_analysis("Will oil hit $100?")
+
+    assert result.error is None
+    assert result.initial_forecast == result.adjusted_forecast == 0.5
+    assert result.critique.startswith("Critic unavailable")
+    assert {entry["stage"]: entry["outcome"] for entry in engine.last_trace}["critic"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_required_stage_failure_is_traced():
+    engine = mock_engine(search=0, forecast=1, correlations=0, critic=0)
+    engine.stage_timeouts["forecast"] = 0.01
+
+    result = await engine.run_analysis("Will oil hit $100?")
+
+    assert result.error == "unknown_error"
+    assert {entry["stage"]: entry["outcome"] for entry in engine.last_trace}["forecast"] == "timeout"
+
+
 if __name__ == "__main__":
     asyncio.run(benchmark_concurrency())
+    asyncio.run(benchmark_critical_path())
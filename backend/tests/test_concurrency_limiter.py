@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.core.concurrency import AdaptiveConcurrencyLimiter, RequestPriority, current_priority, priority_scope
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority():
+    limiter = AdaptiveConcurrencyLimiter("llama-cpp", initial_limit=1)
+    order = []
+    release_first = asyncio.Event()
+
+    async def job(name, priority, hold=None):
+        async with limiter.slot(priority):
+            order.append(name)
+            if hold:
+                await hold.wait()
+
+    first = asyncio.create_task(job("running", RequestPriority.PREDICTION, release_first))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(job("critic", RequestPriority.BACKGROUND)),
+        asyncio.create_task(job("predict", RequestPriority.PREDICTION)),
+        asyncio.create_task(job("chat", RequestPriority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+
+    stats = limiter.stats()
+    assert stats["queue_depth"] == 3
+    assert stats["queue_depth_by_priority"] == {"interactive": 1, "prediction": 1, "background": 1}
+
+    release_first.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["running", "chat", "predict", "critic"]
+    assert limiter.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_at_stable_latency_and_shrinks_when_latency_inflates():
+    limiter = AdaptiveConcurrencyLimiter("llama-cpp", initial_limit=4, max_limit=16)
+    limiter.in_flight = 4
+    for _ in range(20):
+        limiter.on_success(1.0)
+    grown = limiter.limit
+    assert grown > 4
+
+    for _ in range(10):
+        limiter.on_success(8.0)
+    assert limiter.limit < grown
+
+
+@pytest.mark.asyncio
+async def test_failures_back_off_multiplicatively():
+    limiter = AdaptiveConcurrencyLimiter("llama-cpp", initial_limit=8)
+
+    with pytest.raises(TimeoutError):
+        async with limiter.slot():
+            raise TimeoutError()
+
+    assert limiter.current_limit == 6
+    assert limiter.in_flight == 0
+    assert limiter.stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = AdaptiveConcurrencyLimiter("llama-cpp", initial_limit=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire(RequestPriority.BACKGROUND))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_priority_scope_restores_previous_priority():
+    assert current_priority() == RequestPriority.PREDICTION
+    with priority_scope(RequestPriority.BACKGROUND):
+        assert current_priority() == RequestPriority.BACKGROUND
+    assert current_priority() == RequestPriority.PREDICTION
@@ -1,3 +1,6 @@
+import asyncio
+from unittest.mock import AsyncMock
+
 import pytest
 from app.services.execution import ExecutionService
 
@@ -9,3 +12,93 @@ async def test_construct_trade_payload():
     assert result["status"] == "ready_to_sign"
     assert "tx_payload" in result
     assert result["tx_payload"]["chainId"] == 137
+
+
+@pytest.mark.asyncio
+async def test_kelly_sizing_reads_the_mirrored_book():
+    from app.services.orderbook_mirror import OrderBookMirror
+
+    mirror = OrderBookMirror(connector=None)
+    mirror.apply({"event_type": "book", "asset_id": "brent-100", "bids": [], "asks": [{"price": "0.50", "size": "1000"}]})
+    service = ExecutionService(mirror=mirror)
+
+    result = await service.construct_trade_payload(symbol="brent-100", quantity=0, probability_score=0.7, bankroll=1000)
+
+    # Kelly on the mirrored 0.50 ask: (0.7 - 0.5) / (1 - 0.5) * 1000
+    assert result["quantity"] == pytest.approx(400)
+
+
+class QuietStream:
+    """Stand-in market channel that records subscriptions and yields no events."""
+
+    def __init__(self, token_ids):
+        self.token_ids = set(token_ids)
+        self.closed = False
+
+    async def subscribe(self, token_ids):
+        self.token_ids |= set(token_ids)
+
+    async def close(self):
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.Event().wait()
+
+
+def test_trade_execute_sizes_from_a_mirrored_book(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.core.auth import get_current_active_user
+    from app.models import User
+    from app.routers import trade
+    from app.services.orderbook_mirror import OrderBookMirror
+
+    connector = AsyncMock()
+    connector.call_tool = AsyncMock(return_value={"asset_id": "brent-100", "bids": [], "asks": [{"price": "0.40", "size": "1000"}]})
+    mirror = OrderBookMirror(connector)
+    streams = []
+    monkeypatch.setattr(trade.execution_service, "mirror", mirror)
+    app = FastAPI()
+    app.include_router(trade.router)
+    app.dependency_overrides[get_current_active_user] = lambda: User(username="desk", role="trader")
+
+    def open_stream(token_ids):
+        streams.append(QuietStream(token_ids))
+        return streams[-1]
+
+    @app.on_event("startup")
+    async def start_mirror():
+        mirror.ensure_started(open_stream)
+
+    with TestClient(app) as client:
+        # Nothing is tracked yet, so no feed is opened.
+        assert streams == []
+        first = client.post("/trade/execute", json={"symbol": "brent-100", "side": "buy", "quantity": 0})
+        second = client.post("/trade/execute", json={"symbol": "brent-100", "side": "buy", "quantity": 0})
+
+        # Kelly at the default 0.5 probability on the mirrored 0.40 ask: (0.5 - 0.4) / 0.6 * 1000
+        assert first.json()["quantity"] == pytest.approx(1000 / 6)
+        assert second.json()["quantity"] == pytest.approx(1000 / 6)
+        # Fetched once on the miss, then served from the mirror whose feed now tracks the token.
+        connector.call_tool.assert_awaited_once_with("polymarket_get_orderbook", {"token_id": "brent-100"})
+        assert [stream.token_ids for stream in streams] == [{"brent-100"}]
+        client.portal.call(mirror.close)
+
+
+@pytest.mark.asyncio
+async def test_unknown_symbol_falls_back_without_being_tracked():
+    from app.services.orderbook_mirror import OrderBookMirror
+
+    connector = AsyncMock()
+    connector.call_tool = AsyncMock(side_effect=RuntimeError("404 no orderbook"))
+    mirror = OrderBookMirror(connector)
+    service = ExecutionService(mirror=mirror)
+
+    result = await service.construct_trade_payload(symbol="BRENT", quantity=0, probability_score=0.9, bankroll=1000)
+
+    assert result["status"] == "ready_to_sign"
+    assert mirror.tracked == set()
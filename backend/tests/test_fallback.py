@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from app.engine import IntelligenceMirrorEngine, FallbackModelOrchestrator
 from unittest.mock import patch, AsyncMock
@@ -50,3 +52,66 @@ async def test_fallback_logging_is_structured(caplog):
     assert len(failure_records) == 1
     assert failure_records[0].model == "lfm-thinking"
     assert failure_records[0].attempt == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    orchestrator = FallbackModelOrchestrator(default_hedge_delay=0.05, latency={}, backends={"lfm-40b": "ollama"})
+    primary_cancelled = asyncio.Event()
+
+    async def call(question, model):
+        if model == "lfm-thinking":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+        return f"{model}:{question}"
+
+    result = await orchestrator.run_with_fallback(call, "Q")
+
+    assert result == "lfm-40b:Q"
+    assert primary_cancelled.is_set()
+    assert orchestrator.stats()["hedges_started"] == 1
+    assert orchestrator.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tiers_on_the_same_backend_are_not_hedged():
+    orchestrator = FallbackModelOrchestrator(default_hedge_delay=0.01, latency={}, backends={})
+    calls = []
+
+    async def call(question, model):
+        calls.append(model)
+        await asyncio.sleep(0.05)
+        return f"{model}:{question}"
+
+    result = await orchestrator.run_with_fallback(call, "Q")
+
+    # Both tiers resolve to llama-cpp, so the slow primary is left to finish alone.
+    assert result == "lfm-thinking:Q"
+    assert calls == ["lfm-thinking"]
+    assert orchestrator.stats()["hedges_started"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_tracks_primary_p90():
+    from app.intelligence.application.engine import TierLatency
+
+    tracker = TierLatency()
+    for seconds in [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]:
+        tracker.record(seconds)
+    orchestrator = FallbackModelOrchestrator(latency={"lfm-thinking": tracker}, default_hedge_delay=60)
+
+    assert orchestrator.hedge_delay("lfm-thinking") == 10
+    assert orchestrator.hedge_delay("lfm-40b") == 30  # no history: default, capped at the tier timeout
+
+
+@pytest.mark.asyncio
+async def test_invalid_result_falls_through_to_next_tier():
+    orchestrator = FallbackModelOrchestrator(latency={})
+    mock_func = AsyncMock(side_effect=[(None, "Error: parse", []), ("forecast", "ok", [])])
+
+    result = await orchestrator.run_with_fallback(mock_func, "Q", validator=lambda r: not r[1].startswith("Error:"))
+
+    assert result == ("forecast", "ok", [])
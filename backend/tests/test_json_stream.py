@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.ai_client import AIClient, AIProvider
+from app.core.json_stream import IncrementalJSONParser
+from app.intelligence.domain.swarm import validate_component
+
+SYNTHESIS = {
+    "mirror": {"score": 0.8, "reasoning": "Sanctions {tighten} \"supply\""},
+    "noise": {"score": 0.2, "reasoning": "Tankers, rerouted"},
+    "divergence": {"score": 0.7, "reasoning": "Skew [bid]"},
+    "algo": {"score": 0.9, "reasoning": "Momentum"},
+}
+
+
+class TokenProvider(AIProvider):
+    """Streams the canned synthesis a few characters at a time, followed by chatter."""
+
+    def __init__(self, text: str, tail: int = 50):
+        super().__init__(client=None)
+        self.text = text
+        self.tail = tail
+        self.tokens_sent = 0
+        self.closed = False
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        return self.text
+
+    async def stream_generate(self, prompt: str, model: str, **kwargs):
+        try:
+            chunks = [self.text[i:i + 7] for i in range(0, len(self.text), 7)]
+            for chunk in chunks + [" Let me know if you need anything else."] * self.tail:
+                self.tokens_sent += 1
+                await asyncio.sleep(0.001)
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def client():
+    ai = AIClient()
+    ai.response_cache.enabled = False
+    return ai
+
+
+def test_parser_emits_each_member_when_it_closes():
+    parser = IncrementalJSONParser()
+    text = "Sure! Here is the analysis:\n" + json.dumps(SYNTHESIS, indent=2) + "\nHope this helps."
+    emitted = []
+    for char in text:
+        completed = parser.feed(char)
+        if completed and completed[0][0] == "mirror":
+            # `mirror` is reported before `noise` has even started streaming
+            assert '"noise"' not in parser.text
+        emitted.extend(completed)
+
+    assert [key for key, _ in emitted] == ["mirror", "noise", "divergence", "algo"]
+    assert parser.complete
+    assert parser.value == SYNTHESIS
+    assert json.loads(parser.raw) == SYNTHESIS
+
+
+def test_parser_handles_scalar_members_and_ignores_text_after_root():
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('{"score": 0.5, "label": "a,b}"') == [("score", 0.5)]
+    assert parser.feed('} {"ignored": true}') == [("label", "a,b}")]
+    assert parser.complete
+    assert parser.feed('{"more": 1}') == []
+
+
+@pytest.mark.asyncio
+async def test_stream_json_stops_generation_once_root_closes(client):
+    provider = TokenProvider(json.dumps(SYNTHESIS))
+    client.providers = {"llama-cpp": provider}
+
+    fields = [key async for key, _ in client.stream_json("synthesize")]
+
+    assert fields == ["mirror", "noise", "divergence", "algo"]
+    await asyncio.sleep(0.01)  # the shared upstream stream is cancelled on the next loop turn
+    assert provider.closed
+    # The trailing chatter is never pulled from the model
+    assert provider.tokens_sent < len(json.dumps(SYNTHESIS)) // 7 + 5
+
+
+@pytest.mark.asyncio
+async def test_generate_json_on_field_aborts_on_invalid_component(client):
+    broken = dict(SYNTHESIS, mirror={"score": "high"})
+    provider = TokenProvider(json.dumps(broken))
+    client.providers = {"llama-cpp": provider}
+
+    with pytest.raises(ValidationError):
+        await client.generate_json("synthesize", on_field=validate_component)
+
+    await asyncio.sleep(0.01)
+    assert provider.closed
+    assert provider.tokens_sent < len(json.dumps(broken)) // 7 + 5
+
+
+@pytest.mark.asyncio
+async def test_generate_json_on_field_returns_full_object(client):
+    client.providers = {"llama-cpp": TokenProvider(json.dumps(SYNTHESIS), tail=0)}
+    seen = []
+
+    result = await client.generate_json("synthesize", on_field=lambda key, value: seen.append(key))
+
+    assert result == SYNTHESIS
+    assert seen == list(SYNTHESIS)
+
+
+@pytest.mark.asyncio
+async def test_unterminated_stream_raises(client):
+    client.providers = {"llama-cpp": TokenProvider(json.dumps(SYNTHESIS)[:-10], tail=0)}
+
+    with pytest.raises(json.JSONDecodeError):
+        await client.generate_json("synthesize", on_field=lambda key, value: None)
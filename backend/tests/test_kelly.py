@@ -1,5 +1,6 @@
+import numpy as np
 import pytest
-from app.services.kelly import SlippageAwareKellyEngine
+from app.services.kelly import OrderBookCurve, SlippageAwareKellyEngine, flatten_order_books
 
 def test_vwap_calculation():
     engine = SlippageAwareKellyEngine()
@@ -51,3 +52,95 @@ def test_kelly_no_edge():
     
     assert result["optimal_size"] == 0
     assert result["expected_value"] == -1.0
+
+def test_kelly_solves_the_equilibrium_exactly():
+    engine = SlippageAwareKellyEngine()
+    order_book = [
+        {"price": 0.85, "size": 500},
+        {"price": 0.80, "size": 100},
+        {"price": 0.82, "size": 200},
+    ]
+
+    result = engine.calculate_optimal_size(model_probability=0.9, order_book=order_book, bankroll=1000)
+
+    # The Kelly bet at the fill's own VWAP equals the fill, to float precision, with no step quantization.
+    size = result["optimal_size"]
+    assert 300 < size < 800
+    assert size == pytest.approx(1000 * (0.9 - result["expected_vwap"]) / (1 - result["expected_vwap"]))
+    assert result["expected_vwap"] == pytest.approx(engine._calculate_vwap(size, order_book))
+
+
+def test_kelly_respects_fractional_cap_and_thin_books():
+    engine = SlippageAwareKellyEngine()
+
+    capped = engine.calculate_optimal_size(0.99, [{"price": 0.10, "size": 10_000}], bankroll=1000)
+    assert capped["optimal_size"] == pytest.approx(500)
+    assert capped["kelly_fraction"] == pytest.approx(0.5)
+
+    # Past visible depth, the remainder is priced at the last level.
+    thin = engine.calculate_optimal_size(0.7, [{"price": 0.50, "size": 10}], bankroll=1000)
+    assert thin["optimal_size"] == pytest.approx(400)
+    assert engine.calculate_optimal_size(0.7, [], bankroll=1000)["optimal_size"] == 0
+
+
+def test_order_book_curve_matches_a_level_walk():
+    rng = np.random.default_rng(7)
+    prices, sizes = rng.uniform(0.1, 0.9, 200), rng.uniform(1, 50, 200)
+    curve = OrderBookCurve(prices, sizes)
+    levels = sorted(zip(prices, sizes))
+
+    for target in rng.uniform(1, curve.depth * 1.2, 50):
+        remaining, cost = target, 0.0
+        for price, size in levels:
+            fill = min(remaining, size)
+            cost += fill * price
+            remaining -= fill
+        cost += remaining * levels[-1][0]
+        assert curve.vwap(target) == pytest.approx(cost / target)
+
+
+def test_batch_sizing_matches_per_market_sizing():
+    engine = SlippageAwareKellyEngine()
+    rng = np.random.default_rng(11)
+    books = [
+        [{"price": float(p), "size": float(s)} for p, s in zip(rng.uniform(0.05, 0.95, n), rng.uniform(0, 300, n))]
+        for n in rng.integers(0, 30, 300)
+    ]
+    probabilities = rng.uniform(0.05, 0.99, len(books))
+    bankrolls = rng.uniform(0, 5000, len(books))
+
+    # Levels are unsorted within each book; the batch path sorts them like the scalar one.
+    prices = np.array([level["price"] for book in books for level in book])
+    sizes = np.array([level["size"] for book in books for level in book])
+    offsets = np.concatenate(([0], np.cumsum([len(book) for book in books])))
+    batch = engine.calculate_optimal_sizes(probabilities, bankrolls, prices, sizes, offsets)
+
+    for index, book in enumerate(books):
+        single = engine.calculate_optimal_size(probabilities[index], book, bankrolls[index])
+        for key, value in single.items():
+            assert batch[key][index] == pytest.approx(value, rel=1e-6, abs=1e-6)
+
+
+def test_batch_sizing_handles_empty_and_edgeless_books():
+    engine = SlippageAwareKellyEngine()
+    prices, sizes, offsets = flatten_order_books([
+        [],
+        [{"price": 0.80, "size": 1000}],
+        [{"price": 0.50, "size": 1000}],
+    ])
+
+    result = engine.calculate_optimal_sizes(np.array([0.7, 0.7, 0.7]), np.array([1000.0] * 3), prices, sizes, offsets)
+
+    assert list(result["optimal_size"]) == pytest.approx([0, 0, 400])
+    assert list(result["expected_value"])[:2] == [-1.0, -1.0]
+    assert result["kelly_fraction"][2] == pytest.approx(0.4)
+
+
+def test_size_at_vwap_finds_where_the_edge_runs_out():
+    curve = OrderBookCurve([0.50, 0.60, 0.70], [100, 100, 100])
+
+    # (50 + 60 + 0.7 * (S - 200)) / S == 0.6 -> S = 300
+    assert curve.size_at_vwap(0.60) == pytest.approx(300)
+    assert curve.vwap(curve.size_at_vwap(0.55)) == pytest.approx(0.55)
+    assert curve.size_at_vwap(0.40) == 0
+    assert curve.size_at_vwap(0.70) == float("inf")
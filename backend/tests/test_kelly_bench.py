@@ -0,0 +1,122 @@
+import time
+
+import numpy as np
+
+from app.services.kelly import OrderBookCurve, SlippageAwareKellyEngine, flatten_order_books
+
+
+def stepping_optimal_size(model_probability, order_book, bankroll, step_size=10.0, max_steps=100):
+    """The previous engine: re-sorts, then walks the book from the top for every step size."""
+    best_size, max_ev = 0.0, -1.0
+    sorted_asks = sorted(order_book, key=lambda x: x["price"])
+    for i in range(1, max_steps + 1):
+        sim_size = i * step_size
+        if sim_size > bankroll:
+            break
+        remaining, cost, filled = sim_size, 0.0, 0.0
+        for level in sorted_asks:
+            fill = min(remaining, level["size"])
+            cost += fill * level["price"]
+            filled += fill
+            remaining -= fill
+            if remaining <= 0:
+                break
+        if remaining > 0 and filled > 0:
+            cost += remaining * sorted_asks[-1]["price"]
+            filled += remaining
+        vwap = cost / filled if filled else 1.0
+        if vwap >= model_probability:
+            break
+        ev = (model_probability * (1 - vwap)) - ((1 - model_probability) * vwap)
+        if ev <= max_ev:
+            break
+        max_ev, best_size = ev, sim_size
+    return best_size
+
+
+def walk_vwap(target_size, sorted_asks):
+    remaining, cost = target_size, 0.0
+    for level in sorted_asks:
+        fill = min(remaining, level["size"])
+        cost += fill * level["price"]
+        remaining -= fill
+        if remaining <= 0:
+            break
+    return (cost + max(remaining, 0.0) * sorted_asks[-1]["price"]) / target_size
+
+
+def random_books(count: int, levels: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    books = []
+    for _ in range(count):
+        prices = 0.40 + np.cumsum(rng.uniform(0.0001, 0.0004, levels))
+        sizes = rng.uniform(0.5, 2.0, levels)
+        books.append([{"price": float(p), "size": float(s)} for p, s in zip(prices, sizes)])
+    return books
+
+
+def timed(calls, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for call in calls:
+            call()
+    return (time.perf_counter() - started) / (repeat * len(calls))
+
+
+def sizing_cost(books: int = 50, levels: int = 1000, repeat: int = 5) -> dict:
+    """Seconds per operation on `levels`-deep books: the level walk vs. the prefix-sum curve."""
+    engine = SlippageAwareKellyEngine()
+    order_books = random_books(books, levels)
+    sorted_books = [sorted(book, key=lambda x: x["price"]) for book in order_books]
+    curves = [OrderBookCurve.from_levels(book) for book in order_books]
+    deep = [curve.depth * 0.9 for curve in curves]
+    return {
+        "size: stepping walk": timed([lambda b=b: stepping_optimal_size(0.75, b, 1000) for b in order_books], repeat),
+        "size: exact, prebuilt curve": timed([lambda c=c: engine.calculate_optimal_size(0.75, c, 1000) for c in curves], repeat),
+        "curve build from levels": timed([lambda b=b: OrderBookCurve.from_levels(b) for b in order_books], repeat),
+        "deep vwap: level walk": timed([lambda b=b, d=d: walk_vwap(d, b) for b, d in zip(sorted_books, deep)], repeat),
+        "deep vwap: binary search": timed([lambda c=c, d=d: c.vwap(d) for c, d in zip(curves, deep)], repeat),
+    }
+
+
+def batch_cost(markets: int = 5000, seed: int = 0) -> dict:
+    """Seconds to resize `markets` positions (5-100 levels each): a scalar loop vs. one batch call."""
+    engine = SlippageAwareKellyEngine()
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(5, 100, markets)
+    curves = [OrderBookCurve(rng.uniform(0.05, 0.95, n), rng.uniform(1, 300, n)) for n in lengths]
+    probabilities, bankrolls = rng.uniform(0.05, 0.99, markets), rng.uniform(100, 5000, markets)
+    prices, sizes, offsets = flatten_order_books(curves)
+
+    started = time.perf_counter()
+    for probability, curve, bankroll in zip(probabilities, curves, bankrolls):
+        engine.calculate_optimal_size(probability, curve, bankroll)
+    scalar = time.perf_counter() - started
+
+    started = time.perf_counter()
+    engine.calculate_optimal_sizes(probabilities, bankrolls, prices, sizes, offsets)
+    return {"scalar loop (prebuilt curves)": scalar, "batch": time.perf_counter() - started}
+
+
+def test_batch_sizing_beats_a_scalar_loop():
+    results = batch_cost(markets=1000)
+
+    assert results["batch"] < results["scalar loop (prebuilt curves)"]
+
+
+def test_prefix_sum_curve_beats_walking_deep_books():
+    results = sizing_cost(books=10, repeat=2)
+
+    assert results["size: exact, prebuilt curve"] < results["size: stepping walk"]
+    assert results["deep vwap: binary search"] * 10 < results["deep vwap: level walk"]
+
+
+def benchmark():
+    for name, seconds in sizing_cost(books=200).items():
+        print(f"  {name:<30} {seconds * 1e6:9.1f} us/call")
+    for name, seconds in batch_cost().items():
+        print(f"  {name:<30} {seconds * 1e3:9.1f} ms / 5000 markets")
+
+
+if __name__ == "__main__":
+    benchmark()
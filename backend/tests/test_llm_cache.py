@@ -0,0 +1,172 @@
+import httpx
+import pytest
+
+from app.core.ai_client import AIClient, AIProvider, GeminiProvider
+from app.core.llm_cache import LLMResponseCache
+from app.core.serialization import serializer
+
+
+class DictRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+        self.ttls[key] = ttl
+
+
+class CountingProvider(AIProvider):
+    def __init__(self):
+        super().__init__(client=None)
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        self.calls += 1
+        return f"report-{self.calls}"
+
+
+@pytest.fixture
+def client():
+    ai = AIClient()
+    ai.providers = {"llama-cpp": CountingProvider()}
+    ai.response_cache = LLMResponseCache(redis_client=DictRedis())
+    return ai
+
+
+@pytest.mark.asyncio
+async def test_deterministic_calls_are_memoized(client):
+    first = await client.generate("Geopolitical prompt")
+    second = await client.generate("Geopolitical prompt", temperature=0.2)
+
+    assert first == second == "report-1"
+    assert client.providers["llama-cpp"].calls == 1
+    assert client.stats()["response_cache"]["l1_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sampling_calls_and_bypass_skip_cache(client):
+    await client.generate("Prompt", temperature=0.8)
+    await client.generate("Prompt", temperature=0.8)
+    await client.generate("Prompt", use_cache=False)
+    await client.generate("Prompt", use_cache=False)
+
+    assert client.providers["llama-cpp"].calls == 4
+
+
+@pytest.mark.asyncio
+async def test_json_schema_is_part_of_the_key(client):
+    await client.generate("Prompt", json_schema={"type": "object"})
+    await client.generate("Prompt")
+
+    assert client.providers["llama-cpp"].calls == 2
+
+
+@pytest.mark.asyncio
+async def test_l2_serves_after_l1_is_cleared_with_caller_ttl(client):
+    await client.generate("Critic prompt", cache_ttl=600)
+    redis = client.response_cache.redis
+    key = next(iter(redis.store))
+    client.response_cache.clear()
+
+    assert await client.generate("Critic prompt") == "report-1"
+    assert client.response_cache.stats()["l2_hits"] == 1
+    assert redis.ttls[key] == 600
+    assert serializer.loads(redis.store[key])["response"] == "report-1"
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_is_bounded():
+    cache = LLMResponseCache(max_entries=2)
+    for index in range(3):
+        await cache.set(f"k{index}", "value")
+
+    assert await cache.get("k0") is None
+    assert await cache.get("k2") == "value"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_dropped():
+    cache = LLMResponseCache()
+    await cache.set("k", "value", ttl=1)
+    cache._entries["k"] = (0.0, "value")
+
+    assert await cache.get("k") is None
+
+
+class FlakyProvider(CountingProvider):
+    def __init__(self):
+        super().__init__()
+        self.down = True
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        if self.down:
+            raise httpx.ConnectError("connection refused")
+        return await super().generate(prompt, model, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_fail_over_answers_are_not_cached_under_the_primary(client):
+    primary = FlakyProvider()
+    client.providers = {"llama-cpp": primary, "ollama": CountingProvider()}
+    client.fallback_order = ["llama-cpp", "ollama"]
+
+    assert await client.generate("Prompt") == "report-1"  # served by ollama
+    primary.down = False
+
+    assert await client.generate("Prompt") == "report-1"
+    assert await client.generate("Prompt") == "report-1"
+    assert primary.calls == 1
+    assert client.providers["ollama"].calls == 1
+
+
+class UnparsableGemini(GeminiProvider):
+    def __init__(self):
+        super().__init__(client=None, api_key="test")
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str = "gemini-pro", **kwargs) -> str:
+        self.calls += 1
+        return self.PARSE_ERROR
+
+
+@pytest.mark.asyncio
+async def test_provider_error_replies_are_not_cached(client):
+    gemini = UnparsableGemini()
+    client.providers = {"gemini": gemini}
+
+    await client.generate("Prompt", provider="gemini")
+    await client.generate("Prompt", provider="gemini")
+
+    assert gemini.calls == 2
+    assert client.response_cache.stats()["entries"] == 0
+
+
+class JSONProvider(CountingProvider):
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        self.calls += 1
+        return '{"score": 0.7}'
+
+
+@pytest.mark.asyncio
+async def test_streamed_json_is_cached_only_when_the_primary_answered(client):
+    primary = JSONProvider()
+    client.providers = {"llama-cpp": primary, "ollama": JSONProvider()}
+    client.fallback_order = ["llama-cpp", "ollama"]
+
+    assert [item async for item in client.stream_json("Prompt")] == [("score", 0.7)]
+    assert [item async for item in client.stream_json("Prompt")] == [("score", 0.7)]
+    assert primary.calls == 1
+
+    client.response_cache.clear()
+    client.breakers["llama-cpp"].record_failure()
+    client.breakers["llama-cpp"].record_failure()
+    client.breakers["llama-cpp"].record_failure()
+    assert [item async for item in client.stream_json("Other")] == [("score", 0.7)]
+    assert client.providers["ollama"].calls == 1
+    assert client.response_cache.stats()["entries"] == 0
@@ -0,0 +1,193 @@
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.connectors.polymarket import PolymarketMarketStream
+from app.services.kelly import SlippageAwareKellyEngine
+from app.services.orderbook_mirror import OrderBookMirror
+
+websockets = pytest.importorskip("websockets")
+from websockets.asyncio.server import serve  # noqa: E402
+
+RECORDED = [json.loads(line) for line in (Path(__file__).parent / "data" / "polymarket_book_deltas.jsonl").read_text().splitlines()]
+
+REST_SNAPSHOT = {
+    "asset_id": "brent-100",
+    "timestamp": "1760000000900",
+    "bids": [{"price": "0.42", "size": "60"}],
+    "asks": [{"price": "0.47", "size": "500"}],
+}
+
+
+class ReplayMarketServer:
+    """
+    Local stand-in for the CLOB market channel. After a client subscribes it sends the
+    initial `book` events as one array, as the exchange does, then replays the recorded
+    deltas for the subscribed assets. `drop_after` closes the first connection early.
+    """
+
+    def __init__(self, events, drop_after=None):
+        self.events = events
+        self.drop_after = drop_after
+        self.subscriptions = []
+        self.url = None
+        self._server = None
+
+    async def handler(self, socket):
+        assets = set(json.loads(await socket.recv())["assets_ids"])
+        first_connection = not self.subscriptions
+        self.subscriptions.append(assets)
+        if not first_connection:
+            await socket.wait_closed()
+            return
+        events = [event for event in self.events if _asset(event) in assets]
+        books = [event for event in events if event["event_type"] == "book"]
+        await socket.send(json.dumps(books))
+        for sent, event in enumerate(event for event in events if event["event_type"] != "book"):
+            if self.drop_after is not None and sent >= self.drop_after:
+                return
+            await socket.send(json.dumps(event))
+        await socket.wait_closed()
+
+    async def __aenter__(self):
+        self._server = await serve(self.handler, "127.0.0.1", 0).__aenter__()
+        self.url = f"ws://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def _asset(event):
+    return event.get("asset_id") or event["price_changes"][0]["asset_id"]
+
+
+def rest_connector(snapshot=REST_SNAPSHOT):
+    connector = AsyncMock()
+    connector.call_tool = AsyncMock(return_value=snapshot)
+    return connector
+
+
+async def wait_until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+def test_snapshot_and_deltas_maintain_sorted_sides():
+    mirror = OrderBookMirror(rest_connector())
+
+    for event in RECORDED:
+        mirror.apply(event)
+
+    brent = mirror.book("brent-100")
+    assert brent.bids.prices == [0.38, 0.41, 0.42]
+    assert brent.asks.prices == [0.43, 0.45, 0.46, 0.48]
+    assert brent.asks.sizes == [40, 200, 90, 600]
+    assert brent.seq == 5
+    snapshot = brent.snapshot()
+    assert snapshot["bids"][0] == {"price": 0.42, "size": 60}
+    assert snapshot["asks"][0] == {"price": 0.43, "size": 40}
+    assert snapshot["spread"] == pytest.approx(0.01)
+    # Newer `price_changes` events carry their own asset ids.
+    assert mirror.book("wti-95").bids.prices == [0.30, 0.31]
+
+
+def test_kelly_sizes_from_the_mirrored_curve():
+    mirror = OrderBookMirror(rest_connector())
+    for event in RECORDED:
+        mirror.apply(event)
+    engine = SlippageAwareKellyEngine()
+    book = mirror.book("brent-100")
+
+    from_curve = engine.calculate_optimal_size(0.6, book.ask_curve(), 1000)
+    from_levels = engine.calculate_optimal_size(0.6, book.snapshot()["asks"], 1000)
+
+    assert from_curve == pytest.approx(from_levels)
+    # The curve is cached until the asks change.
+    assert book.ask_curve() is book.ask_curve()
+    mirror.apply({"event_type": "price_change", "asset_id": "brent-100", "seq": 6, "changes": [{"price": "0.43", "side": "SELL", "size": "0"}]})
+    assert book.ask_curve().prices[0] == pytest.approx(0.45)
+
+
+@pytest.mark.asyncio
+async def test_sequence_gap_resyncs_and_replays_newer_deltas():
+    connector = rest_connector()
+    mirror = OrderBookMirror(connector)
+    mirror.start(_idle_stream())
+    try:
+        for event in RECORDED[:4]:
+            mirror.apply(event)
+        # seq 4 never arrives.
+        mirror.apply({"event_type": "price_change", "asset_id": "brent-100", "seq": 5, "timestamp": "1760000001000", "changes": [{"price": "0.47", "side": "SELL", "size": "25"}]})
+
+        assert mirror.stats()["gaps"] == 1
+        assert mirror.book("brent-100") is None
+        await wait_until(lambda: mirror.book("brent-100") is not None)
+
+        connector.call_tool.assert_awaited_once_with("polymarket_get_orderbook", {"token_id": "brent-100"})
+        brent = mirror.book("brent-100")
+        # REST snapshot, plus the buffered delta that is newer than it.
+        assert brent.asks.prices == [0.47]
+        assert brent.asks.sizes == [25]
+        assert brent.bids.prices == [0.42]
+    finally:
+        await mirror.close()
+
+
+@pytest.mark.asyncio
+async def test_orderbook_reads_come_from_memory_once_mirrored():
+    connector = rest_connector()
+    mirror = OrderBookMirror(connector)
+
+    first = await mirror.orderbook("brent-100")
+    second = await mirror.orderbook("brent-100")
+
+    assert first == second
+    assert first["asks"] == [{"price": 0.47, "size": 500}]
+    connector.call_tool.assert_awaited_once()
+    assert "brent-100" in mirror.tracked
+
+
+@pytest.mark.asyncio
+async def test_replayed_websocket_feed_builds_the_mirror():
+    async with ReplayMarketServer(RECORDED) as server:
+        mirror = OrderBookMirror(rest_connector())
+        stream = PolymarketMarketStream(["brent-100", "wti-95"], url=server.url)
+        mirror.start(stream)
+        try:
+            await wait_until(lambda: mirror.book("brent-100") is not None and mirror.book("brent-100").seq == 5)
+            await wait_until(lambda: mirror.book("wti-95") is not None and mirror.book("wti-95").seq == 3)
+        finally:
+            await mirror.close()
+
+    assert server.subscriptions == [{"brent-100", "wti-95"}]
+    assert mirror.book("brent-100").asks.prices == [0.43, 0.45, 0.46, 0.48]
+    assert mirror.stats()["gaps"] == 0
+
+
+@pytest.mark.asyncio
+async def test_dropped_connection_reconnects_and_resyncs():
+    async with ReplayMarketServer(RECORDED, drop_after=2) as server:
+        connector = rest_connector()
+        mirror = OrderBookMirror(connector)
+        stream = PolymarketMarketStream(["brent-100"], url=server.url, reconnect_delay=0.01)
+        mirror.start(stream)
+        try:
+            await wait_until(lambda: len(server.subscriptions) == 2 and mirror.stats()["resyncs"] == 1)
+        finally:
+            await mirror.close()
+
+    # Deltas sent while disconnected are lost, so the book came back from REST.
+    assert mirror.book("brent-100").asks.prices == [0.47]
+    assert server.subscriptions[1] == {"brent-100"}
+
+
+async def _idle_stream():
+    await asyncio.Event().wait()
+    yield {}
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.intelligence.application.pipeline import Stage, StageError, StageGraph
+
+
+def sleeper(seconds: float, value):
+    async def run(inputs):
+        await asyncio.sleep(seconds)
+        return value
+    return run
+
+
+@pytest.mark.asyncio
+async def test_stage_starts_when_its_own_inputs_are_ready():
+    graph = StageGraph([
+        Stage("fast", sleeper(0.01, 1)),
+        Stage("slow", sleeper(0.1, 2)),
+        Stage("after_fast", lambda inputs: asyncio.sleep(0, result=inputs["fast"] + 10), deps=("fast",)),
+    ])
+
+    run = await graph.run()
+    trace = {entry["stage"]: entry for entry in run.trace_dicts()}
+
+    assert run.results == {"fast": 1, "slow": 2, "after_fast": 11}
+    assert trace["after_fast"]["start"] < trace["slow"]["end"]
+
+
+@pytest.mark.asyncio
+async def test_optional_stage_timeout_uses_fallback():
+    graph = StageGraph([
+        Stage("correlations", sleeper(1, ["x"]), timeout=0.01, fallback=[]),
+        Stage("critic", lambda inputs: asyncio.sleep(0, result=len(inputs["correlations"])), deps=("correlations",)),
+    ])
+
+    run = await graph.run()
+
+    assert run.results["critic"] == 0
+    assert run.trace[0].outcome == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_required_stage_failure_cancels_the_rest():
+    cancelled = asyncio.Event()
+
+    async def long_running(inputs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def boom(inputs):
+        raise RuntimeError("search down")
+
+    graph = StageGraph([Stage("search", boom), Stage("correlations", long_running)])
+
+    with pytest.raises(StageError) as excinfo:
+        await graph.run()
+
+    assert excinfo.value.stage == "search"
+    assert cancelled.is_set()
+
+
+def test_graph_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", sleeper(0, 1), deps=("b",)), Stage("b", sleeper(0, 1), deps=("a",))])
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", sleeper(0, 1), deps=("missing",))])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.services.kelly import SlippageAwareKellyEngine
+from app.services.portfolio import (
+    PortfolioKellyOptimizer,
+    correlation_from_links,
+    correlation_from_price_history,
+    nearest_correlation,
+)
+
+BOOK = [
+    {"price": 0.50, "size": 200},
+    {"price": 0.55, "size": 300},
+    {"price": 0.60, "size": 1000},
+]
+
+
+def test_independent_markets_match_the_single_market_engine():
+    engine = SlippageAwareKellyEngine()
+    probabilities = [0.7, 0.65, 0.8]
+
+    result = PortfolioKellyOptimizer().allocate(probabilities, [BOOK] * 3, bankroll=10_000)
+
+    for probability, allocation in zip(probabilities, result["allocations"]):
+        single = engine.calculate_optimal_size(probability, BOOK, 10_000)
+        assert allocation["optimal_size"] == pytest.approx(single["optimal_size"])
+        assert allocation["expected_vwap"] == pytest.approx(single["expected_vwap"])
+        assert allocation["standalone_size"] == pytest.approx(single["optimal_size"])
+
+
+def test_correlated_markets_share_one_kelly_bet():
+    correlation = np.full((20, 20), 0.95)
+    np.fill_diagonal(correlation, 1.0)
+    single = SlippageAwareKellyEngine().calculate_optimal_size(0.7, BOOK, 1000)["optimal_size"]
+
+    result = PortfolioKellyOptimizer().allocate([0.7] * 20, [BOOK] * 20, bankroll=1000, correlation=correlation)
+
+    # Sized independently, the twenty markets would commit twenty bets.
+    assert result["standalone_total"] == pytest.approx(20 * single)
+    assert single <= result["total_size"] < 1.2 * single
+    sizes = [allocation["optimal_size"] for allocation in result["allocations"]]
+    assert max(sizes) - min(sizes) <= 1.0 + 1e-9  # within one chunk of each other
+
+
+def test_budget_caps_the_total_commitment():
+    deep = [{"price": 0.20, "size": 1_000_000}]
+    optimizer = PortfolioKellyOptimizer(max_total_fraction=0.6)
+
+    result = optimizer.allocate([0.9] * 5, [deep] * 5, bankroll=1000)
+
+    assert result["total_size"] == pytest.approx(600)
+    assert result["committed_fraction"] == pytest.approx(0.6)
+    assert all(allocation["optimal_size"] == pytest.approx(120, abs=1) for allocation in result["allocations"])
+
+
+def test_markets_without_edge_get_nothing():
+    result = PortfolioKellyOptimizer().allocate([0.4, 0.7], [BOOK, BOOK], bankroll=1000)
+
+    assert result["allocations"][0]["optimal_size"] == 0
+    assert result["allocations"][0]["expected_value"] == -1.0
+    assert result["allocations"][1]["optimal_size"] > 0
+
+
+def test_correlation_helpers_return_valid_matrices():
+    # Pairwise-plausible but jointly impossible correlations.
+    repaired = nearest_correlation([[1, 0.9, -0.9], [0.9, 1, 0.9], [-0.9, 0.9, 1]])
+    assert np.allclose(np.diag(repaired), 1)
+    assert np.linalg.eigvalsh(repaired).min() >= -1e-9
+
+    history = np.array([[0.5, 0.55, 0.52, 0.6], [0.3, 0.35, 0.31, 0.4], [0.5, 0.5, 0.5, 0.5]])
+    from_prices = correlation_from_price_history(history)
+    assert from_prices[0, 1] > 0.9
+    assert from_prices[0, 2] == 0
+
+    questions = ["Will Brent close above $100?", "Will WTI close above $95?", "Will the Fed cut in June?"]
+    links = [["Will WTI close above $95"], [], []]
+    from_links = correlation_from_links(questions, links, strength=0.6)
+    assert from_links[0, 1] == from_links[1, 0] == pytest.approx(0.6)
+    assert from_links[0, 2] == 0
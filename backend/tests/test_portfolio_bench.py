@@ -0,0 +1,37 @@
+import time
+
+import numpy as np
+
+from app.services.portfolio import PortfolioKellyOptimizer
+
+
+def correlated_markets(markets: int, levels: int = 50, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    books = [
+        [{"price": float(p), "size": float(s)} for p, s in zip(np.sort(rng.uniform(0.2, 0.9, levels)), rng.uniform(1, 200, levels))]
+        for _ in range(markets)
+    ]
+    # A few shared factors (oil, rates, ...) plus idiosyncratic noise.
+    loadings = rng.normal(size=(markets, 5))
+    correlation = np.corrcoef(loadings @ rng.normal(size=(5, 60)) + rng.normal(size=(markets, 60)))
+    return rng.uniform(0.3, 0.95, markets), books, correlation
+
+
+def allocation_time(markets: int) -> float:
+    probabilities, books, correlation = correlated_markets(markets)
+    started = time.perf_counter()
+    PortfolioKellyOptimizer().allocate(probabilities, books, bankroll=10_000, correlation=correlation)
+    return time.perf_counter() - started
+
+
+def test_hundreds_of_markets_allocate_well_under_a_second():
+    assert allocation_time(300) < 1.0
+
+
+def benchmark():
+    for markets in (20, 100, 300, 1000):
+        print(f"  {markets:>5} markets {allocation_time(markets) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
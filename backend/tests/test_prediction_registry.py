@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.core.serialization import serializer
+from app.services.prediction_registry import PredictionRegistry, QuestionNormalizer
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # claim release is a compare-and-delete script
+
+
+def test_normalization_folds_spelling_and_synonyms():
+    normalizer = QuestionNormalizer({"WTI": "crude oil", "brent crude": "brent"})
+
+    assert normalizer.normalize("  Will  WTI hit $100?? ") == "will crude oil hit $100"
+    assert normalizer.key("Will wti hit $100?") == normalizer.key("will crude oil hit $100")
+    assert normalizer.normalize("Brent crude above 90?") == "brent above 90"
+    # Synonyms match whole words only.
+    assert normalizer.normalize("Will WTIX list?") == "will wtix list"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submissions_share_one_claim():
+    registry = PredictionRegistry(QuestionNormalizer())
+    redis = fakeredis.FakeAsyncRedis()
+
+    claims = await asyncio.gather(
+        *[registry.claim(redis, spelling) for spelling in ["Will gold rally?", "will gold rally", " WILL GOLD RALLY "]]
+    )
+
+    assert [claimed for _, claimed in claims] == [True, False, False]
+    assert len({task_id for task_id, _ in claims}) == 1
+
+
+@pytest.mark.asyncio
+async def test_completion_writes_result_and_releases_claim():
+    server = fakeredis.FakeServer()
+    api_redis, worker_redis = fakeredis.FakeAsyncRedis(server=server), fakeredis.FakeRedis(server=server)
+    registry = PredictionRegistry(QuestionNormalizer(), result_ttl=600)
+    task_id, _ = await registry.claim(api_redis, "Will gold rally?")
+
+    registry.complete(worker_redis, "will gold rally", task_id, {"adjusted_forecast": 0.6, "error": None})
+
+    assert serializer.loads(await api_redis.get(registry.result_key("Will gold rally?"))) == {
+        "adjusted_forecast": 0.6,
+        "error": None,
+    }
+    assert 0 < await api_redis.ttl(registry.result_key("Will gold rally?")) <= 600
+    assert (await registry.claim(api_redis, "Will gold rally?"))[1] is True
+
+
+@pytest.mark.asyncio
+async def test_error_results_are_not_cached_and_newer_claims_survive():
+    server = fakeredis.FakeServer()
+    api_redis, worker_redis = fakeredis.FakeAsyncRedis(server=server), fakeredis.FakeRedis(server=server)
+    registry = PredictionRegistry(QuestionNormalizer())
+    stale_id, _ = await registry.claim(api_redis, "Will gold rally?")
+    await api_redis.set(registry.inflight_key("Will gold rally?"), "newer-task")
+
+    # A stale task finishing must not release a newer task's claim.
+    registry.complete(worker_redis, "Will gold rally?", stale_id, {"error": "unknown_error"})
+
+    assert await api_redis.get(registry.result_key("Will gold rally?")) is None
+    assert await api_redis.get(registry.inflight_key("Will gold rally?")) == b"newer-task"
+
+
+@pytest.mark.asyncio
+async def test_batch_claims_are_renewed_only_while_still_held():
+    server = fakeredis.FakeServer()
+    api_redis, worker_redis = fakeredis.FakeAsyncRedis(server=server), fakeredis.FakeRedis(server=server)
+    registry = PredictionRegistry(QuestionNormalizer(), inflight_ttl=900)
+    await registry.claim(api_redis, "Will gold rally?", task_id="batch-1")
+    await registry.claim(api_redis, "Will copper rally?", task_id="batch-1")
+    for question in ["Will gold rally?", "Will copper rally?"]:
+        await api_redis.expire(registry.inflight_key(question), 5)
+    await api_redis.set(registry.inflight_key("Will copper rally?"), "newer-task", ex=5)
+
+    renewed = registry.extend(worker_redis, ["Will gold rally?", "Will copper rally?"], "batch-1")
+
+    assert renewed == 1
+    assert await api_redis.ttl(registry.inflight_key("Will gold rally?")) > 5
+    assert await api_redis.ttl(registry.inflight_key("Will copper rally?")) <= 5
@@ -1,15 +1,20 @@
+import asyncio
 import os
-from unittest.mock import patch
+import time
+from unittest.mock import AsyncMock, patch
 
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
 os.environ["ALLOW_DEMO_AUTH"] = "false"
 
+import numpy as np
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from app.limiter import check_rate_limit
 from app.routers.auth import router as auth_router
 from app.routers.prediction import compat_router, router as prediction_router
+from app.services.prediction_registry import prediction_registry
+from app.services.semantic_cache import CachedForecast, SemanticForecastCache, SemanticIndex
 
 app = FastAPI()
 app.include_router(auth_router)
@@ -25,15 +30,10 @@ def auth_headers() -> dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
-class DummyTask:
-    id = "task-123"
-
-
 def test_prediction_routes_support_prefixed_and_compat_endpoints():
-    with patch("app.routers.prediction.redis_client.get", return_value=None), patch(
-        "app.routers.prediction.run_forecast_task.delay",
-        return_value=DummyTask(),
-    ):
+    with patch("app.routers.prediction.redis_client.get", new=AsyncMock(return_value=None)), patch(
+        "app.routers.prediction.redis_client.set", new=AsyncMock(return_value=True)
+    ), patch("app.routers.prediction.run_forecast_task.apply_async") as apply_async:
         prefixed = client.post(
             "/prediction/predict",
             json={"question": "Will copper rally?"},
@@ -47,5 +47,141 @@ def test_prediction_routes_support_prefixed_and_compat_endpoints():
 
     assert prefixed.status_code == 200
     assert compat.status_code == 200
-    assert prefixed.json()["task_id"] == "task-123"
-    assert compat.json()["task_id"] == "task-123"
+    queued_ids = [call.kwargs["task_id"] for call in apply_async.call_args_list]
+    assert [prefixed.json()["task_id"], compat.json()["task_id"]] == queued_ids
+
+
+def test_duplicate_question_attaches_to_the_running_task():
+    # The first lookup is the result cache, the second reads the existing in-flight claim.
+    with patch(
+        "app.routers.prediction.redis_client.get", new=AsyncMock(side_effect=[None, b"task-123"])
+    ), patch("app.routers.prediction.redis_client.set", new=AsyncMock(return_value=None)), patch(
+        "app.routers.prediction.run_forecast_task.apply_async"
+    ) as apply_async:
+        response = client.post(
+            "/prediction/predict",
+            json={"question": "  will COPPER rally  "},
+            headers=auth_headers(),
+        )
+
+    # The running task may be a batch job, so the caller polls a per-question handle.
+    assert response.json() == {
+        "task_id": f"cached_{prediction_registry.key('Will copper rally?')}",
+        "status": "processing",
+        "served_from": "pipeline",
+        "deduplicated": True,
+        "attached_task_id": "task-123",
+    }
+    apply_async.assert_not_called()
+
+
+def test_batch_prediction_serves_cached_questions_and_queues_the_rest():
+    cached = '{"search_query": "Will gold rally?"}'
+    with patch("app.routers.prediction.redis_client.mget", new=AsyncMock(return_value=[cached, None])), patch(
+        "app.routers.prediction.redis_client.set", new=AsyncMock(return_value=True)
+    ) as claim, patch("app.routers.prediction.run_batch_forecast_task.apply_async") as apply_async:
+        response = client.post(
+            "/prediction/predict/batch",
+            json={"questions": ["Will gold rally?", "Will copper rally?", "Will copper rally?"]},
+            headers=auth_headers(),
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["cached"] == {"Will gold rally?": {"search_query": "Will gold rally?"}}
+    assert body["pending"] == ["Will copper rally?"]
+    assert body["attached"] == {}
+    # The batch's task id is the claim value, so the worker can release it per question.
+    assert claim.await_args.args[1] == body["task_id"]
+    apply_async.assert_called_once_with(args=[["Will copper rally?"], "lfm-thinking"], kwargs={}, task_id=body["task_id"])
+
+
+def test_batch_prediction_attaches_to_questions_already_running():
+    # Gold is claimed by a running /predict task; copper is free.
+    with patch("app.routers.prediction.redis_client.mget", new=AsyncMock(return_value=[None, None])), patch(
+        "app.routers.prediction.redis_client.set", new=AsyncMock(side_effect=[None, True])
+    ), patch("app.routers.prediction.redis_client.get", new=AsyncMock(return_value=b"task-gold")), patch(
+        "app.routers.prediction.run_batch_forecast_task.apply_async"
+    ) as apply_async:
+        response = client.post(
+            "/prediction/predict/batch",
+            json={"questions": ["Will gold rally?", "Will copper rally?"]},
+            headers=auth_headers(),
+        )
+
+    body = response.json()
+    assert body["attached"] == {"Will gold rally?": f"cached_{prediction_registry.key('Will gold rally?')}"}
+    assert body["pending"] == ["Will copper rally?"]
+    assert apply_async.call_args.kwargs["args"] == [["Will copper rally?"], "lfm-thinking"]
+
+
+def test_semantic_match_is_served_and_flagged():
+    semantic = SemanticForecastCache(lambda question: [1.0, 0.0] if "Brent" in question else [0.0, 1.0])
+    semantic.index = SemanticIndex(capacity=4, dim=2)
+    result = {"search_query": "Will Brent exceed $100 by Q3?", "adjusted_forecast": 0.41}
+    semantic.index.add(np.array([1.0, 0.0], dtype=np.float32), CachedForecast("Will Brent exceed $100 by Q3?", result, time.time()))
+
+    with patch("app.routers.prediction.semantic_cache", semantic), patch(
+        "app.routers.prediction.redis_client.get", new=AsyncMock(return_value=None)
+    ), patch("app.routers.prediction.redis_client.setex", new=AsyncMock()) as setex, patch(
+        "app.routers.prediction.run_forecast_task.apply_async"
+    ) as apply_async:
+        response = client.post(
+            "/prediction/predict",
+            json={"question": "Brent above 100 before October?"},
+            headers=auth_headers(),
+        )
+
+    body = response.json()
+    assert body["served_from"] == "semantic_cache"
+    assert body["matched_question"] == "Will Brent exceed $100 by Q3?"
+    assert body["result"] == result
+    setex.assert_awaited_once()
+    apply_async.assert_not_called()
+
+
+def test_task_status_reads_the_result_backend_off_the_event_loop():
+    loop_running = []
+
+    def on_event_loop():
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    class FakeResult:
+        def __init__(self, task_id, app):
+            pass
+
+        def ready(self):
+            loop_running.append(on_event_loop())
+            return True
+
+        def get(self):
+            loop_running.append(on_event_loop())
+            return {"adjusted_forecast": 0.6}
+
+    with patch("app.routers.prediction.AsyncResult", FakeResult):
+        response = client.get("/prediction/task/task-123", headers=auth_headers())
+
+    assert response.json() == {"id": "task-123", "status": "completed", "result": {"adjusted_forecast": 0.6}}
+    assert loop_running == [False, False]
+
+
+def test_question_handle_resolves_while_claimed_and_once_stored():
+    handle = f"cached_{prediction_registry.key('Will gold rally?')}"
+
+    with patch("app.routers.prediction.redis_client.get", new=AsyncMock(return_value=None)), patch(
+        "app.routers.prediction.redis_client.exists", new=AsyncMock(return_value=1)
+    ) as exists:
+        running = client.get(f"/prediction/task/{handle}", headers=auth_headers())
+    with patch(
+        "app.routers.prediction.redis_client.get", new=AsyncMock(return_value=b'{"adjusted_forecast": 0.6}')
+    ):
+        done = client.get(f"/prediction/task/{handle}", headers=auth_headers())
+
+    assert running.json() == {"id": handle, "status": "processing"}
+    exists.assert_awaited_once_with(prediction_registry.inflight_key("Will gold rally?"))
+    # A single ForecastResult, whether a /predict task or a batch job produced it.
+    assert done.json() == {"id": handle, "status": "completed", "result": {"adjusted_forecast": 0.6}}
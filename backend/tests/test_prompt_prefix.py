@@ -0,0 +1,95 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from app.core.ai_client import AIClient, LlamaCppProvider, OllamaProvider
+from app.intelligence.domain.critic import CriticService
+from app.intelligence.domain.prompt_context import build_source_context
+from app.intelligence.domain.swarm import IntelligenceDirectorate
+from app.models import Source
+
+SOURCES = [
+    Source(title="Vortexa", url="internal://shipping", snippet="Floating storage at 85M bbls."),
+    Source(title="Cushing", url="internal://satellite", snippet="Utilization at 62%."),
+]
+
+
+@pytest.mark.asyncio
+async def test_swarm_and_critic_prompts_share_the_source_text():
+    prefix = build_source_context("Will Brent hit $100?", SOURCES)
+    with patch("app.core.ai_client.ai_client.generate", new_callable=AsyncMock) as mock_generate, patch(
+        "app.core.ai_client.ai_client.generate_json", new_callable=AsyncMock
+    ) as mock_generate_json:
+        mock_generate.return_value = "report"
+        mock_generate_json.return_value = {"critique": "ok", "score": 0.6, "risk_factors": []}
+        for agent in IntelligenceDirectorate().agents:
+            await agent.analyze("Will Brent hit $100?", SOURCES)
+        await CriticService().critique_forecast("Will Brent hit $100?", SOURCES, 0.6, "Reasoning")
+
+    calls = mock_generate.call_args_list + mock_generate_json.call_args_list
+    assert len(calls) == 4
+    assert all(call.args[0].startswith(prefix) for call in calls)
+    # Only the swarm runs on llama.cpp, so only its prompts carry a slot-pinning key.
+    assert len({call.kwargs["prefix_key"] for call in mock_generate.call_args_list}) == 1
+    assert "prefix_key" not in mock_generate_json.call_args.kwargs
+
+
+@pytest.mark.asyncio
+async def test_llama_cpp_pins_prefix_to_slot_and_reports_cached_tokens():
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "content": " report ",
+            "tokens_cached": 480,
+            "timings": {"prompt_n": 20},
+        })
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        provider = LlamaCppProvider(client, host="http://llama", n_slots=4)
+        assert await provider.generate("prompt one", prefix_key="abc") == "report"
+        await provider.generate("prompt two", prefix_key="abc")
+        await provider.generate("prompt three", id_slot=2)
+
+    assert payloads[0]["cache_prompt"] is True
+    assert payloads[0]["id_slot"] == payloads[1]["id_slot"] == provider.slot_for("abc")
+    assert payloads[2]["id_slot"] == 2
+    assert "prefix_key" not in payloads[0]
+    assert provider.stats() == {
+        "requests": 3,
+        "prompt_tokens_evaluated": 60,
+        "prompt_tokens_cached": 1440,
+        "prompt_cache_ratio": 0.96,
+    }
+
+
+@pytest.mark.asyncio
+async def test_llama_cpp_stream_reads_sse_frames_and_final_timings():
+    body = "\n\n".join([
+        'data: {"content": "Brent", "stop": false}',
+        'data: {"content": " up", "stop": false}',
+        'data: {"content": "", "stop": true, "tokens_cached": 90, "timings": {"prompt_n": 10}}',
+    ])
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body))) as client:
+        provider = LlamaCppProvider(client, host="http://llama")
+        chunks = [chunk async for chunk in provider.stream_generate("prompt")]
+
+    assert chunks == ["Brent", " up"]
+    assert provider.stats()["prompt_tokens_cached"] == 90
+
+
+@pytest.mark.asyncio
+async def test_prompt_cache_hints_are_dropped_for_other_providers():
+    ai = AIClient()
+    ai.response_cache.enabled = False
+    ollama = OllamaProvider(client=None)
+    ollama.generate = AsyncMock(return_value="ok")
+    ai.providers = {"ollama": ollama}
+
+    await ai.generate("prompt", provider="ollama", model="m", prefix_key="abc")
+
+    assert "prefix_key" not in ollama.generate.call_args.kwargs
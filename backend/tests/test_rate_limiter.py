@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app import limiter
+from app.core.security import create_access_token
+from app.limiter import RateLimit, RateLimiter, RateLimitRules, check_rate_limit
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs EVALSHA through lupa
+
+
+def test_rule_parsing_and_resolution():
+    rules = RateLimitRules(
+        default="5/minute",
+        roles={"admin": "60/minute"},
+        routes={"/prediction/predict/batch": {"default": "2/minute", "admin": "20/30s"}},
+    )
+
+    assert RateLimit.parse("100/hour") == RateLimit(100, 3600)
+    assert rules.resolve("/prediction/predict", "analyst") == RateLimit(5, 60)
+    assert rules.resolve("/prediction/predict", "admin") == RateLimit(60, 60)
+    assert rules.resolve("/prediction/predict/batch", "analyst") == RateLimit(2, 60)
+    assert rules.resolve("/prediction/predict/batch", "admin") == RateLimit(20, 30)
+
+
+@pytest.mark.asyncio
+async def test_gcra_admits_the_limit_then_reports_retry_after():
+    rate_limiter = RateLimiter(fakeredis.FakeAsyncRedis(), RateLimitRules(default="5/minute"))
+
+    decisions = [await rate_limiter.hit("/predict", "ip:1.2.3.4", "anonymous") for _ in range(6)]
+
+    assert [decision.allowed for decision in decisions] == [True] * 5 + [False]
+    assert [decision.remaining for decision in decisions[:5]] == [4, 3, 2, 1, 0]
+    assert 0 < decisions[-1].retry_after <= 12
+    assert int(decisions[-1].headers()["Retry-After"]) >= 1
+    # Other identities have their own budget.
+    assert (await rate_limiter.hit("/predict", "ip:5.6.7.8", "anonymous")).allowed
+
+
+@pytest.mark.asyncio
+async def test_concurrent_hits_never_exceed_the_shared_budget():
+    redis = fakeredis.FakeAsyncRedis()
+    rules = RateLimitRules(default="50/minute")
+    # Two API processes sharing one Redis, each leasing tokens locally.
+    workers = [RateLimiter(redis, rules, lease_fraction=0.2) for _ in range(2)]
+
+    decisions = await asyncio.gather(
+        *[workers[index % 2].hit("/predict", "user:alice", "analyst") for index in range(120)]
+    )
+
+    assert sum(decision.allowed for decision in decisions) == 50
+    # Leased tokens are served in-process: far fewer Redis round trips than requests.
+    assert sum(worker.redis_calls for worker in workers) <= 10
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_fails_open():
+    class BrokenRedis:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise ConnectionError("redis down")
+
+            return run
+
+    decision = await RateLimiter(BrokenRedis(), RateLimitRules()).hit("/predict", "ip:1.2.3.4", "anonymous")
+
+    assert decision.allowed
+
+
+def test_dependency_limits_per_route_and_role(monkeypatch):
+    monkeypatch.setattr(
+        limiter,
+        "rate_limiter",
+        RateLimiter(
+            fakeredis.FakeAsyncRedis(),
+            RateLimitRules(default="2/minute", roles={"admin": "10/minute"}),
+        ),
+    )
+    app = FastAPI()
+
+    @app.get("/ping", dependencies=[Depends(check_rate_limit)])
+    async def ping():
+        return {"ok": True}
+
+    client = TestClient(app)
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': 'root', 'role': 'admin'})}"}
+
+    anonymous = [client.get("/ping") for _ in range(3)]
+    privileged = [client.get("/ping", headers=admin) for _ in range(3)]
+
+    assert [response.status_code for response in anonymous] == [200, 200, 429]
+    assert anonymous[0].headers["X-RateLimit-Limit"] == "2;w=60"
+    assert anonymous[1].headers["X-RateLimit-Remaining"] == "0"
+    assert int(anonymous[2].headers["Retry-After"]) >= 1
+    assert [response.status_code for response in privileged] == [200, 200, 200]
+
+
+class StaticVerifier(limiter.ApiKeyVerifier):
+    def __init__(self, valid_keys):
+        super().__init__()
+        self.valid = {hashlib.sha256(key.encode()).hexdigest() for key in valid_keys}
+        self.lookups = 0
+
+    async def _lookup(self, key_hash):
+        self.lookups += 1
+        return key_hash in self.valid
+
+
+def test_unverified_api_keys_share_the_client_ip_bucket(monkeypatch):
+    monkeypatch.setattr(
+        limiter, "rate_limiter", RateLimiter(fakeredis.FakeAsyncRedis(), RateLimitRules(default="2/minute"))
+    )
+    verifier = StaticVerifier(["real-key"])
+    monkeypatch.setattr(limiter, "api_key_verifier", verifier)
+    app = FastAPI()
+
+    @app.get("/ping", dependencies=[Depends(check_rate_limit)])
+    async def ping():
+        return {"ok": True}
+
+    client = TestClient(app)
+
+    forged = [client.get("/ping", headers={"X-API-Key": f"random-{index}"}) for index in range(3)]
+    keyed = [client.get("/ping", headers={"X-API-Key": "real-key"}) for _ in range(2)]
+
+    assert [response.status_code for response in forged] == [200, 200, 429]
+    # A verified key gets its own bucket, and its verdict is reused.
+    assert [response.status_code for response in keyed] == [200, 200]
+    assert verifier.lookups == 4
+
+
+@pytest.mark.asyncio
+async def test_api_key_verifier_checks_active_unexpired_keys():
+    pytest.importorskip("aiosqlite")
+    from datetime import datetime, timedelta
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.models import ApiKey
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync: ApiKey.metadata.create_all(sync, tables=[ApiKey.__table__]))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    digest = lambda key: hashlib.sha256(key.encode()).hexdigest()  # noqa: E731
+    async with sessions() as session:
+        session.add_all([
+            ApiKey(user_id="analyst", key_hash=digest("live")),
+            ApiKey(user_id="analyst", key_hash=digest("revoked"), is_active=False),
+            ApiKey(user_id="analyst", key_hash=digest("expired"), expires_at=datetime.utcnow() - timedelta(days=1)),
+        ])
+        await session.commit()
+
+    verifier = limiter.ApiKeyVerifier(session_factory=sessions)
+
+    assert await verifier.verify("live") == digest("live")
+    assert await verifier.verify("revoked") is None
+    assert await verifier.verify("expired") is None
+    assert await verifier.verify("unknown") is None
+    await engine.dispose()
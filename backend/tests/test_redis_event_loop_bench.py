@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import redis
+import redis.asyncio as aioredis
+
+from app import cache
+
+
+class DelayedRedisStandIn:
+    """
+    Minimal RESP server on localhost that answers every command after `delay` seconds.
+    It runs on its own thread and loop so a blocking client in the test loop cannot stall it.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.store: dict[bytes, bytes] = {}
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _shutdown(self):
+        self._server.close()
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _reply(self, args) -> bytes:
+        name = args[0].upper()
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name == b"GET":
+            value = self.store.get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SETEX":
+            self.store[args[1]] = args[3]
+            return b"+OK\r\n"
+        return b"+OK\r\n"
+
+    async def _handle(self, reader, writer):
+        while (args := await self._read_command(reader)) is not None:
+            await asyncio.sleep(self.delay)
+            writer.write(self._reply(args))
+            await writer.drain()
+        writer.close()
+
+
+@cache.cache_response(ttl_seconds=30)
+async def cached_markets(page: int):
+    return {"page": page}
+
+
+async def measure_loop_lag(workload) -> tuple[float, float]:
+    """Run `workload` while a 1ms ticker records the longest event-loop stall."""
+    max_gap = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_gap
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await workload()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker_task
+    return max_gap, elapsed
+
+
+async def benchmark(delay: float = 0.05, requests: int = 20) -> dict:
+    with DelayedRedisStandIn(delay) as stand_in:
+        sync_client = redis.Redis(port=stand_in.port, protocol=2)
+        async_client = aioredis.Redis(port=stand_in.port, max_connections=requests, protocol=2)
+
+        async def sync_workload():
+            # What cache_response did before: blocking read, compute, blocking write.
+            async def one(page):
+                if sync_client.get(f"cached_markets:{page}") is None:
+                    sync_client.setex(f"cached_markets:{page}", 30, '{"page": %d}' % page)
+            await asyncio.gather(*[one(page) for page in range(requests)])
+
+        async def async_workload():
+            with patch.object(cache.response_cache, "redis", async_client):
+                await asyncio.gather(*[cached_markets(page) for page in range(requests)])
+
+        sync_lag, sync_elapsed = await measure_loop_lag(sync_workload)
+        async_lag, async_elapsed = await measure_loop_lag(async_workload)
+        sync_client.close()
+        await async_client.aclose()
+
+    print(f"Redis delay {delay * 1000:.0f}ms, {requests} concurrent requests")
+    print(f"  sync client:  max loop stall {sync_lag * 1000:7.1f}ms, wall {sync_elapsed:.2f}s")
+    print(f"  async client: max loop stall {async_lag * 1000:7.1f}ms, wall {async_elapsed:.2f}s")
+    return {"sync_lag": sync_lag, "async_lag": async_lag, "sync_elapsed": sync_elapsed, "async_elapsed": async_elapsed}
+
+
+@pytest.mark.asyncio
+async def test_async_cache_does_not_stall_the_event_loop():
+    report = await benchmark(delay=0.05, requests=10)
+
+    # Blocking calls serialize: the loop is frozen for each round trip in turn.
+    assert report["sync_lag"] >= 0.05
+    assert report["async_lag"] < 0.03
+    assert report["async_elapsed"] < report["sync_elapsed"] / 2
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import pytest
+
+from app.cache import CacheEntry, TwoTierCache, cache_response, ignore_params
+from app.models import User
+
+
+class DictAsyncRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def eval(self, script, numkeys, key, token):
+        # RELEASE_SCRIPT: delete only while the lock still holds this token.
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def cache():
+    return TwoTierCache(DictAsyncRedis(), max_entries=2, beta=0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(cache):
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"markets": calls}
+
+    results = await asyncio.gather(*[cache.get_or_compute("markets", compute, ttl=30) for _ in range(20)])
+
+    assert results == [{"markets": 1}] * 20
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_l2_hit_populates_l1(cache):
+    await cache.get_or_compute("markets", lambda: asyncio.sleep(0, result=[1]), ttl=30)
+    cache.invalidate("markets")
+
+    assert await cache.get_or_compute("markets", lambda: asyncio.sleep(0, result=[2]), ttl=30) == [1]
+    assert await cache.get_or_compute("markets", lambda: asyncio.sleep(0, result=[3]), ttl=30) == [1]
+
+    stats = cache.stats()
+    assert stats["l2"]["hits"] == 1
+    assert stats["l1"]["hits"] == 1
+    assert stats["recomputes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_one_refresh_runs(cache):
+    cache._l1_set("markets", CacheEntry(["old"], time.time() - 31, ttl=30, stale_ttl=30, delta=0.01))
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return ["new"]
+
+    stale = await asyncio.gather(*[cache.get_or_compute("markets", compute, ttl=30, stale_ttl=30) for _ in range(5)])
+    await asyncio.sleep(0.05)
+
+    assert stale == [["old"]] * 5
+    assert calls == 1
+    assert await cache.get_or_compute("markets", compute, ttl=30, stale_ttl=30) == ["new"]
+    assert cache.stats()["stale_served"] == 5
+
+
+@pytest.mark.asyncio
+async def test_early_refresh_fires_near_expiry():
+    cache = TwoTierCache(None, beta=1000)
+    cache._l1_set("markets", CacheEntry(["old"], time.time() - 29, ttl=30, stale_ttl=0, delta=1.0))
+
+    assert await cache.get_or_compute("markets", lambda: asyncio.sleep(0, result=["new"]), ttl=30) == ["old"]
+    await asyncio.sleep(0.01)
+
+    assert cache.stats()["early_refreshes"] == 1
+    assert cache._entries["markets"].value == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded(cache):
+    for key in ["a", "b", "c"]:
+        await cache.get_or_compute(key, lambda: asyncio.sleep(0, result=key), ttl=30)
+
+    assert list(cache._entries) == ["b", "c"]
+    assert cache.stats()["l1"]["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_key_func_ignores_auth_dependency(cache):
+    calls = 0
+
+    @cache_response(ttl_seconds=30, key_func=ignore_params("current_user"), cache=cache)
+    async def get_markets(category: str = "all", current_user: User = None):
+        nonlocal calls
+        calls += 1
+        return [category]
+
+    await get_markets(current_user=User(username="alice"))
+    await get_markets(current_user=User(username="bob"))
+    await get_markets(category="Energy", current_user=User(username="bob"))
+
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_lock_release_leaves_a_lock_taken_over_by_another_process(cache):
+    await cache._acquire_lock("lock:k", "mine")
+    # Ours expired and another process now holds the lock.
+    cache.redis.store["lock:k"] = "theirs"
+
+    await cache._release_lock("lock:k", "mine")
+    assert cache.redis.store["lock:k"] == "theirs"
+
+    await cache._release_lock("lock:k", "theirs")
+    assert "lock:k" not in cache.redis.store
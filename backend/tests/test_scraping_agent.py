@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.agents.scraping_agent import ScrapingAgent
+from app.db.models import PolymarketMarket, PolymarketOrderbook
+
+pytest.importorskip("aiosqlite")
+
+
+class FakeConnector:
+    """Serves `markets` listings and a book per token after `delay`, tracking peak concurrency."""
+
+    def __init__(self, markets, delay=0.02, failing=()):
+        self.markets = markets
+        self.delay = delay
+        self.failing = set(failing)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def call_tool(self, name, arguments):
+        if name == "polymarket_get_markets":
+            return self.markets
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if arguments["token_id"] in self.failing:
+                raise RuntimeError("boom")
+            return {
+                "bids": [{"price": "0.40", "size": "10"}, {"price": "0.45", "size": "5"}],
+                "asks": [{"price": "0.55", "size": "5"}, {"price": "0.50", "size": "10"}],
+            }
+        finally:
+            self.in_flight -= 1
+
+
+def listing(count, question="Will it happen?"):
+    return [
+        {"conditionId": f"c{i}", "question": f"{question} #{i}", "endDate": "2026-12-31T00:00:00Z", "tokens": [{"token_id": f"t{i}"}]}
+        for i in range(count)
+    ]
+
+
+async def in_memory_sessions():
+    # One shared connection so every session sees the same in-memory database
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda sync: PolymarketMarket.metadata.create_all(
+                sync, tables=[PolymarketMarket.__table__, PolymarketOrderbook.__table__]
+            )
+        )
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def count(session_factory, model):
+    async with session_factory() as session:
+        return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_scrape_fetches_books_concurrently_within_the_limit():
+    session_factory = await in_memory_sessions()
+    connector = FakeConnector(listing(20), delay=0.05)
+    agent = ScrapingAgent(connector, session_factory=session_factory, concurrency=5)
+
+    cycle = await agent.scrape_active_markets()
+
+    assert connector.peak == 5
+    assert cycle["markets"] == 20 and cycle["books"] == 20 and cycle["book_errors"] == 0
+    # 4 waves of 0.05s, not 20 sequential fetches
+    assert cycle["fetch_seconds"] < 0.5
+    assert await count(session_factory, PolymarketOrderbook) == 20
+
+
+@pytest.mark.asyncio
+async def test_scrape_inserts_new_markets_without_touching_existing_ones():
+    session_factory = await in_memory_sessions()
+    connector = FakeConnector(listing(3), delay=0)
+    agent = ScrapingAgent(connector, session_factory=session_factory)
+    await agent.scrape_active_markets()
+
+    connector.markets = listing(4, question="Renamed")
+    await agent.scrape_active_markets()
+
+    async with session_factory() as session:
+        markets = (await session.execute(select(PolymarketMarket))).scalars().all()
+        books = (await session.execute(select(PolymarketOrderbook))).scalars().all()
+    assert sorted(m.condition_id for m in markets) == ["c0", "c1", "c2", "c3"]
+    # Like the per-market path it replaced, only unseen markets take the listing's metadata.
+    assert {m.condition_id: m.question for m in markets} == {
+        "c0": "Will it happen? #0", "c1": "Will it happen? #1", "c2": "Will it happen? #2", "c3": "Renamed #3",
+    }
+    assert len(books) == 7
+    assert books[0].mid_price == pytest.approx(0.475)
+    assert books[0].spread == pytest.approx(0.05)
+
+
+@pytest.mark.asyncio
+async def test_scrape_skips_failed_books_and_reports_them():
+    session_factory = await in_memory_sessions()
+    connector = FakeConnector(listing(5), delay=0, failing={"t1", "t3"})
+    agent = ScrapingAgent(connector, session_factory=session_factory)
+
+    cycle = await agent.scrape_active_markets()
+
+    assert cycle["books"] == 3 and cycle["book_errors"] == 2
+    assert await count(session_factory, PolymarketMarket) == 5
+    assert await count(session_factory, PolymarketOrderbook) == 3
+    assert agent.last_cycle == cycle
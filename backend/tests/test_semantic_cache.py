@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.services.semantic_cache import CachedForecast, SemanticForecastCache, SemanticIndex
+
+# Toy 3-d "embeddings": the first two questions point the same way, the third does not.
+VECTORS = {
+    "Will Brent exceed $100 by Q3?": [1.0, 0.1, 0.0],
+    "Brent above 100 before October?": [0.98, 0.15, 0.0],
+    "Will gold hit $3000?": [0.0, 0.2, 1.0],
+}
+
+
+def make_cache(**kwargs) -> SemanticForecastCache:
+    return SemanticForecastCache(VECTORS.get, index=SemanticIndex(capacity=8, dim=3), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_above_threshold_is_served():
+    cache = make_cache(threshold=0.95)
+    await cache.store("Will Brent exceed $100 by Q3?", {"adjusted_forecast": 0.41})
+
+    hit = await cache.lookup("Brent above 100 before October?")
+
+    assert hit is not None
+    assert hit.source == "memory"
+    assert hit.forecast.result == {"adjusted_forecast": 0.41}
+    assert hit.similarity > 0.99
+    assert await cache.lookup("Will gold hit $3000?") is None
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_results_are_not_served():
+    cache = make_cache(max_age=60)
+    vector = np.array(VECTORS["Will Brent exceed $100 by Q3?"], dtype=np.float32)
+    vector /= np.linalg.norm(vector)
+    cache.index.add(vector, CachedForecast("Will Brent exceed $100 by Q3?", {}, time.time() - 120))
+
+    assert await cache.lookup("Brent above 100 before October?") is None
+
+
+@pytest.mark.asyncio
+async def test_questions_without_an_embedding_are_skipped():
+    cache = make_cache()
+
+    await cache.store("Unknown wording", {"adjusted_forecast": 0.5})
+
+    assert await cache.lookup("Unknown wording") is None
+    assert cache.index.size == 0
+
+
+@pytest.mark.asyncio
+async def test_pgvector_hit_is_indexed_under_the_stored_embedding():
+    cache = make_cache(threshold=0.95)
+    original = np.array(VECTORS["Will Brent exceed $100 by Q3?"], dtype=np.float32)
+    original /= np.linalg.norm(original)
+    forecast = CachedForecast("Will Brent exceed $100 by Q3?", {"adjusted_forecast": 0.41}, time.time())
+
+    async def search_db(vector):
+        return forecast, float(original @ vector), original
+
+    cache._search_db = search_db
+    hit = await cache.lookup("Brent above 100 before October?")
+
+    assert hit.source == "pgvector"
+    assert cache.index.size == 1
+    np.testing.assert_allclose(cache.index.vectors[0], original)
+
+
+def test_index_keeps_the_most_recent_entries():
+    index = SemanticIndex(capacity=2, dim=2)
+    for name, vector in [("a", [1.0, 0.0]), ("b", [0.0, 1.0]), ("c", [0.6, 0.8])]:
+        index.add(np.array(vector, dtype=np.float32), CachedForecast(name, {}, time.time()))
+
+    best, similarity = index.search(np.array([1.0, 0.0], dtype=np.float32), max_age=60)
+
+    assert index.size == 2
+    assert best.question == "c"  # "a" was overwritten
+    assert similarity == pytest.approx(0.6)
@@ -0,0 +1,113 @@
+import json
+import time
+
+import pytest
+from kombu.serialization import dumps as kombu_dumps, loads as kombu_loads
+
+from app.core.serialization import Serializer, register_celery_serializer
+from app.models import AlgoAnalysis, DivergenceAnalysis, ForecastResult, MirrorAnalysis, NoiseAnalysis, Source
+
+CODECS = ["json", "msgpack", "msgpack+zstd"]
+
+
+def forecast_payload(sources: int = 40) -> dict:
+    """A ForecastResult shaped like a real analysis: many sources with long snippets."""
+    component = {"score": 0.62, "reasoning": "Inventories drew for a third week while OPEC+ held quotas. " * 6}
+    result = ForecastResult(
+        search_query="Will Brent crude settle above $100 before the end of Q3?",
+        news_summary=[
+            Source(
+                title=f"Tanker rates spike as Red Sea diversions continue ({index})",
+                url=f"https://news.example.com/energy/{index}",
+                snippet="VLCC day rates on the Middle East to China route rose 14% week over week. " * 4,
+            )
+            for index in range(sources)
+        ],
+        initial_forecast=0.61,
+        critique="The analysis underweights demand destruction above $95. " * 5,
+        adjusted_forecast=0.57,
+        reasoning="Directorate Consensus Strategy:\n" + "- Supply remains tight across the curve.\n" * 20,
+        mirror=MirrorAnalysis(**component),
+        noise=NoiseAnalysis(**component),
+        divergence=DivergenceAnalysis(**component),
+        algo=AlgoAnalysis(**component),
+        adversarial_score=6.5,
+        logical_fallacies=["Recency bias", "Anchoring on 2022 highs"],
+        counter_arguments=["SPR releases", "Chinese demand slowdown"],
+    )
+    return result.model_dump()
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_and_version_tag(codec):
+    serializer = Serializer(codec=codec)
+    payload = forecast_payload()
+
+    encoded = serializer.dumps(payload)
+
+    assert encoded[0] == 0x01
+    assert serializer.loads(encoded) == payload
+
+
+def test_legacy_json_entries_stay_readable():
+    payload = forecast_payload(sources=2)
+    serializer = Serializer(codec="msgpack+zstd")
+
+    assert serializer.loads(json.dumps(payload).encode()) == payload
+    assert serializer.loads(json.dumps(payload)) == payload
+    # A reader configured for orjson still decodes binary entries written by a newer writer.
+    assert Serializer(codec="json").loads(serializer.dumps(payload)) == payload
+
+
+def test_tagged_payloads_survive_a_decoding_redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis(decode_responses=True)
+    serializer = Serializer(codec="json")
+    payload = {**forecast_payload(sources=2), "question": "Brent > $100 ¿sí? 📈"}
+
+    client.set("forecast", serializer.dumps(payload))
+
+    assert serializer.loads(client.get("forecast")) == payload
+    # msgpack bytes are rarely valid UTF-8, but ones that decode must still round-trip.
+    packed = Serializer(codec="msgpack+zstd").dumps({"a": "b"})
+    assert serializer.loads(packed.decode("utf-8", "surrogateescape")) == {"a": "b"}
+
+
+def test_zstd_shrinks_large_payloads():
+    payload = forecast_payload()
+
+    assert len(Serializer(codec="msgpack+zstd").dumps(payload)) < len(json.dumps(payload)) / 3
+
+
+def test_celery_results_use_the_shared_codec():
+    name = register_celery_serializer()
+    meta = {"status": "SUCCESS", "result": forecast_payload(sources=3)}
+
+    content_type, encoding, body = kombu_dumps(meta, serializer=name)
+
+    assert kombu_loads(body, content_type, encoding, accept={"application/x-alpha-insights"}) == meta
+
+
+def benchmark(iterations: int = 500) -> None:
+    payload = forecast_payload()
+    rows = [("stdlib json", lambda v: json.dumps(v).encode(), json.loads)]
+    for codec in CODECS:
+        serializer = Serializer(codec=codec)
+        rows.append((codec if codec != "json" else "orjson", serializer.dumps, serializer.loads))
+
+    print(f"ForecastResult with {len(payload['news_summary'])} sources, {iterations} iterations")
+    for name, dumps, loads in rows:
+        encoded = dumps(payload)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            dumps(payload)
+        dump_us = (time.perf_counter() - started) / iterations * 1e6
+        started = time.perf_counter()
+        for _ in range(iterations):
+            loads(encoded)
+        load_us = (time.perf_counter() - started) / iterations * 1e6
+        print(f"  {name:<13} {len(encoded):>7} bytes  dumps {dump_us:8.1f}us  loads {load_us:8.1f}us")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -15,10 +15,10 @@ async def test_geopolitical_agent_analyze():
 
 @pytest.mark.asyncio
 async def test_directorate_run_swarm():
-    with patch('app.core.ai_client.ai_client.generate', new_callable=AsyncMock) as mock_generate, \
+    with patch('app.core.ai_client.ai_client.generate_batch', new_callable=AsyncMock) as mock_generate_batch, \
          patch('app.core.ai_client.ai_client.generate_json', new_callable=AsyncMock) as mock_generate_json:
         
-        mock_generate.return_value = "Agent report"
+        mock_generate_batch.return_value = ["Agent report"] * 3
         mock_generate_json.return_value = {
             "mirror": {"score": 0.8, "reasoning": "G-Consensus"},
             "noise": {"score": 0.2, "reasoning": "S-Consensus"},
@@ -30,6 +30,24 @@ async def test_directorate_run_swarm():
         avg_score, reasoning, analysis = await directorate.run_swarm("Test Question", [])
         
         # (0.8 + (1-0.2) + 0.7 + 0.9) / 4 = (0.8 + 0.8 + 0.7 + 0.9) / 4 = 3.2 / 4 = 0.8
-        assert avg_score == 0.8
+        assert avg_score == pytest.approx(0.8)
         assert "G-Consensus" in reasoning
-        assert analysis.mirror.score == 0.8
+        assert analysis.mirror.score == pytest.approx(0.8)
+        assert len(mock_generate_batch.call_args.args[0]) == 3
+
+
+@pytest.mark.asyncio
+async def test_agent_reports_batch_sends_one_batch_per_source_prefix():
+    from app.intelligence.domain.prompt_context import build_source_context, context_key
+
+    with patch('app.core.ai_client.ai_client.generate_batch', new_callable=AsyncMock) as mock_generate_batch:
+        mock_generate_batch.side_effect = lambda prompts, **kwargs: [kwargs["prefix_key"]] * len(prompts)
+        directorate = IntelligenceDirectorate()
+
+        reports = await directorate.agent_reports_batch([("Q1?", []), ("Q2?", [])])
+
+    assert reports == [
+        [context_key(build_source_context("Q1?", []))] * 3,
+        [context_key(build_source_context("Q2?", []))] * 3,
+    ]
+    assert mock_generate_batch.await_count == 2
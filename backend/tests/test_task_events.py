@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.serialization import serializer
+from app import task_events
+from app.task_events import TaskEventHub, record_event, stream_position, task_channel, task_stream
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class CountingRedis(fakeredis.FakeAsyncRedis):
+    pubsubs = 0
+
+    def pubsub(self, **kwargs):
+        CountingRedis.pubsubs += 1
+        return super().pubsub(**kwargs)
+
+
+async def publish(redis, task_id, event, message=""):
+    await redis.publish(task_channel(task_id), serializer.dumps({"event": event, "message": message}))
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_to_every_socket_on_the_task():
+    redis = CountingRedis()
+    CountingRedis.pubsubs = 0
+    hub = TaskEventHub(redis)
+    try:
+        async with hub.subscribe("a") as first, hub.subscribe("a") as second, hub.subscribe("b") as other:
+            await publish(redis, "a", "status", "Searching...")
+            await publish(redis, "a", "complete")
+
+            for queue in (first, second):
+                assert (await asyncio.wait_for(queue.get(), 1))["message"] == "Searching..."
+                assert (await asyncio.wait_for(queue.get(), 1))["event"] == "complete"
+            assert other.empty()
+            assert hub.stats()["connections"] == 3
+
+        # One pattern subscription serves every socket in the process.
+        assert CountingRedis.pubsubs == 1
+        assert hub.stats()["connections"] == 0
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_events_are_pushed_without_polling_delay():
+    redis = fakeredis.FakeAsyncRedis()
+    hub = TaskEventHub(redis)
+    try:
+        async with hub.subscribe("task") as events:
+            latencies = []
+            for _ in range(20):
+                started = time.perf_counter()
+                await publish(redis, "task", "status")
+                await asyncio.wait_for(events.get(), 1)
+                latencies.append(time.perf_counter() - started)
+
+        # The old loop slept 100 ms between polls.
+        assert sorted(latencies)[len(latencies) // 2] < 0.01
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_drops_oldest_events():
+    redis = fakeredis.FakeAsyncRedis()
+    hub = TaskEventHub(redis, queue_size=2)
+    try:
+        async with hub.subscribe("task") as events:
+            for index in range(3):
+                await publish(redis, "task", "status", str(index))
+            await asyncio.sleep(0.05)
+
+            assert [events.get_nowait()["message"] for _ in range(2)] == ["1", "2"]
+            assert hub.stats()["dropped"] == 1
+    finally:
+        await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_replays_history_then_follows_live_events():
+    server = fakeredis.FakeServer()
+    worker_redis = fakeredis.FakeRedis(server=server)
+    hub = TaskEventHub(fakeredis.FakeAsyncRedis(server=server))
+    try:
+        first = record_event(worker_redis, "task", {"event": "status", "message": "Searching..."})
+        record_event(worker_redis, "task", {"event": "status", "message": "Synthesizing..."})
+
+        async with hub.subscribe("task") as events:
+            history = await hub.replay("task")
+            record_event(worker_redis, "task", {"event": "complete", "message": "done"})
+            live = await asyncio.wait_for(events.get(), 1)
+
+        assert [event["message"] for event in history] == ["Searching...", "Synthesizing..."]
+        assert live["event"] == "complete"
+        assert stream_position(live["id"]) > stream_position(history[-1]["id"])
+        # A reconnecting client resumes after the last id it saw.
+        resumed = await hub.replay("task", after=first)
+        assert [event["message"] for event in resumed] == ["Synthesizing...", "done"]
+    finally:
+        await hub.close()
+
+
+def test_streams_are_trimmed_and_expire(monkeypatch):
+    monkeypatch.setattr(task_events, "STREAM_MAXLEN", 5)
+    redis = fakeredis.FakeRedis()
+
+    for index in range(300):
+        record_event(redis, "task", {"event": "status", "message": str(index)})
+
+    # Approximate trimming drops whole radix-tree nodes, so the length only stays bounded.
+    assert redis.xlen(task_stream("task")) < 300
+    assert 0 < redis.ttl(task_stream("task")) <= task_events.STREAM_TTL_SECONDS
+
+
+def test_stream_ids_order_numerically():
+    assert stream_position("1700000000009-0") < stream_position("1700000000010-0")
+    assert stream_position("1700000000010-2") < stream_position("1700000000010-10")
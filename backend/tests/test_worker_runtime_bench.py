@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.intelligence.application.engine import IntelligenceMirrorEngine
+from app.worker_runtime import WorkerRuntime
+
+
+class StubEngine:
+    active = 0
+    peak = 0
+
+    async def run(self):
+        StubEngine.active += 1
+        StubEngine.peak = max(StubEngine.peak, StubEngine.active)
+        await asyncio.sleep(0.01)
+        StubEngine.active -= 1
+        return asyncio.get_running_loop()
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def runtime():
+    runtime = WorkerRuntime(StubEngine, pool_size=2)
+    yield runtime
+    runtime.stop()
+
+
+def test_tasks_share_one_loop_and_reuse_engines(runtime):
+    async def task():
+        async with runtime.engine() as engine:
+            return await engine.run()
+
+    loops = {runtime.run(task) for _ in range(10)}
+
+    assert len(loops) == 1
+    assert runtime.stats()["engines_created"] == 1
+    assert runtime.stats()["tasks_run"] == 10
+
+
+def test_engine_pool_bounds_concurrent_tasks(runtime):
+    StubEngine.peak = 0
+
+    async def task():
+        async with runtime.engine() as engine:
+            return await engine.run()
+
+    # A threads/gevent pool runs several tasks at once against the same runtime.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: runtime.run(task), range(16)))
+
+    assert runtime.stats()["engines_created"] == 2
+    assert StubEngine.peak == 2
+
+
+def test_interrupted_wait_cancels_the_coroutine(runtime):
+    cancelled = threading.Event()
+
+    async def task():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        runtime.run(task, timeout=0.05)
+
+    assert cancelled.wait(1)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"response": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def per_task_overhead(tasks: int = 50, calls_per_task: int = 3) -> dict:
+    """
+    Seconds per task for a task that builds an engine and makes a few LLM-style calls
+    against a local keep-alive server: the old asyncio.run-per-task path versus the runtime.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+    async def calls(client):
+        for _ in range(calls_per_task):
+            (await client.post(url, json={"prompt": "ping"})).raise_for_status()
+
+    def per_task_loop():
+        # Before: a new loop, engine and client each time (a pooled client would be bound to a dead loop).
+        async def task():
+            engine = IntelligenceMirrorEngine()
+            async with httpx.AsyncClient() as client:
+                await calls(client)
+            await engine.close()
+
+        asyncio.run(task())
+
+    runtime = WorkerRuntime(IntelligenceMirrorEngine, pool_size=1)
+    shared = {}
+
+    def persistent_loop():
+        async def task():
+            async with runtime.engine():
+                if "client" not in shared:
+                    shared["client"] = httpx.AsyncClient()
+                await calls(shared["client"])
+
+        runtime.run(task)
+
+    results = {}
+    try:
+        for name, run_task in [("asyncio.run per task", per_task_loop), ("persistent loop", persistent_loop)]:
+            run_task()  # warm-up
+            started = time.perf_counter()
+            for _ in range(tasks):
+                run_task()
+            results[name] = (time.perf_counter() - started) / tasks
+    finally:
+        runtime.stop(shared["client"].aclose)
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def test_persistent_loop_cuts_per_task_overhead():
+    results = per_task_overhead(tasks=20)
+
+    assert results["persistent loop"] < results["asyncio.run per task"]
+
+
+def benchmark():
+    for name, seconds in per_task_overhead(tasks=200).items():
+        print(f"  {name:<22} {seconds * 1000:7.2f} ms/task")
+
+
+if __name__ == "__main__":
+    benchmark()
+
+
+def test_scrapes_reuse_one_connector_and_shutdown_closes_it(runtime, monkeypatch):
+    from app import worker
+    from app.agents.scraping_agent import ScrapingAgent
+
+    connectors = []
+
+    async def scrape(agent):
+        connectors.append(agent.connector)
+        return {}
+
+    monkeypatch.setattr(worker, "runtime", runtime)
+    monkeypatch.setattr(worker, "_polymarket_connector", None)
+    monkeypatch.setattr("app.services.orderbook_mirror.orderbook_mirror", None)
+    monkeypatch.setattr(ScrapingAgent, "scrape_active_markets", scrape)
+    # The shared AI client stays open for the rest of the suite.
+    monkeypatch.setattr("app.core.ai_client.ai_client.close", AsyncMock())
+    runtime.start()
+
+    worker.scrape_markets_task()
+    worker.scrape_markets_task()
+    worker.stop_worker_runtime()
+
+    assert len(connectors) == 2 and connectors[0] is connectors[1]
+    assert connectors[0].client.is_closed